@@ -98,9 +98,9 @@ class ArchitectureResirio:
 
             if not lightweight:
                 result['edges'][e.id]['data'] = {
-                    'duration': operation.durations,
-                    'logs':     operation.logs,
-                    'tags':     operation.tags
+                    'duration': dict(operation.durations),
+                    'logs':     dict(operation.logs),
+                    'tags':     dict(operation.tags)
                 }
 
         # Unused: would create existing hazards at the start of the elicitation.
@@ -0,0 +1,32 @@
+import re
+
+
+class CallFilter:
+    """
+    Decides which spans are ignored while parsing, e.g. GET-Requests, based on the call string pattern of a model.
+    The pattern is compiled once and the result is memoized per operation name, since traces contain few distinct
+    operation names but a lot of spans.
+    """
+
+    # Upper bound of memoized names, in case operation names contain ids or similar.
+    MAX_CACHED_NAMES = 100000
+
+    def __init__(self, pattern: str = None):
+        self._pattern = pattern
+        self._regex = re.compile(pattern) if pattern is not None else None
+        self._matches = {}
+
+    @property
+    def pattern(self) -> str:
+        return self._pattern
+
+    def matches(self, operation_name: str) -> bool:
+        """
+        Returns True, if the pattern can be found in the operation name (like re.search) and the span is ignored.
+        """
+        result = self._matches.get(operation_name)
+        if result is None:
+            result = self._regex is not None and self._regex.search(operation_name) is not None
+            if len(self._matches) < CallFilter.MAX_CACHED_NAMES:
+                self._matches[operation_name] = result
+        return result
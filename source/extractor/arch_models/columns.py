@@ -0,0 +1,187 @@
+from typing import Any, Iterable, List
+
+import numpy as np
+
+MISSING = 0
+PRESENT = 1
+NONE = 2
+
+
+class Column:
+    """
+    Growable numeric column backed by a NumPy array. Values are stored as int64 until the first non-integral value is
+    added, after that the column is promoted to float64. Every row also has a state, so rows that were never set can be
+    told apart from rows that were explicitly set to None.
+    """
+
+    INITIAL_CAPACITY = 16
+
+    def __init__(self, capacity: int = INITIAL_CAPACITY):
+        self._values = np.zeros(capacity, dtype=np.int64)
+        self._states = np.zeros(capacity, dtype=np.uint8)
+        # number of rows that were set (including None)
+        self._count = 0
+        # one past the highest row that was set
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def restore(self, values: np.ndarray, states: np.ndarray, count: int):
+        """
+        Replaces the content with the given arrays, e.g. read-only or memory-mapped arrays of a snapshot. The arrays are
+        only copied once the column grows.
+        """
+        if len(values) == 0:
+            return
+        self._values = values
+        self._states = states
+        self._count = count
+        self._size = len(values)
+
+    def data(self):
+        """
+        Returns the values and states of all rows up to the highest row that was set.
+        """
+        return self._values[:self._size], self._states[:self._size]
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def is_float(self) -> bool:
+        return self._values.dtype == np.float64
+
+    @property
+    def nbytes(self) -> int:
+        return self._values.nbytes + self._states.nbytes
+
+    def _reserve(self, size: int):
+        capacity = len(self._values)
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        self._values = np.resize(self._values, capacity)
+        self._values[self._size:] = 0
+        self._states = np.resize(self._states, capacity)
+        self._states[self._size:] = MISSING
+
+    def _promote(self):
+        if not self.is_float:
+            self._values = self._values.astype(np.float64)
+
+    def set(self, row: int, value: Any):
+        self._reserve(row + 1)
+        if value is None:
+            state = NONE
+        else:
+            if not isinstance(value, (int, np.integer)):
+                self._promote()
+            self._values[row] = value
+            state = PRESENT
+        if self._states[row] == MISSING:
+            self._count += 1
+        self._states[row] = state
+        self._size = max(self._size, row + 1)
+
+    def append(self, value: Any) -> int:
+        row = self._size
+        self.set(row, value)
+        return row
+
+    def set_many(self, rows: np.ndarray, other, other_rows: np.ndarray):
+        """
+        Copies the given rows of another column to the given rows of this column. Rows that are missing in the other
+        column are skipped.
+        """
+        inside = other_rows < other.size
+        rows, other_rows = rows[inside], other_rows[inside]
+        states = other._states[other_rows]
+        mask = states != MISSING
+        rows, other_rows, states = rows[mask], other_rows[mask], states[mask]
+        if len(rows) == 0:
+            return
+        if other.is_float:
+            self._promote()
+        self._reserve(int(rows.max()) + 1)
+        self._count += int(np.count_nonzero(self._states[rows] == MISSING))
+        self._values[rows] = other._values[other_rows]
+        self._states[rows] = states
+        self._size = max(self._size, int(rows.max()) + 1)
+
+    def extend(self, other):
+        """
+        Appends all rows of another column.
+        """
+        rows = np.arange(other.size)
+        self.set_many(rows + self._size, other, rows)
+
+    def extend_array(self, values: np.ndarray):
+        """
+        Appends the values of a NumPy array.
+        """
+        if len(values) == 0:
+            return
+        if values.dtype.kind == 'f':
+            self._promote()
+        start = self._size
+        self._reserve(start + len(values))
+        self._values[start:start + len(values)] = values
+        self._states[start:start + len(values)] = PRESENT
+        self._count += len(values)
+        self._size = start + len(values)
+
+    def extend_values(self, values: List[Any]):
+        """
+        Appends a list of Python numbers, which may contain None values.
+        """
+        array = np.array(values)
+        nones = None
+        if array.dtype == object:
+            nones = np.array([value is None for value in values], dtype=bool)
+            array = np.array([0 if value is None else value for value in values])
+        if array.dtype.kind not in 'if':
+            array = array.astype(np.int64 if array.dtype.kind in 'bu' else np.float64)
+        start = self._size
+        self.extend_array(array)
+        if nones is not None:
+            self._states[start + np.flatnonzero(nones)] = NONE
+
+    def contains(self, row: int) -> bool:
+        return 0 <= row < self._size and self._states[row] != MISSING
+
+    def remove(self, row: int):
+        if self.contains(row):
+            self._states[row] = MISSING
+            self._values[row] = 0
+            self._count -= 1
+
+    def get(self, row: int) -> Any:
+        """
+        Returns the value of a row as a plain Python number. Raises a KeyError if the row was never set.
+        """
+        if not self.contains(row):
+            raise KeyError(row)
+        if self._states[row] == NONE:
+            return None
+        return self._values[row].item()
+
+    def rows(self) -> np.ndarray:
+        """
+        Returns the indices of all rows that were set, in ascending order.
+        """
+        return np.flatnonzero(self._states[:self._size] != MISSING)
+
+    def array(self, rows: Iterable[int] = None) -> np.ndarray:
+        """
+        Returns the values of all rows that were set (or of the given rows) as a NumPy array. None values become NaN.
+        """
+        rows = self.rows() if rows is None else np.asarray(rows, dtype=np.int64)
+        values = self._values[rows]
+        nones = self._states[rows] == NONE
+        if nones.any():
+            values = values.astype(np.float64)
+            values[nones] = np.nan
+        return values
@@ -1,7 +1,9 @@
 import numpy as np
 
+from extractor.arch_models.lazy import LazyAttributes
 
-class Dependency:
+
+class Dependency(LazyAttributes):
     """
     Class that represents a dependency of a specific Operation
     """
@@ -12,9 +14,25 @@ class Dependency:
         self._name = operation.name
         self._probability = 1.0
         self._latencies = []
-        self._calling_spans = []
+        # ids of the distinct spans that called this dependency
+        self._calling_spans = set()
         self._calls = 0
 
+    def __setstate__(self, state):
+        # dependencies pickled before the calling spans were a set stored them as list, Jaeger and Zipkin traces stored
+        # the whole span instead of its id
+        if isinstance(state.get('_calling_spans'), list):
+            state = dict(state, _calling_spans={Dependency._calling_span_id(span) for span in state['_calling_spans']})
+        self.__dict__.update(state)
+
+    @staticmethod
+    def _calling_span_id(span):
+        if not isinstance(span, dict):
+            return span
+        if 'spanID' in span:
+            return span.get('traceID', None), span['spanID']
+        return span.get('traceId', None), span['id']
+
     @property
     def operation(self):
         return self._operation
@@ -51,12 +69,22 @@ class Dependency:
         latencies = [x / 1000000 for x in self._latencies]
         return str(np.mean(latencies)) + '+-' + str(np.std(latencies))
 
-    def add_calling_span(self, span):
-        self._calling_spans.append(span)
+    def add_calling_span(self, span_id):
+        self._calling_spans.add(span_id)
 
     def add_call(self):
         self._calls = self._calls + 1
 
+    def merge(self, other):
+        """
+        Adds the latencies and calls of the same dependency in a partial model that was built from other traces.
+        Calling spans that are already known are not counted twice.
+        """
+        self._latencies.extend(other.latencies)
+        known = len(self._calling_spans & other.calling_spans)
+        self._calling_spans.update(other.calling_spans)
+        self._calls += other._calls - known
+
     def calculate_probability(self, parent_executions):
         # Probability of a dependency is defined as the total amount executions of the operation of this dependency
         # divided by the amount of executions of the parent.
@@ -0,0 +1,109 @@
+from typing import List
+
+import numpy as np
+
+from extractor.arch_models.hazard import ResponseTimeSpike
+
+
+class DurationStatistics:
+    """
+    Outlier filtered response time statistics of many operations. The durations of all operations are concatenated
+    into a single array, each operation owns a contiguous segment of it, so all statistics are computed with a few
+    segmented reductions instead of one pandas Series per operation.
+    The results match the per operation computation with pandas: NaN values are ignored by the statistics, the standard
+    deviation uses one delta degree of freedom, and values further than DEVIATION_FACTOR standard deviations away from
+    the mean are outliers.
+    """
+
+    def __init__(self, durations: List[np.ndarray]):
+        """
+        @param durations:   Durations of each operation.
+        """
+        self._counts = np.fromiter((len(values) for values in durations), dtype=np.int64, count=len(durations))
+        values = np.concatenate(durations) if durations else np.empty(0, dtype=np.int64)
+        if values.dtype.kind not in 'if':
+            values = values.astype(np.float64)
+        # operation code of each value
+        self._codes = np.repeat(np.arange(len(durations)), self._counts)
+
+        size = len(durations)
+        self._starts = np.cumsum(self._counts) - self._counts
+        self._mean = np.full(size, np.nan)
+        self._std = np.full(size, np.nan)
+        self._filtered_counts = self._counts.copy()
+        self._filtered_min = np.full(size, np.nan)
+        self._filtered_max = np.full(size, np.nan)
+        self._max = np.full(size, np.nan)
+        if len(values) > 0:
+            self._compute(values)
+
+    @staticmethod
+    def of(operations: List) -> 'DurationStatistics':
+        return DurationStatistics([operation.durations.array() for operation in operations])
+
+    def _segment_reduce(self, function: np.ufunc, values: np.ndarray, empty) -> np.ndarray:
+        """
+        Reduces the segment of each operation, operations without values get the given empty value.
+        """
+        result = np.full(len(self._counts), empty, dtype=np.result_type(values.dtype, type(empty)))
+        nonempty = self._counts > 0
+        result[nonempty] = function.reduceat(values, self._starts[nonempty])
+        return result
+
+    def _compute(self, values: np.ndarray):
+        valid = ~np.isnan(values) if values.dtype.kind == 'f' else np.ones(len(values), dtype=bool)
+        valid_counts = self._segment_reduce(np.add, valid.astype(np.int64), 0)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # integer durations are summed exactly, like pandas does
+            sums = self._segment_reduce(np.add, np.where(valid, values, 0), 0)
+            self._mean = np.where(valid_counts > 0, sums / valid_counts, np.nan)
+
+            centered = values - self._mean[self._codes]
+            squares = self._segment_reduce(np.add, np.where(valid, centered, 0) ** 2, 0.0)
+            self._std = np.where(valid_counts > 1, np.sqrt(squares / (valid_counts - 1)), np.nan)
+
+            # comparisons with NaN are false, so NaN values and operations without a deviation are never outliers
+            outliers = np.abs(centered) > self._std[self._codes] * ResponseTimeSpike.DEVIATION_FACTOR
+        self._filtered_counts = self._counts - self._segment_reduce(np.add, outliers.astype(np.int64), 0)
+
+        kept = valid & ~outliers
+        self._max = self._extreme(np.maximum, values, valid, -np.inf)
+        self._filtered_max = self._extreme(np.maximum, values, kept, -np.inf)
+        self._filtered_min = self._extreme(np.minimum, values, kept, np.inf)
+
+    def _extreme(self, function: np.ufunc, values: np.ndarray, mask: np.ndarray, neutral: float) -> np.ndarray:
+        result = self._segment_reduce(function, np.where(mask, values.astype(np.float64), neutral), np.nan)
+        result[self._segment_reduce(np.add, mask.astype(np.int64), 0) == 0] = np.nan
+        return result
+
+    @property
+    def counts(self) -> np.ndarray:
+        return self._counts
+
+    @property
+    def filtered_counts(self) -> np.ndarray:
+        return self._filtered_counts
+
+    @property
+    def mean(self) -> np.ndarray:
+        return self._mean
+
+    @property
+    def std(self) -> np.ndarray:
+        return self._std
+
+    @property
+    def deviation(self) -> np.ndarray:
+        """
+        Relative difference between the minimum and maximum duration of each operation without outliers.
+        """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return 1 - self._filtered_min / self._filtered_max
+
+    @property
+    def spike(self) -> np.ndarray:
+        """
+        Difference between the maximum duration without outliers and the overall maximum duration of each operation.
+        """
+        return self._filtered_max - self._max
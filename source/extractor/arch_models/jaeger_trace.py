@@ -1,20 +1,28 @@
 import json
-import re
 
 from extractor.arch_models.dependency import Dependency
 from extractor.arch_models.model import IModel
-from typing import Union, Any, Dict
+from typing import Union, Any, Dict, Iterable, List
 
 from typing import IO
 
 from extractor.arch_models.operation import Operation
 from extractor.arch_models.service import Service
 from extractor.arch_models.circuit_breaker import CircuitBreaker
+from util.json_stream import iter_json_array
+
+# Span tags that configure resilience patterns
+PATTERN_TAGS = {'pattern.circuitBreaker', 'loadbalancer.strategy'}
 
 
 class JaegerTrace(IModel):
-    def __init__(self, source: Union[str, IO, dict] = None, multiple: bool = False, pattern: str = None):
-        super().__init__(self.__class__.__name__, source, multiple, pattern)
+    def __init__(self, source: Union[str, IO, dict] = None, multiple: bool = False, pattern: str = None,
+                 streaming: bool = False, workers: int = 1):
+        super().__init__(self.__class__.__name__, source, multiple, pattern, streaming, workers)
+
+    @staticmethod
+    def _parse_tags(tags) -> Dict[str, Any]:
+        return dict(tags)
 
     @staticmethod
     def _parse_logs(logs) -> Dict[int, Dict[str, str]]:
@@ -28,162 +36,202 @@ class JaegerTrace(IModel):
         return self._parse(model)
 
     def _parse(self, model: Dict[str, Any]) -> bool:
-        # Store process_id: service_name
-        process_ids = {}
-        # Store span_id: span
-        span_ids = {}
-        traces = model['data']
+        self._set_default_call_string()
 
-        # Set default value for the call string pattern
-        if self._call_string == "" or self._call_string is None:
-            self.set_call_string('^GET$')
+        if not self._parse_all(model['data']):
+            return False
 
-        for trace in traces:
-            # Identify all services (processes)
-            for process_id, process in trace['processes'].items():
-                service_name = process['serviceName']
-
-                service = Service(service_name)
-                service.tags = {tag['key']: tag['value'] for tag in process['tags']}
-                service.tags['serviceName'] = service_name
+        self.subsequent_calculations()
 
-                # check if service already exists
-                if service_name not in self.services:
-                    self._services[service_name] = service
-                process_ids[process_id] = service_name
+        return True
 
-            # Add operations to the corresponding services.
-            for span in trace['spans']:
-                pid = span['processID']
+    def _parse_stream(self, traces: Iterable[Dict[str, Any]]) -> bool:
+        self._set_default_call_string()
 
-                # Unknown process
-                if pid not in process_ids:
+        if self._workers > 1:
+            if not self._parse_parallel(traces):
+                return False
+        else:
+            for trace in traces:
+                # The lookup tables only live as long as the current trace, so the raw spans can be freed afterwards.
+                if not self._parse_trace(trace, {}, {}):
                     return False
 
-                span_id = span['spanID']
-                span_ids[span_id] = span
-                operation_name = span['operationName']
+        self.subsequent_calculations()
+
+        return True
+
+    def _parse_traces(self, traces: List[Dict[str, Any]]) -> bool:
+        # Store process_id: service_name
+        process_ids = {}
+        # Store span_id: span
+        span_ids = {}
 
-                service_name = process_ids[pid]
+        for trace in traces:
+            if not self._parse_trace(trace, process_ids, span_ids):
+                return False
 
-                host = ''
-                for tag in trace['processes'][pid]['tags']:
-                    if tag['key'] == 'ip':
-                        host = tag['value']
-                if not self.services[service_name].hosts.__contains__(host):
-                    self.services[service_name].add_host(host)
-                self.services[service_name].load_balancer.add_instance_history_entry(span['startTime'], host)
+        return True
+
+    def _set_default_call_string(self):
+        if self._call_string == "" or self._call_string is None:
+            self.set_call_string('^GET$')
 
-                # Ignore GET-Requests or similar
-                if re.search(self._call_string, operation_name):
-                    continue
+    def _batch_traces(self, batch: Union[Dict[str, Any], List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        return batch['data'] if isinstance(batch, dict) else batch
+
+    def _parse_trace(self, trace: Dict[str, Any], process_ids: Dict[str, str], span_ids: Dict[str, Any]) -> bool:
+        """
+        Adds the services, operations and dependencies of a single trace to the model.
+        @param trace:       A single element of the 'data' array of a Jaeger export.
+        @param process_ids: Maps process_id: service_name. Shared between the traces of one export if they are read at
+                            once, a new one per trace if they are streamed.
+        @param span_ids:    Maps span_id: span. Shared between the traces of one export if they are read at once, a new
+                            one per trace if they are streamed.
+        """
+        # Identify all services (processes)
+        for process_id, process in trace['processes'].items():
+            service_name = process['serviceName']
+
+            service = Service(service_name)
+            tags = {tag['key']: tag['value'] for tag in process['tags']}
+            tags['serviceName'] = service_name
+            service.tags = self._tag_pool.tags(tags)
+
+            # check if service already exists
+            if service_name not in self.services:
+                self._services[service_name] = service
+            process_ids[process_id] = service_name
+
+        # Add operations to the corresponding services.
+        for span in trace['spans']:
+            pid = span['processID']
+
+            # Unknown process
+            if pid not in process_ids:
+                return False
+
+            span_id = span['spanID']
+            span_ids[span_id] = span
+            operation_name = span['operationName']
+
+            service_name = process_ids[pid]
+
+            host = ''
+            for tag in trace['processes'][pid]['tags']:
+                if tag['key'] == 'ip':
+                    host = tag['value']
+            if not self.services[service_name].hosts.__contains__(host):
+                self.services[service_name].add_host(host)
+            self.services[service_name].load_balancer.add_instance_history_entry(span['startTime'], host)
+
+            # Ignore GET-Requests or similar
+            if self._call_filter.matches(operation_name):
+                continue
+
+            if operation_name in self._services[service_name].operations:
+                operation = self._services[service_name].operations[operation_name]
+            else:
+                operation = Operation(operation_name)
+                self._services[service_name].add_operation(operation)
+
+            # Track the amount times this operation gets called
+            operation.add_span(span_id)
+
+            duration = span.get('duration', -1)
+
+            # store the response time (duration) of the operation
+            if duration != -1:
+                operation.add_response_time(host, span['startTime'], duration)
+
+            operation.durations[span_id] = duration
+            # tags and logs are only decoded if they are accessed, spans with equal tags (or without logs) share an entry
+            tags = self._tag_pool.items((tag['key'], tag['value']) for tag in span.get('tags', {}))
+            operation.tags.add_raw(span_id, tags, JaegerTrace._parse_tags, self._tag_pool)
+            operation.logs.add_raw(span_id, span.get('logs') or (), JaegerTrace._parse_logs, self._tag_pool)
+
+            # only the tags of the current span have to be checked, the ones of earlier spans were checked before
+            pattern_tags = {key: value for key, value in tags if key in PATTERN_TAGS}
+            if 'pattern.circuitBreaker' in pattern_tags and bool(pattern_tags['pattern.circuitBreaker']):
+                operation.add_circuit_breaker(CircuitBreaker())
+            if 'loadbalancer.strategy' in pattern_tags:
+                self.services[service_name].load_balancer.set_strategy_with_tag(
+                    str(pattern_tags['loadbalancer.strategy']))
+
+        # Add dependencies
+        for span in trace['spans']:
+            for reference in span['references']:
+                if reference['refType'] == 'CHILD_OF':
+                    # Callee
+                    pid = span['processID']
+                    service_name = process_ids[pid]
+                    operation_name = span['operationName']
+
+                    # Ignore GET-Requests or similar
+                    if self._call_filter.matches(operation_name):
+                        continue
 
-                if operation_name in self._services[service_name].operations:
                     operation = self._services[service_name].operations[operation_name]
-                else:
-                    operation = Operation(operation_name)
-                    self._services[service_name].add_operation(operation)
 
-                # Track the amount times this operation gets called
-                operation.add_span(span_id)
+                    # Caller
+                    parent_id = reference['spanID']
+                    parent_span = span_ids[parent_id]
+                    parent_pid = parent_span['processID']
+                    parent_service_name = process_ids[parent_pid]
+                    parent_operation_name = parent_span['operationName']
+
+                    latency = span['startTime'] - parent_span['startTime']
+                    add_latency = False
+
+                    # save start time and end time (needed for retry detection)
+                    start_time = span['startTime']
+                    end_time = start_time + span['duration']
+
+                    parent_operation = None
+
+                    # Handling of GET-Requests or similar.
+                    # What kind of spans are ignored is specified with the call_string pattern.
+                    # If the parent operation matches the pattern the true parent operation (the calling operation)
+                    # has to be the grandparent operation of the current operation.
+                    if self._call_filter.matches(parent_operation_name):
+                        for ref in parent_span['references']:
+                            if ref['refType'] == 'CHILD_OF':
+                                grandparent_id = ref['spanID']
+                                grandparent_span = span_ids[grandparent_id]
+                                grandparent_pid = grandparent_span['processID']
+                                grandparent_service_name = process_ids[grandparent_pid]
+                                grandparent_operation_name = grandparent_span['operationName']
+                                parent_operation = self._services[grandparent_service_name].operations[
+                                    grandparent_operation_name]
+                                add_latency = True
+
+                                # update start- and end time
+                                start_time = parent_span['startTime']
+                                end_time = start_time + parent_span['duration']
+
+                                parent_span = grandparent_span
+                    else:
+                        parent_operation = self._services[parent_service_name].operations[parent_operation_name]
 
-                duration = span.get('duration', -1)
+                    dependency = parent_operation.get_dependency_with_operation(operation)
+                    if dependency is None:
+                        dependency = Dependency(operation)
+                        parent_operation.add_dependency(dependency)
 
-                # store the response time (duration) of the operation
-                if duration != -1:
-                    if operation.response_times.keys().__contains__(host):
-                        operation.response_times[host].append((span['startTime'], duration))
-                    else:
-                        operation.response_times[host] = [(span['startTime'], duration)]
-
-                operation.durations[span_id] = duration
-                operation.tags[span_id] = {tag['key']: tag['value'] for tag in span.get('tags', {})}
-                operation.logs[span_id] = JaegerTrace._parse_logs(span.get('logs', {}))
-
-                for s in operation.tags.items():
-                    for value in s[1]:
-                        if value == 'pattern.circuitBreaker':
-                            if bool(s[1][value]):
-                                operation.add_circuit_breaker(CircuitBreaker())
-
-                        if value == 'loadbalancer.strategy':
-                            self.services[service_name].load_balancer.set_strategy_with_tag(str(s[1][value]))
-
-            # Add dependencies
-            for span in trace['spans']:
-                for reference in span['references']:
-                    if reference['refType'] == 'CHILD_OF':
-                        # Callee
-                        pid = span['processID']
-                        service_name = process_ids[pid]
-                        operation_name = span['operationName']
-
-                        # Ignore GET-Requests or similar
-                        if re.search(self._call_string, operation_name):
-                            continue
-
-                        operation = self._services[service_name].operations[operation_name]
-
-                        # Caller
-                        parent_id = reference['spanID']
-                        parent_span = span_ids[parent_id]
-                        parent_pid = parent_span['processID']
-                        parent_service_name = process_ids[parent_pid]
-                        parent_operation_name = parent_span['operationName']
-
-                        latency = span['startTime'] - parent_span['startTime']
-                        add_latency = False
-
-                        # save start time and end time (needed for retry detection)
-                        start_time = span['startTime']
-                        end_time = start_time + span['duration']
-
-                        parent_operation = None
-
-                        # Handling of GET-Requests or similar.
-                        # What kind of spans are ignored is specified with the call_string pattern.
-                        # If the parent operation matches the pattern the true parent operation (the calling operation)
-                        # has to be the grandparent operation of the current operation.
-                        if re.search(self._call_string, parent_operation_name):
-                            for ref in parent_span['references']:
-                                if ref['refType'] == 'CHILD_OF':
-                                    grandparent_id = ref['spanID']
-                                    grandparent_span = span_ids[grandparent_id]
-                                    grandparent_pid = grandparent_span['processID']
-                                    grandparent_service_name = process_ids[grandparent_pid]
-                                    grandparent_operation_name = grandparent_span['operationName']
-                                    parent_operation = self._services[grandparent_service_name].operations[
-                                        grandparent_operation_name]
-                                    add_latency = True
-
-                                    # update start- and end time
-                                    start_time = parent_span['startTime']
-                                    end_time = start_time + parent_span['duration']
-
-                                    parent_span = grandparent_span
-                        else:
-                            parent_operation = self._services[parent_service_name].operations[parent_operation_name]
-
-                        if not parent_operation.contains_operation_as_dependency(operation):
-                            parent_operation.add_dependency(Dependency(operation))
-
-                        # add a custom latency to the dependency if the calling span is a GET-Request or similar
-                        if add_latency:
-                            parent_operation.get_dependency_with_operation(operation).add_latency(latency)
-
-                        # keep track of spans that call this operation in order to calculate probabilities later
-                        if not parent_operation.get_dependency_with_operation(operation).calling_spans.__contains__(
-                                parent_span):
-                            parent_operation.get_dependency_with_operation(operation).add_calling_span(parent_span)
-                            parent_operation.get_dependency_with_operation(operation).add_call()
-
-                        # add this call to the call history of the parent span in order to detect retries later
-                        tags = {tag['key']: tag['value'] for tag in span['tags']}
-                        parent_operation.retry.add_call_history_entry(
-                            parent_span['spanID'],
-                            {span['startTime']: (operation_name, tags.get('error', False), start_time, end_time)})
+                    # add a custom latency to the dependency if the calling span is a GET-Request or similar
+                    if add_latency:
+                        dependency.add_latency(latency)
 
-        self.subsequent_calculations()
+                    # keep track of spans that call this operation in order to calculate probabilities later
+                    parent_span_id = (parent_span.get('traceID', None), parent_span['spanID'])
+                    if parent_span_id not in dependency.calling_spans:
+                        dependency.add_calling_span(parent_span_id)
+                        dependency.add_call()
+
+                    # add this call to the call history of the parent span in order to detect retries later
+                    tags = {tag['key']: tag['value'] for tag in span['tags']}
+                    parent_operation.retry.add_call(parent_span['spanID'], span['startTime'], operation_name,
+                                                    tags.get('error', False), start_time, end_time)
 
         return True
 
@@ -196,6 +244,16 @@ class JaegerTrace(IModel):
             return self._parse_multiple(source)
         return False
 
+    def read_stream(self, source: Union[str, IO, dict] = None) -> bool:
+        if isinstance(source, str):
+            with open(source, 'r') as handle:
+                return self._parse_stream(iter_json_array(handle, 'data'))
+        elif isinstance(source, dict):
+            return self._parse_stream(source['data'])
+        elif hasattr(source, 'read'):
+            return self._parse_stream(iter_json_array(source, 'data'))
+        return False
+
     def read(self, source: Union[str, IO, dict] = None) -> bool:
         if isinstance(source, str):
             return self._parse(json.load(open(source, 'r')))
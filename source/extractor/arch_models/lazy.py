@@ -0,0 +1,29 @@
+from typing import Any, Callable
+
+
+class LazyAttributes:
+    """
+    Mixin for objects that are restored from a snapshot: Attributes registered with set_lazy are only loaded when they
+    are accessed for the first time. Afterwards they are plain attributes, so there is no overhead for normal access.
+    """
+
+    def set_lazy(self, name: str, loader: Callable[[], Any]):
+        self.__dict__.pop(name, None)
+        self.__dict__.setdefault('_lazy', {})[name] = loader
+
+    def __getattr__(self, name: str) -> Any:
+        # only called if the attribute does not exist
+        lazy = self.__dict__.get('_lazy', None)
+        if not lazy or name not in lazy:
+            raise AttributeError("'{}' object has no attribute '{}'".format(self.__class__.__name__, name))
+        value = lazy.pop(name)()
+        self.__dict__[name] = value
+        return value
+
+    def __getstate__(self):
+        # load everything, the loaders cannot be pickled
+        for name in list(self.__dict__.get('_lazy', {})):
+            getattr(self, name)
+        state = dict(self.__dict__)
+        state.pop('_lazy', None)
+        return state
@@ -1,4 +1,116 @@
-class LoadBalancer:
+from typing import Any, Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from extractor.arch_models.columns import Column, NONE
+from extractor.arch_models.lazy import LazyAttributes
+
+
+class InstanceHistory:
+    """
+    Append-only history of the instances that handled the requests of a service. Every request is kept, also requests
+    with equal timestamps. Timestamps and instances are stored in two columns, instances are encoded as integer codes.
+    The columns are sorted by timestamp once, when the history is read after new entries were added.
+    """
+
+    def __init__(self):
+        self._timestamps = Column()
+        self._codes = Column()
+        self._instances: List[Any] = []
+        self._instance_codes: Dict[Any, int] = {}
+        self._sorted = True
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    @property
+    def instances(self) -> List[Any]:
+        return self._instances
+
+    def _code(self, instance: Any) -> int:
+        code = self._instance_codes.get(instance)
+        if code is None:
+            code = len(self._instances)
+            self._instance_codes[instance] = code
+            self._instances.append(instance)
+        return code
+
+    def append(self, timestamp, instance):
+        self._timestamps.append(timestamp)
+        self._codes.append(self._code(instance))
+        self._sorted = False
+
+    def extend_arrays(self, timestamps: np.ndarray, instances: np.ndarray):
+        """
+        Appends the entries of two arrays of equal length at once, e.g. to build large histories without a call per
+        entry. New instances get their codes in the order of their first entry, like with append.
+        """
+        timestamps, instances = np.asarray(timestamps), np.asarray(instances)
+        if len(timestamps) != len(instances):
+            raise ValueError('{} timestamps, but {} instances'.format(len(timestamps), len(instances)))
+        if len(timestamps) == 0:
+            return
+        values, first, inverse = np.unique(instances, return_index=True, return_inverse=True)
+        codes = np.empty(len(values), dtype=np.int64)
+        for index in np.argsort(first, kind='stable'):
+            codes[index] = self._code(values[index].item())
+        self._timestamps.extend_array(timestamps)
+        self._codes.extend_array(codes[inverse.reshape(-1)])
+        self._sorted = False
+
+    def extend(self, other: 'InstanceHistory'):
+        """
+        Appends all entries of another history.
+        """
+        if len(other) == 0:
+            return
+        codes = np.array([self._code(instance) for instance in other.instances], dtype=np.int64)
+        self._codes.extend_array(codes[other.codes()])
+        self._timestamps.extend(other._timestamps)
+        self._sorted = False
+
+    def _sort(self):
+        if self._sorted:
+            return
+        order = np.argsort(self._timestamps.array(), kind='stable')
+        for column in (self._timestamps, self._codes):
+            values, states = column.data()
+            column.restore(values[order], states[order], len(column))
+        self._sorted = True
+
+    def timestamps(self) -> np.ndarray:
+        """
+        Returns the timestamps in ascending order.
+        """
+        self._sort()
+        return self._timestamps.array()
+
+    def codes(self) -> np.ndarray:
+        """
+        Returns the instance codes (indices into instances) ordered by timestamp.
+        """
+        self._sort()
+        return self._codes.array()
+
+    def items(self) -> Iterator[Tuple[Any, Any]]:
+        """
+        Returns all (timestamp, instance) entries ordered by timestamp.
+        """
+        self._sort()
+        timestamps = self._timestamps.array().tolist()
+        for row in np.flatnonzero(self._timestamps.data()[1] == NONE):
+            timestamps[row] = None
+        for timestamp, code in zip(timestamps, self._codes.array().tolist()):
+            yield timestamp, self._instances[code]
+
+    def memory_usage(self) -> int:
+        """
+        Returns the amount of bytes used by the columns (without the instance table).
+        """
+        return self._timestamps.nbytes + self._codes.nbytes
+
+
+class LoadBalancer(LazyAttributes):
     """
     Class that represents a load balancer for the incoming requests of a service. It stores the strategy, that can be
     set via tags in the traces.
@@ -7,16 +119,38 @@ class LoadBalancer:
 
     def __init__(self):
         self._strategy = None  # default strategy is None
-        self._instance_history = {}  # maps {timestamp: instance}
+        self._detected = False  # True if the strategy was detected from the instance history instead of set via tag
+        self._instance_history = InstanceHistory()
         self._allowed_error_percentage = 0.1
+        self._error_percentage = None  # share of errors in the history during the last round-robin detection
 
         # List with currently supported strategies
         self._valid_strategies = ["random", "round_robin", "round_robin_fast", "utilization", "even"]
 
+    def __setstate__(self, state: Dict[str, Any]):
+        # load balancers pickled before the instance history was columnar stored it as {timestamp: instance}
+        if isinstance(state.get('_instance_history'), dict):
+            state = dict(state)
+            history = InstanceHistory()
+            for timestamp, instance in state['_instance_history'].items():
+                history.append(timestamp, instance)
+            state['_instance_history'] = history
+            state.setdefault('_detected', False)
+            state.setdefault('_error_percentage', None)
+        self.__dict__.update(state)
+
     @property
     def strategy(self):
         return self._strategy
 
+    @property
+    def detected(self):
+        return self._detected
+
+    @property
+    def error_percentage(self):
+        return self._error_percentage
+
     @property
     def instance_history(self):
         return self._instance_history
@@ -24,13 +158,33 @@ class LoadBalancer:
     def set_strategy_with_tag(self, tag: str):
         if self._valid_strategies.__contains__(tag):
             self._strategy = tag
+            self._detected = False
 
     def add_instance_history_entry(self, timestamp, entry):
-        self._instance_history[timestamp] = entry
+        self._instance_history.append(timestamp, entry)
+
+    def merge(self, other: 'LoadBalancer'):
+        """
+        Adds the instance history of another load balancer of the same service. A strategy set via tag in the other
+        load balancer overrides the current one, like a tag in a later span would.
+        """
+        self._instance_history.extend(other.instance_history)
+        if other.strategy is not None:
+            self._strategy = other.strategy
+            self._detected = other.detected
 
     def set_allowed_error_percentage(self, percentage):
         self._allowed_error_percentage = percentage
 
+    # Returns the attributes that detect_round_robin_pattern sets, so the detection can run on a copy of this load
+    # balancer in another process and its results can be written back with set_detection_result.
+    def detection_result(self) -> Dict[str, Any]:
+        return {'_strategy': self._strategy, '_detected': self._detected, '_error_percentage': self._error_percentage}
+
+    def set_detection_result(self, result: Dict[str, Any]):
+        for name, value in result.items():
+            setattr(self, name, value)
+
     # This method tries to detect a round-robin load balancing strategy.
     # The algorithm has two states: One for detecting a possible pattern and another state for validating a pattern
     # The algorithm starts in the first state, and adds all instances to the pattern it can find until one instance
@@ -43,27 +197,15 @@ class LoadBalancer:
     # is increased.
     # This implementation allows for a less strict detection of a round-robin load balancing strategy, because it can
     # allow a certain amount of errors
+    # A strategy that was detected before is discarded first, so the detection can be repeated after the history grew.
     def detect_round_robin_pattern(self):
-        timestamps = sorted(self._instance_history.keys())
+        if self._detected:
+            self._strategy = None
+            self._detected = False
+        self._error_percentage = None
 
-        instances_in_order = []
-
-        last_occurrence = {}
-
-        for timestamp in timestamps:
-            instances_in_order.append(self._instance_history[timestamp])
-
-        index = 0
-        for instance in instances_in_order:
-            last_occurrence[instance] = index
-            index += 1
-
-        distinct_instances = set(instances_in_order)
-        instance_count = len(distinct_instances)
-
-        current_pattern_index = 0
-        round_robin_pattern = []
-        known_instances = []
+        instances_in_order = self._instance_history.codes()
+        instance_count = len(self._instance_history.instances)
 
         if not len(instances_in_order) > instance_count:
             # The amount of history entries is not large enough for an estimation
@@ -73,55 +215,80 @@ class LoadBalancer:
             # if there are less than two instances the load balancing strategy can not be determined
             return False
 
-        PATTERN_BUILD_UP = True
-        PATTERN_VALIDATION = False
+        error_count = LoadBalancer._count_round_robin_errors(instances_in_order, instance_count)
 
-        error_count = 0
+        self._error_percentage = error_count / len(instances_in_order)
+        if self._error_percentage <= self._allowed_error_percentage:
+            self._strategy = 'round_robin'
+            self._detected = True
+            return True
+        else:
+            return False
+
+    # Runs the two states of the detection on the encoded instances and returns the amount of errors.
+    # A pattern that was built up from the instances start .. index - 1 is the sequence of instances itself, so while
+    # the validation succeeds every instance equals the one a pattern length before it. The validation therefore only
+    # has to search for the first instance that differs from the one a pattern length before it, which is done on
+    # growing slices of the array instead of instance by instance.
+    @staticmethod
+    def _count_round_robin_errors(instances: np.ndarray, instance_count: int) -> int:
+        size = len(instances)
+        positions = np.arange(size)
+        first_occurrence = np.full(instance_count, size, dtype=np.int64)
+        np.minimum.at(first_occurrence, instances, positions)
+        last_occurrence = np.full(instance_count, -1, dtype=np.int64)
+        np.maximum.at(last_occurrence, instances, positions)
+        values = instances.tolist()
 
+        error_count = 0
         index = 0
-        for current_instance in instances_in_order:
-            if PATTERN_BUILD_UP:
-                # add instances to the pattern, as long as new instances occur in the history
-                if not round_robin_pattern.__contains__(current_instance):
-                    round_robin_pattern.append(current_instance)
+        while index < size:
+            # PATTERN_BUILD_UP: add instances to the pattern, as long as new instances occur in the history
+            start = index
+            round_robin_pattern = set()
+            while index < size:
+                current_instance = values[index]
+                if current_instance not in round_robin_pattern:
+                    round_robin_pattern.add(current_instance)
                 elif len(round_robin_pattern) == 1:
                     error_count += 1
-                    round_robin_pattern = []
-                    current_pattern_index = 0
-                else:
-                    PATTERN_BUILD_UP = False
-                    PATTERN_VALIDATION = True
-
-            if PATTERN_VALIDATION:
-                # validate the current pattern
-                expected_instance = round_robin_pattern[current_pattern_index % len(round_robin_pattern)]
-                if expected_instance == current_instance:
-                    # expected instance occurred
-                    current_pattern_index += 1
+                    round_robin_pattern = set()
+                    start = index + 1
                 else:
-                    # an unexpected instance occurred, the state gets reset to PATTERN_BUILD_UP
-                    PATTERN_BUILD_UP = True
-                    PATTERN_VALIDATION = False
-
-                    if known_instances.__contains__(current_instance) and last_occurrence[expected_instance] > index:
-                        # the unexpected instance is already known and the expected instance is still alive, so
-                        # it appeared at the wrong place and an error has to get tracked.
-                        # If this is not true, it is either the first appearance of this instance (up-scaling) or the
-                        # last occurrence of the instance already happened (down-scaling). In both cases we do not want
-                        # to track errors because those Situations do not violate a round-robin pattern
-                        error_count += 1
+                    break
+                index += 1
+            if index >= size:
+                break
 
-                    round_robin_pattern = []
-                    current_pattern_index = 0
-
-            if not known_instances.__contains__(current_instance):
-                known_instances.append(current_instance)
+            # PATTERN_VALIDATION: validate the current pattern, starting with the instance that caused the switch
+            pattern_length = index - start
+            index = LoadBalancer._first_mismatch(instances, index, pattern_length)
+            if index >= size:
+                break
 
+            # an unexpected instance occurred, the state gets reset to PATTERN_BUILD_UP
+            expected_instance = values[index - pattern_length]
+            if first_occurrence[values[index]] < index and last_occurrence[expected_instance] > index:
+                # the unexpected instance is already known and the expected instance is still alive, so
+                # it appeared at the wrong place and an error has to get tracked.
+                # If this is not true, it is either the first appearance of this instance (up-scaling) or the
+                # last occurrence of the instance already happened (down-scaling). In both cases we do not want
+                # to track errors because those Situations do not violate a round-robin pattern
+                error_count += 1
             index += 1
 
-        error_percentage = error_count / len(instances_in_order)
-        if error_percentage <= self._allowed_error_percentage:
-            self._strategy = 'round_robin'
-            return True
-        else:
-            return False
+        return error_count
+
+    # Returns the first index from the given index on, whose instance differs from the one a pattern length before it.
+    @staticmethod
+    def _first_mismatch(instances: np.ndarray, index: int, pattern_length: int) -> int:
+        size = len(instances)
+        step = 64
+        while index < size:
+            end = min(size, index + step)
+            mismatches = np.flatnonzero(instances[index:end] != instances[index - pattern_length:end - pattern_length])
+            if len(mismatches) > 0:
+                return index + int(mismatches[0])
+            index = end
+            step *= 2
+        return size
@@ -1,10 +1,15 @@
-from typing import Union, Dict, Tuple, List, Any
+import math
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, Future
+from typing import Union, Dict, Tuple, List, Any, Iterable, Iterator
 from typing import IO
-import pandas as pd
 
+from extractor.arch_models.call_filter import CallFilter
 from extractor.arch_models.hazard import *
+from extractor.arch_models.hazard_analysis import DurationStatistics
 from extractor.arch_models.operation import Operation
 from extractor.arch_models.service import Service
+from extractor.arch_models.span_store import TagPool
 from util.log import tb
 
 
@@ -48,17 +53,29 @@ class IModel:
     IModel provides a validation method that checks for validity of the model.
     This validation checks the semantic of the model.
     """
-    def __init__(self, model_type: str, source: Union[str, IO] = None, multiple: bool = False, pattern: str = None):
+    # Amount of chunks per worker a list of traces is split into for parallel parsing.
+    CHUNKS_PER_WORKER = 4
+    # Amount of traces per chunk if the traces are streamed and their total amount is unknown.
+    STREAM_CHUNK_SIZE = 64
+
+    def __init__(self, model_type: str, source: Union[str, IO] = None, multiple: bool = False, pattern: str = None,
+                 streaming: bool = False, workers: int = 1):
         self._model_type = model_type
         self._services = {}
         self._valid = False
         self._hazards = {}
         self._stimuli = []
         self._call_string = pattern
+        self._call_filter = CallFilter(pattern)
+        self._workers = max(1, workers or 1)
+        # interning table for the tags of all services and operations
+        self._tag_pool = TagPool()
 
         if source:
             try:
-                if multiple:
+                if streaming:
+                    success = self.read_stream(source)
+                elif multiple:
                     success = self.read_multiple(source)
                 else:
                     success = self.read(source)
@@ -69,6 +86,32 @@ class IModel:
                 print(tb(e))
                 print('Something went wrong')
 
+    def __setstate__(self, state: Dict[str, Any]):
+        self.__dict__.update(state)
+        if '_tag_pool' not in state:
+            self._migrate()
+
+    def _migrate(self):
+        """
+        Completes a model that was pickled before the call filter, the parallel parsing and the tag pool existed. The
+        services and operations migrate themselves while they are unpickled, only the parts that need the whole model
+        are done here, once all of them are restored.
+        """
+        self._call_filter = CallFilter(self._call_string)
+        self._workers = 1
+        self._tag_pool = TagPool()
+        for service in self._services.values():
+            service.tags = self._tag_pool.tags(service.tags)
+            for operation in service.operations.values():
+                self._tag_pool.intern(operation.tags)
+                self._tag_pool.intern(operation.logs)
+                operation.rebuild_dependency_index()
+
+        # new services and operations must not reuse the ids of the restored ones
+        Service.ID = max([Service.ID] + [service.id + 1 for service in self._services.values()])
+        Operation.ID = max([Operation.ID] + [operation.id + 1 for service in self._services.values()
+                                             for operation in service.operations.values()])
+
     def __iter__(self):
         return iter(self._services)
 
@@ -92,8 +135,17 @@ class IModel:
     def call_string(self):
         return self._call_string
 
+    @property
+    def tag_pool(self) -> TagPool:
+        return self._tag_pool
+
+    @property
+    def call_filter(self) -> CallFilter:
+        return self._call_filter
+
     def set_call_string(self, call_pattern):
         self._call_string = call_pattern
+        self._call_filter = CallFilter(call_pattern)
 
     @hazards.setter
     def hazards(self, hazards: Dict[str, List[Hazard]]):
@@ -107,26 +159,174 @@ class IModel:
     def _parse(self, model: Dict[str, Any]) -> bool:
         raise NotImplementedError('_parse() method must be implemented!')
 
+    def _parse_traces(self, traces: List[Any]) -> bool:
+        """
+        Adds independent traces to the model without running the subsequent calculations.
+        This is the unit of work that gets distributed for parallel parsing.
+        """
+        raise NotImplementedError('_parse_traces() method must be implemented!')
+
+    def _set_default_call_string(self):
+        pass
+
+    def _batch_traces(self, batch: Any) -> List[Any]:
+        """
+        Returns the independent traces of a batch that is passed to ingest().
+        """
+        return batch
+
+    def _parse_all(self, traces: Iterable[Any]) -> bool:
+        if self._workers > 1:
+            return self._parse_parallel(traces)
+        return self._parse_traces(traces if isinstance(traces, list) else list(traces))
+
+    def _parse_parallel(self, traces: Iterable[Any]) -> bool:
+        """
+        Parses chunks of traces into partial models in a process pool and merges them into this model in the order of
+        the traces. At most two chunks per worker are in flight, so streamed traces are not read ahead completely.
+        """
+        if isinstance(traces, list):
+            chunk_size = max(1, math.ceil(len(traces) / (self._workers * IModel.CHUNKS_PER_WORKER)))
+        else:
+            chunk_size = IModel.STREAM_CHUNK_SIZE
+
+        with ProcessPoolExecutor(max_workers=self._workers) as executor:
+            pending = deque()
+            for chunk in _chunks(traces, chunk_size):
+                pending.append(executor.submit(_parse_partial, self.__class__, chunk, self._call_string))
+                if len(pending) >= self._workers * 2 and not self._merge_result(pending.popleft()):
+                    return False
+            while pending:
+                if not self._merge_result(pending.popleft()):
+                    return False
+        return True
+
+    def _merge_result(self, future: Future) -> bool:
+        success, partial = future.result()
+        if success:
+            self.merge(partial)
+        return success
+
     # Public
 
-    def subsequent_calculations(self):
+    def merge(self, partial: 'IModel'):
+        """
+        Merges a partial model, which was built from other traces, into this model.
+        The services and operations are merged first, so the dependencies of the partial model can be resolved against
+        the operations of this model afterwards. Probabilities, retries and load balancing strategies are not merged,
+        subsequent_calculations has to be called once all partial models are merged.
+        """
+        # the partial model was parsed with its own tag pool
+        for service in partial.services.values():
+            service.tags = self._tag_pool.tags(service.tags)
+            for operation in service.operations.values():
+                self._tag_pool.intern(operation.tags)
+                self._tag_pool.intern(operation.logs)
+
+        for name, service in partial.services.items():
+            if name not in self._services:
+                self._services[name] = Service(name)
+            self._services[name].merge(service)
+
+        for name, service in partial.services.items():
+            for operation in service.operations.values():
+                self._services[name].operations[operation.name].merge_dependencies(operation, self._services)
+
+    def save(self, path: str):
+        """
+        Stores the model in the binary snapshot format (see snapshot.py), which can be reloaded with IModel.load.
+        """
+        from extractor.arch_models import snapshot
+        snapshot.save(self, path)
+
+    @staticmethod
+    def load(path: str) -> 'IModel':
+        """
+        Loads a model from a snapshot file. The span data is memory-mapped and decoded on access.
+        """
+        from extractor.arch_models import snapshot
+        return snapshot.load(path)
+
+    def subsequent_calculations(self, workers: int = None):
         """
         This method executes two subsequent operations that need to be done one the finished generic model:
         It calculates all the probabilities of the dependencies and calls the retry-detection method of each
         operation. Furthermore, for each service that has no load balancing strategy set via a tag yet, the
         round-robin detection method is called.
+        @param workers: Size of the process pool for the retry- and round-robin detection. Defaults to the amount of
+                        workers the model was created with.
         """
-        for service in self.services.values():
-            if service.load_balancer.strategy is None:
-                service.load_balancer.detect_round_robin_pattern()
+        self._update_calculations({name: service.operations.keys() for name, service in self._services.items()},
+                                  workers)
 
-            for operation in service.operations.values():
-                # call the retry-detection method of each operation
-                operation.retry.detect_retry()
+    def _update_calculations(self, affected: Dict[str, Iterable[str]], workers: int = None):
+        """
+        Runs the subsequent calculations for the given services and operations only.
+        The detections are independent per service and per operation, so with more than one worker they run in a
+        process pool: The load balancers and retries are shipped to the workers, which send back the detection results.
+        @param affected:    Maps {service name: [operation names]}.
+        @param workers:     Size of the process pool, defaults to the amount of workers the model was created with.
+        """
+        load_balancers = []
+        retries = []
+        for service_name, operation_names in affected.items():
+            service = self._services[service_name]
+            # a strategy that was detected earlier is detected again, because the instance history might have changed
+            if service.load_balancer.strategy is None or service.load_balancer.detected:
+                load_balancers.append(service.load_balancer)
+
+            for operation_name in operation_names:
+                operation = service.operations[operation_name]
+                # the retry-detection only has to run for operations with new calls
+                if operation.retry.has_new_calls():
+                    retries.append(operation.retry)
                 for dependency in operation.dependencies:
                     # iterate through all dependencies and call the method for calculating the probability
                     dependency.calculate_probability(len(operation.spans))
 
+        workers = max(1, workers or self._workers)
+        if workers > 1 and len(load_balancers) + len(retries) > 1:
+            self._detect_parallel(load_balancers, retries, workers)
+        else:
+            _detect_load_balancers(load_balancers)
+            _detect_retries(retries)
+
+    @staticmethod
+    def _detect_parallel(load_balancers: List[Any], retries: List[Any], workers: int):
+        """
+        Runs the round-robin and retry detection in a process pool and writes the results back in place.
+        """
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = []
+            for objects, detect in ((load_balancers, _detect_load_balancers), (retries, _detect_retries)):
+                chunk_size = max(1, math.ceil(len(objects) / (workers * IModel.CHUNKS_PER_WORKER)))
+                for chunk in _chunks(objects, chunk_size):
+                    futures.append((chunk, executor.submit(detect, chunk)))
+
+            for chunk, future in futures:
+                for detected, result in zip(chunk, future.result()):
+                    detected.set_detection_result(result)
+
+    def ingest(self, batch: Any) -> bool:
+        """
+        Folds a batch of new traces into this model. The batch is parsed into a partial model, which gets merged into
+        this model. Afterwards only the services and operations that occur in the batch are recalculated: the
+        probabilities of their dependencies, their retry sequences (only of the spans with new calls) and the
+        round-robin detection of their load balancers. Every trace has to be complete within a single batch.
+        @param batch:   New traces in the format read() accepts for this model (already loaded), or a list of traces.
+        @return:        True if the batch was parsed successfully. Otherwise, the model stays unchanged.
+        """
+        self._set_default_call_string()
+
+        partial = self.__class__(pattern=self._call_string, workers=self._workers)
+        if not partial._parse_all(partial._batch_traces(batch)):
+            return False
+
+        self.merge(partial)
+        self._update_calculations({name: list(service.operations.keys())
+                                   for name, service in partial.services.items()})
+        return True
+
     def validate(self, check_everything=False) -> Tuple[bool, List[BaseException]]:
         valid = True
         stack = []
@@ -169,35 +369,34 @@ class IModel:
         stack = {}
 
         try:
-            for _, service in self._services.items():
-                for _, operation in service.operations.items():
-                    series = pd.Series(operation.durations.values())
-                    stack[operation.name] = []
-
-                    # Filter outliers by 3 times standard deviation
-                    filtered = series[~((series-series.mean()).abs() > series.std() * ResponseTimeSpike.DEVIATION_FACTOR)]
-                    diff = 1 - filtered.min() / filtered.max()
-
-                    # Min and Max response times differ by at least 50%
-                    if diff > ResponseTimeDeviation.DEVIATION_INTERVAL:
-                        stack[operation.name].append(ResponseTimeDeviation(operation, diff))
-
-                    # At least one outlier detected
-                    if len(filtered) < len(series):
-                        # Spike workload
-                        deviation = filtered.max() - series.max()
-                        if deviation > 0:
-                            stack[operation.name].append(ResponseTimeSpike(operation, deviation))
-
-            for _, service in self._services.items():
-                for _, operation in service.operations.items():
-                    if operation.name in stack:
-                        if len(stack[operation.name]) > 0:
-                            for hazard in stack[operation.name]:
-                                if isinstance(hazard, ResponseTimeSpike):
-                                    stack[service.name].append(ServiceFailure(service))
-                                elif isinstance(hazard, ResponseTimeDeviation):
-                                    stack[service.name].append(DecreasedServicePerformance(service))
+            operations = [(service, operation)
+                          for service in self._services.values() for operation in service.operations.values()]
+            # Filter outliers by 3 times standard deviation, for all operations at once
+            statistics = DurationStatistics.of([operation for _, operation in operations])
+            deviations = statistics.deviation
+            spikes = statistics.spike
+
+            for i, (_, operation) in enumerate(operations):
+                stack[operation.name] = []
+
+                # Min and Max response times differ by at least 50%
+                if deviations[i] > ResponseTimeDeviation.DEVIATION_INTERVAL:
+                    stack[operation.name].append(ResponseTimeDeviation(operation, deviations[i]))
+
+                # At least one outlier detected
+                if statistics.filtered_counts[i] < statistics.counts[i]:
+                    # Spike workload
+                    if spikes[i] > 0:
+                        stack[operation.name].append(ResponseTimeSpike(operation, spikes[i]))
+
+            for service, operation in operations:
+                if operation.name in stack:
+                    if len(stack[operation.name]) > 0:
+                        for hazard in stack[operation.name]:
+                            if isinstance(hazard, ResponseTimeSpike):
+                                stack[service.name].append(ServiceFailure(service))
+                            elif isinstance(hazard, ResponseTimeDeviation):
+                                stack[service.name].append(DecreasedServicePerformance(service))
 
             return stack
         except BaseException as e:
@@ -213,3 +412,46 @@ class IModel:
 
     def read(self, source: Union[str, IO]) -> bool:
         raise NotImplementedError('read() method must be implemented!')
+
+    def read_stream(self, source: Union[str, IO]) -> bool:
+        """
+        Reads the source trace by trace instead of loading the whole document at once.
+        """
+        raise NotImplementedError('read_stream() method must be implemented!')
+
+
+def _chunks(traces: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    chunk = []
+    for trace in traces:
+        chunk.append(trace)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _parse_partial(model_class: type, traces: List[Any], pattern: str) -> Tuple[bool, IModel]:
+    """
+    Runs in a worker process: Parses a chunk of traces into a fresh, partial model of the given class.
+    """
+    partial = model_class(pattern=pattern)
+    return partial._parse_traces(traces), partial
+
+
+def _detect_load_balancers(load_balancers: List[Any]) -> List[Dict[str, Any]]:
+    """
+    Runs the round-robin detection of the given load balancers, also in a worker process.
+    """
+    for load_balancer in load_balancers:
+        load_balancer.detect_round_robin_pattern()
+    return [load_balancer.detection_result() for load_balancer in load_balancers]
+
+
+def _detect_retries(retries: List[Any]) -> List[Dict[str, Any]]:
+    """
+    Runs the retry-detection of the given retries, also in a worker process.
+    """
+    for retry in retries:
+        retry.detect_retry()
+    return [retry.detection_result() for retry in retries]
@@ -15,14 +15,20 @@ from extractor.arch_models.service import Service
 
 class OpenXTrace(IModel):
 
-    def __init__(self, source: Union[str, IO, list] = None, multiple: bool = False, pattern: str = None):
-        super().__init__(self.__class__.__name__, source, multiple, pattern)
+    def __init__(self, source: Union[str, IO, list] = None, multiple: bool = False, pattern: str = None,
+                 workers: int = 1):
+        super().__init__(self.__class__.__name__, source, multiple, pattern, workers=workers)
 
     def _parse(self, model: List[Dict[str, Any]]) -> bool:
-        for span in model:
+        if not self._parse_all(model):
+            return False
+        self.subsequent_calculations()
+        return True
+
+    def _parse_traces(self, traces: List[Dict[str, Any]]) -> bool:
+        for span in traces:
             span = span.get('rootOfTrace', {})
             self._parse_span(span)
-        self.subsequent_calculations()
         return True
 
     def _parse_span(self, model: List[Dict[str, Any]]) -> Tuple[Operation, int]:
@@ -41,7 +47,7 @@ class OpenXTrace(IModel):
 
         if service_name not in self._services:
             service = Service(service_name)
-            service.tags = { "serviceName" : service_name, "ipv4" : host}
+            service.tags = self._tag_pool.tags({"serviceName": service_name, "ipv4": host})
             service.add_host(host)
             self._services[service_name] = service
         elif not self._services[service_name].hosts.__contains__(host):
@@ -58,21 +64,21 @@ class OpenXTrace(IModel):
             child_id = dependency[1]
             child_latency = child_dependency.latency[child_id]
             #add retry parameter
-            operation.retry.add_call_history_entry(
-                    operation_id,
-                    {child_dependency.timestamp[child_id]: (child_dependency.name, child_dependency.error[child_id], child_dependency.starttime[child_id], child_dependency.endtime[child_id])})
-            if not operation.contains_operation_as_dependency(child_dependency):
+            operation.retry.add_call(operation_id, child_dependency.timestamp[child_id], child_dependency.name,
+                                     child_dependency.error[child_id], child_dependency.starttime[child_id],
+                                     child_dependency.endtime[child_id])
+            tmp = operation.get_dependency_with_operation(child_dependency)
+            if tmp is None:
                 tmp = Dependency(child_dependency)
                 operation.add_dependency(tmp)
                 if latency != None:
                     tmp.add_latency(child_latency)
             elif latency != None:
-                operation.get_dependency_with_operation(child_dependency).add_latency(latency)
+                tmp.add_latency(latency)
                     
-            if not operation.get_dependency_with_operation(child_dependency).calling_spans.__contains__(
-                        operation_id):
-                operation.get_dependency_with_operation(child_dependency).add_calling_span(operation_id)
-                operation.get_dependency_with_operation(child_dependency).add_call()
+            if operation_id not in tmp.calling_spans:
+                tmp.add_calling_span(operation_id)
+                tmp.add_call()
         return operation, operation_id
 
     # checks if a circuitBreaker pattern exists and adds it to the operation
@@ -137,8 +143,8 @@ class OpenXTrace(IModel):
         if (not "http.path" in tags) and httppath != "":
             tags["http.path"]= httppath
         # sort tags
-        operation.tags[identifier] = OrderedDict(sorted(tags.items(), key=lambda t: t[0]))
-        operation.logs[identifier] = {}
+        operation.tags[identifier] = self._tag_pool.tags(OrderedDict(sorted(tags.items(), key=lambda t: t[0])))
+        operation.logs[identifier] = self._tag_pool.tags({})
 
         return operation, identifier
 
@@ -174,10 +180,7 @@ class OpenXTrace(IModel):
         self._services[service_name].load_balancer.add_instance_history_entry(timestamp, host)
         # store the response time (duration) of the operation
         if duration != -1:
-            if operation.response_times.keys().__contains__(host):
-                operation.response_times[host].append((timestamp, duration))
-            else:
-                operation.response_times[host] = [(timestamp, duration)]
+            operation.add_response_time(host, timestamp, duration)
 
         if duration != None:
             operation.durations[identifier] = duration
@@ -1,7 +1,9 @@
-from typing import Dict, List
+from types import MappingProxyType
+from typing import Dict, List, Mapping
 from extractor.arch_models.circuit_breaker import CircuitBreaker
 from extractor.arch_models.dependency import Dependency
 from extractor.arch_models.retry import Retry
+from extractor.arch_models.span_store import SpanColumn, SpanIds, SpanStore
 
 
 class Operation:
@@ -11,27 +13,61 @@ class Operation:
         self._id = Operation.ID
         self._name = name
         self._dependencies: [Dependency] = []
+        # maps {(service name, operation name): dependency} for constant time lookups, the list keeps the order
+        self._dependency_index = {}
         self._service = None
         self._circuit_breaker = None
         self._demand = 100
-        self._spans = set()
         self._retry = Retry()
 
-        # stores {host1 :  [(timestamp1, response time 1), (timestamp2, response time 2), ...], host2: [(..),..], ...}
-        self._response_times = {}
-
-        # Runtime 
-        self._durations = {}
-        self._latency = {}
-        self._starttime = {}
-        self._endtime = {}
-        self._error = {}
-        self._timestamp = {}
-        self._tags = {}
-        self._logs = {}
+        # Runtime data of all spans, including the response times of each host
+        self._store = SpanStore()
+        self._durations = self._store.view('durations')
+        self._latency = self._store.view('latency')
+        self._starttime = self._store.view('starttime')
+        self._endtime = self._store.view('endtime')
+        self._timestamp = self._store.view('timestamp')
 
         Operation.ID += 1
 
+    def __setstate__(self, state: Dict):
+        if '_store' not in state:
+            state = Operation._migrate_state(state)
+        self.__dict__.update(state)
+
+    @staticmethod
+    def _migrate_state(state: Dict) -> Dict:
+        """
+        Converts the state of an operation that was pickled before the runtime data was moved into a span store: the
+        spans, runtime fields and response times were dicts of the operation. The dependency index is rebuilt by the
+        model once all objects are restored.
+        """
+        state = dict(state)
+        store = SpanStore()
+        for span_id in state.pop('_spans', ()):
+            store.add_span(span_id)
+        for field in SpanStore.FIELDS:
+            view = store.view(field)
+            for span_id, value in state.pop('_' + field, {}).items():
+                view[span_id] = value
+        store.error.update(state.pop('_error', {}))
+        store.tags.update(state.pop('_tags', {}))
+        store.logs.update(state.pop('_logs', {}))
+        for host, response_times in state.pop('_response_times', {}).items():
+            for timestamp, duration in response_times:
+                store.add_response_time(host, timestamp, duration)
+
+        state['_store'] = store
+        for field in SpanStore.FIELDS:
+            state['_' + field] = store.view(field)
+        state['_dependency_index'] = {}
+        return state
+
+    def rebuild_dependency_index(self):
+        self._dependency_index = {}
+        for dependency in self._dependencies:
+            self._dependency_index.setdefault(Operation._dependency_key(dependency), dependency)
+
     def __repr__(self) -> str:
         if self._service:
             return '{} {} ({}/{})'.format(self.__class__.__name__, self._id, self._service.name, self._name)
@@ -65,48 +101,57 @@ class Operation:
         return self._dependencies
 
     @property
-    def response_times(self) -> Dict:
-        return self._response_times
+    def response_times(self) -> Mapping:
+        """
+        Returns {host1 :  ((timestamp1, response time 1), (timestamp2, response time 2), ...), host2: ((..),..), ...}.
+        The mapping is a read-only copy that is built from the span store on every access. Use add_response_time to add
+        entries and store.response_time_arrays to compute with them.
+        """
+        return MappingProxyType(self._store.response_times())
+
+    @property
+    def store(self) -> SpanStore:
+        return self._store
 
     @property
     def demand(self):
         return self._demand
 
     @property
-    def durations(self) -> Dict:
+    def durations(self) -> SpanColumn:
         return self._durations
 
     @property
-    def latency(self) -> Dict:
+    def latency(self) -> SpanColumn:
         return self._latency
 
     @property
-    def starttime(self) -> Dict:
+    def starttime(self) -> SpanColumn:
         return self._starttime
 
     @property
-    def endtime(self) -> Dict:
+    def endtime(self) -> SpanColumn:
         return self._endtime
 
     @property
     def error(self) -> Dict:
-        return self._error
+        return self._store.error
 
     @property
-    def timestamp(self) -> Dict:
+    def timestamp(self) -> SpanColumn:
         return self._timestamp
 
     @property
     def logs(self) -> Dict[str, Dict]:
-        return self._logs
+        return self._store.logs
 
     @property
     def circuit_breaker(self) -> CircuitBreaker:
         return self._circuit_breaker
 
     @property
-    def spans(self):
-        return self._spans
+    def spans(self) -> SpanIds:
+        return self._store.spans
 
     @property
     def retry(self):
@@ -114,47 +159,87 @@ class Operation:
 
     @logs.setter
     def logs(self, logs: Dict[str, Dict]):
-        self._logs = logs
+        self._store.logs = logs
 
     @property
     def tags(self) -> Dict[str, Dict]:
-        return self._tags
+        return self._store.tags
 
     @tags.setter
     def tags(self, tags: Dict[str, Dict]):
-        self._tags = tags
+        self._store.tags = tags
 
     def print(self):
         print(self)
 
     def add_dependency(self, dependency):
         self._dependencies.append(dependency)
+        self._dependency_index.setdefault(Operation._dependency_key(dependency), dependency)
 
     def add_dependencies(self, dependencies: List):
-        self._dependencies.extend(dependencies)
+        for dependency in dependencies:
+            self.add_dependency(dependency)
 
     def remove_dependency(self, dependency):
         self._dependencies.remove(dependency)
+        self._update_dependency_index(dependency)
 
     def remove_dependencies(self, dependencies: List):
         for dependency in dependencies:
-            self._dependencies.remove(dependency)
+            self.remove_dependency(dependency)
 
     def contains_operation_as_dependency(self, operation):
-        for dependency in self._dependencies:
-            if dependency.name == operation.name and dependency.service == operation.service:
-                return True
-        return False
+        return Operation._dependency_key(operation) in self._dependency_index
 
     def get_dependency_with_operation(self, operation):
-        for dependency in self._dependencies:
-            if dependency.name == operation.name and dependency.service == operation.service:
-                return dependency
-        return None
+        return self._dependency_index.get(Operation._dependency_key(operation), None)
 
     def remove_dependency_with_duplicates(self, dependency):
         while self._dependencies.__contains__(dependency):
             self._dependencies.remove(dependency)
+        self._update_dependency_index(dependency)
+
+    @staticmethod
+    def _dependency_key(operation) -> tuple:
+        """
+        Dependencies and operations share the name and service properties, so both can be used to build the key.
+        """
+        service = operation.service
+        return service.name if service is not None else None, operation.name
+
+    def _update_dependency_index(self, dependency):
+        """
+        Points the key of a removed dependency to the first remaining dependency with the same operation, if any.
+        """
+        key = Operation._dependency_key(dependency)
+        self._dependency_index.pop(key, None)
+        for remaining in self._dependencies:
+            if Operation._dependency_key(remaining) == key:
+                self._dependency_index[key] = remaining
+                break
+
+    def merge(self, other):
+        """
+        Adds the runtime data of the same operation in a partial model that was built from other traces.
+        Dependencies are merged separately with merge_dependencies, once all operations are known.
+        """
+        self._store.merge(other.store)
+        if self._circuit_breaker is None:
+            self._circuit_breaker = other.circuit_breaker
+        self._retry.merge(other.retry)
+
+    def merge_dependencies(self, other, services: Dict):
+        """
+        Adds the dependencies of the same operation in a partial model. The dependencies are resolved against the
+        given services, so they point to the operations of this model instead of the partial one.
+        """
+        for dependency in other.dependencies:
+            operation = services[dependency.service.name].operations[dependency.name]
+            own_dependency = self.get_dependency_with_operation(operation)
+            if own_dependency is None:
+                own_dependency = Dependency(operation)
+                self.add_dependency(own_dependency)
+            own_dependency.merge(dependency)
 
     def add_circuit_breaker(self, circuitBreaker: CircuitBreaker):
         self._circuit_breaker = circuitBreaker
@@ -163,4 +248,7 @@ class Operation:
         self._demand = demand
 
     def add_span(self, span):
-        self._spans.add(span)
+        self._store.add_span(span)
+
+    def add_response_time(self, host: str, timestamp, duration):
+        self._store.add_response_time(host, timestamp, duration)
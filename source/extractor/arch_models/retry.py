@@ -1,10 +1,15 @@
 import sys
 import warnings
 from copy import copy
+from typing import Any, Dict, List, Tuple
+
 import numpy as np
 import scipy.optimize
 from scipy.optimize import OptimizeWarning
 
+from extractor.arch_models.columns import Column, NONE
+from extractor.arch_models.lazy import LazyAttributes
+
 # Threshold that is used to detect if the retry sequence has reached the maximum backoff value
 MAX_BACKOFF_DETECTION_THRESHOLD = 0.01
 
@@ -87,8 +92,41 @@ class RetrySequence:
 
     # Tries to estimate all parameters of the function that was used to for the time intervals between the retries
     def estimate_parameters(self):
+        y = self.prepare_estimation()
+        if y is not None:
+            self.fit(y)
+
+    # Fits a linear and an exponential function to the time intervals with curve_fit and uses the better one.
+    def fit(self, y):
         warnings.simplefilter("ignore", OptimizeWarning)
 
+        x = [i for i in range(0, len(y))]
+
+        # try to fit a linear and an exponential function to the data points
+        result_linear, _ = scipy.optimize.curve_fit(assume_linear, x, y, p0=(0, y[0]))
+        result_exponential, _ = scipy.optimize.curve_fit(assume_exponential, x, y, p0=(0, y[0]))
+
+        # calculate the estimated values at the corresponding time steps
+        estimates_exponential = np.array(
+            [assume_exponential(xi, result_exponential[0], result_exponential[1]) for xi in x])
+        estimates_linear = np.array([assume_linear(xi, result_linear[0], result_linear[1]) for xi in x])
+
+        # calculate the mean squared error for both estimations
+        error_exp = np.square(y - estimates_exponential)
+        error_lin = np.square(y - estimates_linear)
+        mse_exp = np.mean(error_exp)
+        mse_lin = np.mean(error_lin)
+
+        # Use the estimation that has the smaller error
+        if mse_exp < mse_lin:
+            self.set_estimate("exponential", result_exponential, mse_exp,
+                              estimates_exponential[len(estimates_exponential) - 1])
+        else:
+            self.set_estimate("linear", result_linear, mse_lin, estimates_linear[len(estimates_linear) - 1])
+
+    # Extracts the time intervals (in seconds) that the functions get fitted to. Sequences with less than two intervals
+    # are estimated right away, None is returned for them.
+    def prepare_estimation(self):
         y = self.get_timings_from_sequence()
         y = [y_i / 1000000 for y_i in y]
         old_y = copy(y)
@@ -116,9 +154,9 @@ class RetrySequence:
                     error_lin = np.square(old_y - self._maxBackoff)
                     mse_lin = np.mean(error_lin)
                     self._error = mse_lin
-                    return
+                    return None
                 else:
-                    return
+                    return None
             elif len(y) == 1:
                 if self._maxBackoff is None:
                     # Only one data point available, assuming a constant backoff strategy
@@ -131,48 +169,25 @@ class RetrySequence:
                     if self._baseBackoff > MISIM_DEFAULT_MAX_BACKOFF:
                         self._maxBackoff = y[0]
 
-                    return
+                    return None
                 else:
                     # One data point and a max backoff available, continue with estimation with those two points.
                     # This will, however lead to an uncertain result
                     y.append(self._maxBackoff)
 
-        x = [i for i in range(0, len(y))]
-
-        # try to fit a linear and an exponential function to the data points
-        result_linear, _ = scipy.optimize.curve_fit(assume_linear, x, y, p0=(0, y[0]))
-        result_exponential, _ = scipy.optimize.curve_fit(assume_exponential, x, y, p0=(0, y[0]))
-
-        # calculate the estimated values at the corresponding time steps
-        estimates_exponential = np.array(
-            [assume_exponential(xi, result_exponential[0], result_exponential[1]) for xi in x])
-        estimates_linear = np.array([assume_linear(xi, result_linear[0], result_linear[1]) for xi in x])
-
-        # calculate the mean squared error for both estimations
-        error_exp = np.square(y - estimates_exponential)
-        error_lin = np.square(y - estimates_linear)
-        mse_exp = np.mean(error_exp)
-        mse_lin = np.mean(error_lin)
+        return y
 
-        # Use the estimation that has the smaller error
-        if mse_exp < mse_lin:
-            self._strategy = "exponential"
-            self._base = result_exponential[0]
-            self._baseBackoff = result_exponential[1]
-            self._error = mse_exp
-
-            if self._maxBackoff is None and (estimates_exponential[len(estimates_exponential) - 1] > MISIM_DEFAULT_MAX_BACKOFF):
-                # update maxBackoff to maximum calculated wait time if it is higher than the MiSim default.
-                self._maxBackoff = estimates_exponential[len(estimates_exponential) - 1]
-        else:
-            self._strategy = "linear"
-            self._base = result_linear[0]
-            self._baseBackoff = result_linear[1]
-            self._error = mse_lin
+    # Sets the parameters of the estimation with the smaller error.
+    # last_estimate is the estimated wait time of the last retry of the sequence.
+    def set_estimate(self, strategy, parameters, error, last_estimate):
+        self._strategy = strategy
+        self._base = parameters[0]
+        self._baseBackoff = parameters[1]
+        self._error = error
 
-            if self._maxBackoff is None and (estimates_linear[len(estimates_linear) - 1] > MISIM_DEFAULT_MAX_BACKOFF):
-                # update maxBackoff to maximum calculated wait time if it is higher than the MiSim default.
-                self._maxBackoff = estimates_linear[len(estimates_linear) - 1]
+        if self._maxBackoff is None and (last_estimate > MISIM_DEFAULT_MAX_BACKOFF):
+            # update maxBackoff to maximum calculated wait time if it is higher than the MiSim default.
+            self._maxBackoff = last_estimate
 
         if self._sequence[len(self._sequence) - 1][2]:
             # if the sequence ends with an error, the maximum amount of retry attempts has been reached
@@ -195,15 +210,290 @@ class RetrySequence:
 
         return timings
 
+# Maximum amount of Levenberg-Marquardt iterations when the exponential fits of a batch get refined
+REFINEMENT_ITERATIONS = 100
+# Mean squared error of a fit in a batch, relative to the mean squared interval, below which the fit counts as exact
+ROUNDING_TOLERANCE = 1e-12
+
+
+# Estimates the parameters of many retry sequences at once, with the same results as estimate_parameters of every
+# sequence up to the precision of the fits.
+# The sequences are grouped by the amount of time intervals, so each group is a matrix with one sequence per row:
+# The linear function is fitted with the closed form least squares solution, the exponential function with a linear
+# regression of the logarithms of the intervals. With refine, the exponential fits are refined to the least squares
+# solution (which curve_fit computes) by Levenberg-Marquardt iterations on all rows at once.
+# Only sequences whose exponential fit fails, e.g. because of intervals <= 0, are fitted with curve_fit one by one.
+def estimate_parameters(sequences, refine=True):
+    groups = {}
+    for sequence in sequences:
+        y = sequence.prepare_estimation()
+        if y is not None:
+            groups.setdefault(len(y), []).append((sequence, y))
+
+    for group in groups.values():
+        _estimate_group([sequence for sequence, _ in group], np.array([y for _, y in group], dtype=np.float64), refine)
+
+
+def _estimate_group(sequences, y, refine):
+    x = np.arange(y.shape[1], dtype=np.float64)
+    linear = _fit_linear(x, y)
+    exponential, fitted = _fit_exponential(x, y, refine)
+
+    with np.errstate(all='ignore'):
+        estimates_linear = linear[:, 0:1] * x + linear[:, 1:2]
+        estimates_exponential = exponential[:, 1:2] * exponential[:, 0:1] ** x
+        mse_lin = np.mean(np.square(y - estimates_linear), axis=1)
+        mse_exp = np.mean(np.square(y - estimates_exponential), axis=1)
+
+        # errors in the order of the rounding errors are exact fits, e.g. both functions fit exactly through two points
+        tolerance = ROUNDING_TOLERANCE * np.mean(np.square(y), axis=1)
+        mse_lin[mse_lin <= tolerance] = 0
+        mse_exp[mse_exp <= tolerance] = 0
+
+    for row, sequence in enumerate(sequences):
+        if not fitted[row]:
+            sequence.fit(y[row].tolist())
+        elif mse_exp[row] < mse_lin[row]:
+            sequence.set_estimate("exponential", exponential[row], mse_exp[row], estimates_exponential[row, -1])
+        else:
+            sequence.set_estimate("linear", linear[row], mse_lin[row], estimates_linear[row, -1])
+
+
+# Least squares fit of assume_linear to every row, returns the rows (base, baseBackoff)
+def _fit_linear(x, y):
+    centered = x - x.mean()
+    mean = y.mean(axis=1)
+    base = (y - mean[:, None]) @ centered / (centered @ centered)
+    return np.column_stack((base, mean - base * x.mean()))
+
+
+# Fit of assume_exponential to every row, returns the rows (base, baseBackoff) and which rows could be fitted
+def _fit_exponential(x, y, refine):
+    parameters = np.full((len(y), 2), np.nan)
+    fitted = np.all(y > 0, axis=1)
+    if fitted.any():
+        logarithms = _fit_linear(x, np.log(y[fitted]))
+        parameters[fitted] = np.exp(logarithms)
+        if refine:
+            refined, converged = _refine_exponential(x, y[fitted], parameters[fitted])
+            parameters[fitted] = refined
+            fitted[fitted] = converged
+    fitted &= np.all(np.isfinite(parameters), axis=1)
+    return parameters, fitted
+
+
+# Levenberg-Marquardt iterations on the rows, until the squared error of all rows does not decrease anymore
+def _refine_exponential(x, y, parameters):
+    base, base_backoff = parameters[:, 0].copy(), parameters[:, 1].copy()
+    damping = np.full(len(y), 1e-3)
+    converged = np.zeros(len(y), dtype=bool)
+
+    def squared_error(b, bb):
+        return np.sum(np.square(y - bb[:, None] * b[:, None] ** x), axis=1)
+
+    with np.errstate(all='ignore'):
+        error = squared_error(base, base_backoff)
+        for _ in range(REFINEMENT_ITERATIONS):
+            converged |= (error == 0) | (damping > 1e10)
+            if converged.all():
+                break
+
+            power = base[:, None] ** x
+            jacobian_base = base_backoff[:, None] * np.where(x > 0, x * base[:, None] ** (x - 1), 0)
+            residuals = y - base_backoff[:, None] * power
+
+            # damped normal equations of the 2x2 system
+            h_bb = np.sum(jacobian_base * jacobian_base, axis=1) * (1 + damping)
+            h_ss = np.sum(power * power, axis=1) * (1 + damping)
+            h_bs = np.sum(jacobian_base * power, axis=1)
+            g_b = np.sum(jacobian_base * residuals, axis=1)
+            g_s = np.sum(power * residuals, axis=1)
+            determinant = h_bb * h_ss - h_bs * h_bs
+            new_base = base + (h_ss * g_b - h_bs * g_s) / determinant
+            new_base_backoff = base_backoff + (h_bb * g_s - h_bs * g_b) / determinant
+
+            new_error = squared_error(new_base, new_base_backoff)
+            improved = ~converged & (new_error < error)
+            converged |= improved & (error - new_error <= 1e-12 * error)
+            base = np.where(improved, new_base, base)
+            base_backoff = np.where(improved, new_base_backoff, base_backoff)
+            error = np.where(improved, new_error, error)
+            damping = np.where(improved, damping / 10, damping * 10)
+
+    return np.column_stack((base, base_backoff)), converged
+
+
+class CallHistory:
+    """
+    Columnar history of the calls that the spans of an operation made to other operations. Every call is a row of the
+    columns parent span, timestamp, called operation, error, start and end time. Spans, operations and error values are
+    encoded as integer codes, span codes are assigned in the order the spans were added.
+    The rows are sorted by span and timestamp once, when the history is read after new calls were added. Like a dict
+    keyed by span and timestamp, only the last call added with the same span and timestamp is kept.
+    """
+
+    def __init__(self):
+        self._parents = Column()
+        self._timestamps = Column()
+        self._operations = Column()
+        self._errors = Column()
+        self._starts = Column()
+        self._ends = Column()
+        self._codes: Dict[str, Dict[Any, int]] = {'span': {}, 'operation': {}, 'error': {}}
+        self._values: Dict[str, List[Any]] = {'span': [], 'operation': [], 'error': []}
+        # fields of the calls that were added since the last access, they are appended to the columns in bulk
+        self._added: List[Any] = []
+        self._sorted = True
+
+    def __len__(self) -> int:
+        self._sort()
+        return len(self._parents)
 
-class Retry:
+    @property
+    def spans(self) -> List[Any]:
+        return self._values['span']
+
+    def _code(self, kind: str, value: Any) -> int:
+        codes = self._codes[kind]
+        code = codes.get(value)
+        if code is None:
+            code = len(codes)
+            codes[value] = code
+            self._values[kind].append(value)
+        return code
+
+    def add(self, span, timestamp, operation, error, start, end) -> int:
+        """
+        Adds a call of the given span and returns the code of the span.
+        """
+        span_code = self._code('span', span)
+        self._added.extend((span_code, timestamp, self._code('operation', operation), self._code('error', error),
+                            start, end))
+        self._sorted = False
+        return span_code
+
+    def _append_added(self):
+        if not self._added:
+            return
+        fields = len(self._columns())
+        for field, column in enumerate(self._columns()):
+            values = self._added[field::fields]
+            if column in (self._parents, self._operations, self._errors):
+                column.extend_array(np.fromiter(values, dtype=np.int64, count=len(values)))
+            else:
+                column.extend_values(values)
+        self._added = []
+
+    def extend(self, other: 'CallHistory') -> np.ndarray:
+        """
+        Appends all calls of another history and returns the codes of its spans in this history.
+        """
+        self._append_added()
+        other._append_added()
+        codes = {kind: np.array([self._code(kind, value) for value in other._values[kind]], dtype=np.int64)
+                 for kind in self._values}
+        if len(other._parents) > 0:
+            self._parents.extend_array(codes['span'][other._parents.array()])
+            self._operations.extend_array(codes['operation'][other._operations.array()])
+            self._errors.extend_array(codes['error'][other._errors.array()])
+            for column, other_column in [(self._timestamps, other._timestamps), (self._starts, other._starts),
+                                         (self._ends, other._ends)]:
+                column.extend(other_column)
+            self._sorted = False
+        return codes['span']
+
+    def _columns(self) -> List[Column]:
+        return [self._parents, self._timestamps, self._operations, self._errors, self._starts, self._ends]
+
+    def _sort(self):
+        if self._sorted:
+            return
+        self._append_added()
+        rows = np.arange(self._parents.size)
+        timestamps = self._timestamps.array()
+        order = np.lexsort((rows, timestamps, self._parents.array()))
+        parents, timestamps = self._parents.array()[order], timestamps[order]
+        # keep the call that was added last for equal spans and timestamps
+        last = np.ones(len(order), dtype=bool)
+        last[:-1] = (parents[1:] != parents[:-1]) | ((timestamps[1:] != timestamps[:-1])
+                                                     & ~(np.isnan(timestamps[1:]) & np.isnan(timestamps[:-1])))
+        order = order[last]
+        for column in self._columns():
+            values, states = column.data()
+            column.restore(values[order], states[order], len(order))
+        self._sorted = True
+
+    def _list(self, column: Column, rows: np.ndarray) -> List[Any]:
+        values = column.array(rows).tolist()
+        for index in np.flatnonzero(column.data()[1][rows] == NONE):
+            values[index] = None
+        return values
+
+    def sequences(self, spans: np.ndarray) -> Dict[int, List[RetrySequence]]:
+        """
+        Extracts the retry sequences of the given span codes in a single pass over their calls, ordered by timestamp.
+        A call continues a retry sequence if the previous call of the same span called the same operation and failed,
+        so the sequences are the runs of such calls. Returns the sequences by span code, their parameters are not
+        estimated yet.
+        """
+        self._sort()
+        parents = self._parents.array()
+        rows = np.flatnonzero(np.isin(parents, spans))
+        parents = parents[rows]
+        operations = self._operations.array(rows)
+        failed = np.array([bool(error) for error in self._values['error']], dtype=bool)[self._errors.array(rows)]
+
+        continues = np.zeros(len(rows), dtype=bool)
+        continues[1:] = (parents[1:] == parents[:-1]) & (operations[1:] == operations[:-1]) & failed[:-1]
+        previous = np.concatenate(([False], continues[:-1]))
+        following = np.concatenate((continues[1:], [False]))
+        # each run of continuing calls, together with the call before it, is a retry sequence
+        firsts = np.flatnonzero(continues & ~previous) - 1
+        lasts = np.flatnonzero(continues & ~following)
+
+        lengths = lasts - firsts + 1
+        offsets = np.cumsum(lengths) - lengths
+        members = rows[np.repeat(firsts - offsets, lengths) + np.arange(lengths.sum())]
+        calls = list(zip(self._list(self._starts, members), self._list(self._ends, members),
+                         [self._values['error'][code] for code in self._errors.array(members).tolist()]))
+
+        result = {}
+        for parent, operation, offset, length in zip(parents[firsts].tolist(), operations[firsts].tolist(),
+                                                     offsets.tolist(), lengths.tolist()):
+            sequence = RetrySequence(self._values['operation'][operation])
+            sequence._sequence = calls[offset:offset + length]
+            result.setdefault(parent, []).append(sequence)
+        return result
+
+    def entries(self, span) -> Dict[Any, Tuple]:
+        """
+        Returns the calls of a span as {timestamp: (Operation, hasError, startTime, endTime)}.
+        """
+        self._sort()
+        code = self._codes['span'].get(span)
+        rows = np.flatnonzero(self._parents.array() == code)
+        return {timestamp: (self._values['operation'][operation], self._values['error'][error], start, end)
+                for timestamp, operation, error, start, end in zip(self._list(self._timestamps, rows),
+                                                                   self._operations.array(rows).tolist(),
+                                                                   self._errors.array(rows).tolist(),
+                                                                   self._list(self._starts, rows),
+                                                                   self._list(self._ends, rows))}
+
+
+class Retry(LazyAttributes):
     """
     Class that represents the retry pattern of an operation in the generic model. It stores all retry sequences that
     have been detected int the traces with the corresponding estimated function parameters
     """
 
+    # Attributes that are set by detect_retry
+    DETECTION_ATTRIBUTES = ['_pending', '_sequences', '_retry_sequences', '_strategy', '_maxTries', '_base',
+                            '_baseBackoff', '_maxBackoff', '_error']
+
     def __init__(self):
-        self._call_history = {}  # maps {spanID: {timestamp: (Operation, hasError, startTime, endTime)}}
+        self._call_history = CallHistory()
+        self._pending = set()  # codes of the spans whose call history changed since the last detection
+        self._sequences = {}  # maps {span code: [RetrySequence]} for all spans with at least one retry sequence
         self._retry_sequences = []
         self._strategy = None
         self._maxTries = None
@@ -212,6 +502,18 @@ class Retry:
         self._maxBackoff = None
         self._error = None
 
+    # Retries pickled before the call history was columnar stored it as {spanID: {timestamp: (Operation, hasError,
+    # startTime, endTime)}}. The calls are added to a new history and the retry sequences are detected again, so they
+    # are tracked per span like the ones of a parsed model.
+    def __setstate__(self, state: Dict[str, Any]):
+        if not isinstance(state.get('_call_history'), dict):
+            self.__dict__.update(state)
+            return
+        self.__init__()
+        for span, entry in state['_call_history'].items():
+            self.add_call_history_entry(span, entry)
+        self.detect_retry()
+
     @property
     def strategy(self):
         return self._strategy
@@ -243,48 +545,61 @@ class Retry:
     def has_retry(self):
         return len(self._retry_sequences) > 0
 
-    def add_call_history_entry(self, span, entry):
-        if self._call_history.keys().__contains__(span):
-            self._call_history[span].update(entry)
-        else:
-            self._call_history[span] = entry
-
-    # This Method tries to detect a retry. If it finds one, the whole Retry Sequence is extracted.
-    def detect_retry(self):
-        for entry in self._call_history.values():
-            last_call = (None, None, None)
+    # True if calls were added since the last retry-detection
+    def has_new_calls(self):
+        return len(self._pending) > 0
 
-            timestamps = list(entry.keys())
-            timestamps.sort()
+    @property
+    def call_history(self) -> CallHistory:
+        return self._call_history
 
-            retry_sequence = None
+    def add_call(self, span, timestamp, operation, error, start, end):
+        self._pending.add(self._call_history.add(span, timestamp, operation, error, start, end))
 
-            for timestamp in timestamps:
-                current_call = entry[timestamp]
+    # Adds the calls of a span as {timestamp: (Operation, hasError, startTime, endTime)}
+    def add_call_history_entry(self, span, entry):
+        for timestamp, (operation, error, start, end) in entry.items():
+            self.add_call(span, timestamp, operation, error, start, end)
 
-                # If last call was same operation as current call and last call had an error continue or start a new
-                # retry sequence
-                if (last_call[0] == current_call[0]) and last_call[1]:
+    # Adds the call history of the retry of the same operation in a partial model. Retry sequences are not merged, the
+    # detection has to run afterwards.
+    def merge(self, other):
+        self._pending.update(self._call_history.extend(other.call_history).tolist())
 
-                    # If there is no retry sequence yet, start a new one and add the last call to it.
-                    if retry_sequence is None:
-                        retry_sequence = RetrySequence(current_call[0])
-                        retry_sequence.add_call_entry((last_call[2], last_call[3], last_call[1]))
-                        self._retry_sequences.append(retry_sequence)
+    # Returns the attributes that detect_retry sets, so the detection can run on a copy of this retry in another
+    # process and its results can be written back with set_detection_result.
+    def detection_result(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in Retry.DETECTION_ATTRIBUTES}
 
-                    # add the current call the current retry sequence
-                    retry_sequence.add_call_entry((current_call[2], current_call[3], current_call[1]))
+    def set_detection_result(self, result: Dict[str, Any]):
+        for name, value in result.items():
+            setattr(self, name, value)
 
-                # End-conditions for a retry sequence: Current call was successful (hasError is False) or the Service
-                # is continuing with calling another operation.
-                if not current_call[1] or (last_call[0] != current_call[0]):
-                    retry_sequence = None
+    # This Method tries to detect a retry. If it finds one, the whole Retry Sequence is extracted.
+    # Only the call histories that changed since the last detection are searched again, so the detection can be
+    # repeated cheaply after new calls were added.
+    def detect_retry(self):
+        if not self._pending:
+            return
 
-                last_call = current_call
+        detected = self._call_history.sequences(np.fromiter(self._pending, dtype=np.int64, count=len(self._pending)))
+        for span in self._pending:
+            if span in detected:
+                self._sequences[span] = detected[span]
+            else:
+                self._sequences.pop(span, None)
+        self._pending = set()
+        estimate_parameters([sequence for sequences in detected.values() for sequence in sequences])
 
-        for sequence in self.retry_sequences:
-            sequence.estimate_parameters()
+        # keep the sequences in the order of the call history
+        self._retry_sequences = [sequence for span in sorted(self._sequences) for sequence in self._sequences[span]]
 
+        self._strategy = None
+        self._maxTries = None
+        self._base = None
+        self._baseBackoff = None
+        self._maxBackoff = None
+        self._error = None
         if self.has_retry():
             self.set_results()
 
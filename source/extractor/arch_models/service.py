@@ -85,6 +85,21 @@ class Service:
             del self._operations[operation.name]
             operation.service = self
 
+    def merge(self, other):
+        """
+        Adds the hosts, operations and load balancer history of the same service in a partial model that was built
+        from other traces. Tags are only taken over if this service has none yet.
+        """
+        if not self._tags:
+            self._tags = other.tags
+        for host in other.hosts:
+            self.add_host(host)
+        self._load_balancer.merge(other.load_balancer)
+        for name, operation in other.operations.items():
+            if name not in self._operations:
+                self.add_operation(Operation(name))
+            self._operations[name].merge(operation)
+
     def add_host(self, host):
         if host not in self._hosts:
             self._hosts.append(host)
@@ -0,0 +1,394 @@
+import json
+import os
+import pickle
+import struct
+import tempfile
+from typing import Any, Callable, Dict, IO, List
+
+import numpy as np
+
+from extractor.arch_models import hazard as hazards
+from extractor.arch_models.circuit_breaker import CircuitBreaker
+from extractor.arch_models.columns import Column
+from extractor.arch_models.dependency import Dependency
+from extractor.arch_models.jaeger_trace import JaegerTrace
+from extractor.arch_models.load_balancer import InstanceHistory
+from extractor.arch_models.misim_model import MiSimModel
+from extractor.arch_models.model import IModel
+from extractor.arch_models.open_xtrace import OpenXTrace
+from extractor.arch_models.operation import Operation
+from extractor.arch_models.service import Service
+from extractor.arch_models.span_store import SpanStore
+from extractor.arch_models.zipkin_trace import ZipkinTrace
+
+# Layout of a snapshot file:
+#   MAGIC | version (uint32) | reserved (uint32)
+#   blocks, each starting at a multiple of ALIGNMENT: raw NumPy arrays or pickled payloads
+#   header (JSON): structure of the model and the offsets of all blocks
+#   offset of the header (uint64) | length of the header (uint64) | MAGIC
+MAGIC = b'ARCHSNAP'
+VERSION = 1
+ALIGNMENT = 64
+_PREFIX = struct.Struct('<8sII')
+_TRAILER = struct.Struct('<QQ8s')
+
+MODEL_CLASSES = {model_class.__name__: model_class for model_class in [JaegerTrace, ZipkinTrace, OpenXTrace, MiSimModel]}
+
+
+class SnapshotError(BaseException):
+    def __init__(self, message: str):
+        super().__init__('Invalid model snapshot: {}'.format(message))
+
+
+def is_snapshot(path: str) -> bool:
+    """
+    Checks the magic bytes at the start of a file, e.g. to tell snapshots and pickled models apart.
+    """
+    with open(path, 'rb') as handle:
+        return handle.read(len(MAGIC)) == MAGIC
+
+
+def _once(loader: Callable[[], Any]) -> Callable[[], Any]:
+    result = []
+
+    def load():
+        if not result:
+            result.append(loader())
+        return result[0]
+    return load
+
+
+def _scalar(value: Any) -> Any:
+    return value.item() if isinstance(value, np.generic) else value
+
+
+class _Writer:
+    def __init__(self, handle: IO):
+        self._handle = handle
+        self._handle.write(_PREFIX.pack(MAGIC, VERSION, 0))
+        self._position = _PREFIX.size
+
+    def _start_block(self) -> int:
+        padding = -self._position % ALIGNMENT
+        self._handle.write(b'\0' * padding)
+        self._position += padding
+        return self._position
+
+    def array(self, values: np.ndarray) -> Dict[str, Any]:
+        values = np.ascontiguousarray(values)
+        offset = self._start_block()
+        self._handle.write(values.tobytes())
+        self._position += values.nbytes
+        return {'offset': offset, 'dtype': values.dtype.str, 'length': len(values)}
+
+    def blob(self, value: Any) -> Dict[str, Any]:
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        offset = self._start_block()
+        self._handle.write(data)
+        self._position += len(data)
+        return {'offset': offset, 'size': len(data)}
+
+    def column(self, column: Column) -> Dict[str, Any]:
+        values, states = column.data()
+        return {'values': self.array(values), 'states': self.array(states), 'count': len(column)}
+
+    def numbers(self, values: List[Any]) -> Dict[str, Any]:
+        """
+        Stores a list of numbers as array if possible, otherwise as pickled payload.
+        """
+        array = np.asarray(values) if values else np.empty(0, dtype=np.int64)
+        if array.ndim == 1 and array.dtype.kind in 'if':
+            return {'array': self.array(array)}
+        return {'blob': self.blob(values)}
+
+    def finish(self, header: Dict[str, Any]):
+        data = json.dumps(header).encode('utf-8')
+        offset = self._start_block()
+        self._handle.write(data)
+        self._handle.write(_TRAILER.pack(offset, len(data), MAGIC))
+
+
+class _Reader:
+    def __init__(self, path: str):
+        # Copy-on-write: pages are only read when they are accessed, changes stay in memory.
+        self._buffer = np.memmap(path, dtype=np.uint8, mode='c')
+        if len(self._buffer) < _PREFIX.size + _TRAILER.size:
+            raise SnapshotError('file is too small')
+        magic, version, _ = _PREFIX.unpack(bytes(self._buffer[:_PREFIX.size]))
+        if magic != MAGIC:
+            raise SnapshotError('wrong magic bytes')
+        if version != VERSION:
+            raise SnapshotError('unsupported version {}'.format(version))
+        offset, length, magic = _TRAILER.unpack(bytes(self._buffer[-_TRAILER.size:]))
+        if magic != MAGIC:
+            raise SnapshotError('file is truncated')
+        self.header = json.loads(bytes(self._buffer[offset:offset + length]).decode('utf-8'))
+
+    def array(self, reference: Dict[str, Any]) -> np.ndarray:
+        dtype = np.dtype(reference['dtype'])
+        start = reference['offset']
+        return self._buffer[start:start + reference['length'] * dtype.itemsize].view(dtype)
+
+    def blob(self, reference: Dict[str, Any]) -> Any:
+        start = reference['offset']
+        return pickle.loads(self._buffer[start:start + reference['size']])
+
+    def lazy_blob(self, reference: Dict[str, Any]) -> Callable[[], Any]:
+        return lambda: self.blob(reference)
+
+    def column(self, column: Column, reference: Dict[str, Any]):
+        column.restore(self.array(reference['values']), self.array(reference['states']), reference['count'])
+
+    def numbers(self, reference: Dict[str, Any]) -> List[Any]:
+        if 'array' in reference:
+            return self.array(reference['array']).tolist()
+        return self.blob(reference['blob'])
+
+
+def _save_store(writer: _Writer, store: SpanStore) -> Dict[str, Any]:
+    return {
+        'ids':                 writer.blob(store._ids),
+        'spans':               writer.column(store._spans),
+        'columns':             {field: writer.column(column) for field, column in store._columns.items()},
+        'error':               writer.blob(store.error),
+        'tags':                writer.blob(store.tags),
+        'logs':                writer.blob(store.logs),
+        'hosts':               writer.blob(store.hosts),
+        'response_hosts':      writer.column(store._response_hosts),
+        'response_timestamps': writer.column(store._response_timestamps),
+        'response_durations':  writer.column(store._response_durations),
+    }
+
+
+def _load_store(reader: _Reader, store: SpanStore, header: Dict[str, Any]):
+    store.set_lazy('_ids', reader.lazy_blob(header['ids']))
+    store.set_lazy('_rows', lambda: {span_id: row for row, span_id in enumerate(store._ids)})
+    reader.column(store._spans, header['spans'])
+    for field, column in header['columns'].items():
+        reader.column(store.column(field), column)
+    store.set_lazy('error', reader.lazy_blob(header['error']))
+    store.set_lazy('tags', reader.lazy_blob(header['tags']))
+    store.set_lazy('logs', reader.lazy_blob(header['logs']))
+    store._hosts = reader.blob(header['hosts'])
+    store._host_codes = {host: code for code, host in enumerate(store._hosts)}
+    reader.column(store._response_hosts, header['response_hosts'])
+    reader.column(store._response_timestamps, header['response_timestamps'])
+    reader.column(store._response_durations, header['response_durations'])
+
+
+def _save_operation(writer: _Writer, operation: Operation) -> Dict[str, Any]:
+    retry = operation.retry
+    return {
+        'id':              operation.id,
+        'name':            operation.name,
+        'demand':          _scalar(operation.demand),
+        'circuit_breaker': None if operation.circuit_breaker is None else vars(operation.circuit_breaker),
+        'store':           _save_store(writer, operation.store),
+        'retry':           {
+            'history': writer.blob((retry._call_history, retry._pending, retry._sequences, retry._retry_sequences)),
+            'results': {name: _scalar(getattr(retry, name))
+                        for name in ['strategy', 'maxTries', 'base', 'baseBackoff', 'maxBackoff', 'error']},
+        },
+        'dependencies':    [{
+            'service':       dependency.service.name,
+            'operation':     dependency.name,
+            'probability':   _scalar(dependency.probability),
+            'calls':         dependency._calls,
+            'latencies':     writer.numbers(dependency.latencies),
+            'calling_spans': writer.blob(dependency.calling_spans),
+        } for dependency in operation.dependencies],
+    }
+
+
+def _load_operation(reader: _Reader, header: Dict[str, Any]) -> Operation:
+    operation = Operation(header['name'])
+    operation._id = header['id']
+    operation.set_demand(header['demand'])
+    if header['circuit_breaker'] is not None:
+        circuit_breaker = CircuitBreaker()
+        vars(circuit_breaker).update(header['circuit_breaker'])
+        operation.add_circuit_breaker(circuit_breaker)
+    _load_store(reader, operation.store, header['store'])
+
+    retry = operation.retry
+    # the parts of the call history share one payload, it is decoded once when the first part is accessed
+    history = _once(reader.lazy_blob(header['retry']['history']))
+    for index, name in enumerate(['_call_history', '_pending', '_sequences', '_retry_sequences']):
+        retry.set_lazy(name, lambda index=index: history()[index])
+    for name, value in header['retry']['results'].items():
+        setattr(retry, '_' + name, value)
+    return operation
+
+
+def _load_dependencies(reader: _Reader, operation: Operation, header: Dict[str, Any], services: Dict[str, Service]):
+    for dependency_header in header['dependencies']:
+        dependency = Dependency(services[dependency_header['service']].operations[dependency_header['operation']])
+        dependency.set_probability(dependency_header['probability'])
+        dependency._calls = dependency_header['calls']
+        dependency.set_lazy('_latencies', lambda reference=dependency_header['latencies']: reader.numbers(reference))
+        dependency.set_lazy('_calling_spans', reader.lazy_blob(dependency_header['calling_spans']))
+        operation.add_dependency(dependency)
+
+
+def _save_history(writer: _Writer, history: InstanceHistory) -> Dict[str, Any]:
+    return {
+        'timestamps': writer.column(history._timestamps),
+        'codes':      writer.column(history._codes),
+        'instances':  writer.blob(history.instances),
+        'sorted':     history._sorted,
+    }
+
+
+def _load_history(reader: _Reader, history: InstanceHistory, header: Dict[str, Any]):
+    reader.column(history._timestamps, header['timestamps'])
+    reader.column(history._codes, header['codes'])
+    history._instances = reader.blob(header['instances'])
+    history._instance_codes = {instance: code for code, instance in enumerate(history.instances)}
+    history._sorted = header['sorted']
+
+
+def _save_service(writer: _Writer, service: Service) -> Dict[str, Any]:
+    load_balancer = service.load_balancer
+    return {
+        'id':            service.id,
+        'name':          service.name,
+        'hosts':         writer.blob(service.hosts),
+        'capacity':      _scalar(service.capacity),
+        'tags':          writer.blob(service.tags),
+        'load_balancer': {
+            'strategy':                 load_balancer.strategy,
+            'detected':                 load_balancer.detected,
+            'allowed_error_percentage': _scalar(load_balancer._allowed_error_percentage),
+            'error_percentage':         _scalar(load_balancer.error_percentage),
+            'history':                  _save_history(writer, load_balancer.instance_history),
+        },
+        'operations':    [_save_operation(writer, operation) for operation in service.operations.values()],
+    }
+
+
+def _load_service(reader: _Reader, header: Dict[str, Any]) -> Service:
+    service = Service(header['name'])
+    service._id = header['id']
+    service._hosts = reader.blob(header['hosts'])
+    service.set_capacity(header['capacity'])
+    service.tags = reader.blob(header['tags'])
+
+    load_balancer = service.load_balancer
+    load_balancer._strategy = header['load_balancer']['strategy']
+    load_balancer._detected = header['load_balancer']['detected']
+    load_balancer.set_allowed_error_percentage(header['load_balancer']['allowed_error_percentage'])
+    load_balancer._error_percentage = header['load_balancer']['error_percentage']
+    _load_history(reader, load_balancer.instance_history, header['load_balancer']['history'])
+
+    for operation_header in header['operations']:
+        service.add_operation(_load_operation(reader, operation_header))
+    return service
+
+
+def _save_hazards(model: IModel) -> Dict[str, List[Dict[str, Any]]]:
+    result = {}
+    for key, hazard_list in model.hazards.items():
+        result[key] = []
+        for hazard in hazard_list:
+            prop = hazard.prop
+            state = {name: _scalar(value) for name, value in vars(hazard).items() if name != '_property'}
+            result[key].append({
+                'class':     hazard.__class__.__name__,
+                'service':   prop.service.name if isinstance(prop, Operation) else prop.name,
+                'operation': prop.name if isinstance(prop, Operation) else None,
+                'state':     state,
+            })
+    return result
+
+
+def _load_hazards(header: Dict[str, List[Dict[str, Any]]], services: Dict[str, Service]) -> Dict[str, List[Any]]:
+    result = {}
+    for key, hazard_list in header.items():
+        result[key] = []
+        for hazard_header in hazard_list:
+            hazard_class = getattr(hazards, hazard_header['class'])
+            hazard = hazard_class.__new__(hazard_class)
+            vars(hazard).update({name: tuple(value) if isinstance(value, list) else value
+                                 for name, value in hazard_header['state'].items()})
+            service = services[hazard_header['service']]
+            operation = hazard_header['operation']
+            hazard._property = service if operation is None else service.operations[operation]
+            hazards.Hazard.ID = max(hazards.Hazard.ID, hazard.id + 1)
+            result[key].append(hazard)
+    return result
+
+
+def save(model: IModel, path: str):
+    """
+    Writes the model to a snapshot file. The snapshot is written to a temporary file next to it that then replaces the
+    file, since a model loaded from the file may still map it: IModel.load(path).save(path) must not truncate it.
+    @param model:   The model to store.
+    @param path:    Path of the snapshot file.
+    """
+    directory, name = os.path.split(os.path.abspath(path))
+    descriptor, temporary = tempfile.mkstemp(prefix='.' + name + '.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(descriptor, 'wb') as handle:
+            writer = _Writer(handle)
+            header = {
+                'class':       model.__class__.__name__,
+                'type':        model.type,
+                'call_string': model.call_string,
+                'valid':       model.valid,
+                'stimuli':     writer.blob(model._stimuli),
+                'services':    [_save_service(writer, service) for service in model.services.values()],
+                'hazards':     _save_hazards(model),
+            }
+            writer.finish(header)
+        os.chmod(temporary, _file_mode(path))
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+
+def _file_mode(path: str) -> int:
+    """
+    Returns the permissions of an existing file, or those open() would give a new one.
+    """
+    if os.path.exists(path):
+        return os.stat(path).st_mode & 0o777
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+def load(path: str) -> IModel:
+    """
+    Reads a model from a snapshot file. The numeric span data is memory-mapped and the span ids, tags, logs, call
+    histories and instance histories are only decoded when they are accessed.
+    @param path:    Path of the snapshot file.
+    @return:        The model, an instance of the class that was stored.
+    """
+    reader = _Reader(path)
+    header = reader.header
+    if header['class'] not in MODEL_CLASSES:
+        raise SnapshotError('unknown model class {}'.format(header['class']))
+
+    model_class = MODEL_CLASSES[header['class']]
+    model = model_class.__new__(model_class)
+    IModel.__init__(model, header['type'], pattern=header['call_string'])
+    model._valid = header['valid']
+    model._stimuli = reader.blob(header['stimuli'])
+
+    services = model.services
+    for service_header in header['services']:
+        service = _load_service(reader, service_header)
+        services[service.name] = service
+    for service_header in header['services']:
+        for operation_header in service_header['operations']:
+            operation = services[service_header['name']].operations[operation_header['name']]
+            _load_dependencies(reader, operation, operation_header, services)
+    model.hazards = _load_hazards(header['hazards'], services)
+
+    # new services and operations must not reuse the ids of the restored ones
+    Service.ID = max([Service.ID] + [service.id + 1 for service in services.values()])
+    Operation.ID = max([Operation.ID] + [operation.id + 1
+                                         for service in services.values() for operation in service.operations.values()])
+    return model
@@ -0,0 +1,359 @@
+import sys
+from collections.abc import MutableMapping, Set
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, List, Tuple
+
+import numpy as np
+
+from extractor.arch_models.columns import Column, NONE
+from extractor.arch_models.lazy import LazyAttributes
+
+
+class SpanStore(LazyAttributes):
+    """
+    Columnar storage of the runtime data of all spans of an operation. Every span id is mapped to a row once, the
+    numeric fields are kept in NumPy columns and accessed through dict-like views. Errors, tags and logs are sparse and
+    stay in dicts keyed by span id, tags and logs are only decoded from the raw span data when they are accessed.
+    """
+
+    FIELDS = ('durations', 'latency', 'starttime', 'endtime', 'timestamp')
+
+    def __init__(self):
+        # stores {span id: row}
+        self._rows: Dict[Hashable, int] = {}
+        self._ids: List[Hashable] = []
+        # marks the rows that were added with add_span
+        self._spans = Column()
+        self._columns: Dict[str, Column] = {field: Column() for field in SpanStore.FIELDS}
+        self.error: Dict[Hashable, Any] = {}
+        self.tags: Dict[Hashable, Dict] = LazyTable()
+        self.logs: Dict[Hashable, Dict] = LazyTable()
+
+        # response times of all hosts, the host of each entry is stored as index into _hosts
+        self._hosts: List[str] = []
+        self._host_codes: Dict[str, int] = {}
+        self._response_hosts = Column()
+        self._response_timestamps = Column()
+        self._response_durations = Column()
+
+    def row(self, span_id: Hashable) -> int:
+        """
+        Returns the row of a span id and adds a new row if the span id is unknown.
+        """
+        row = self._rows.get(span_id, None)
+        if row is None:
+            row = len(self._ids)
+            self._rows[span_id] = row
+            self._ids.append(span_id)
+        return row
+
+    def find(self, span_id: Hashable) -> int:
+        """
+        Returns the row of a span id or -1 if the span id is unknown.
+        """
+        return self._rows.get(span_id, -1)
+
+    def span_id(self, row: int) -> Hashable:
+        return self._ids[row]
+
+    def column(self, field: str) -> Column:
+        return self._columns[field]
+
+    def add_span(self, span_id: Hashable):
+        self._spans.set(self.row(span_id), True)
+
+    @property
+    def spans(self) -> 'SpanIds':
+        return SpanIds(self, self._spans)
+
+    def view(self, field: str) -> 'SpanColumn':
+        return SpanColumn(self, self._columns[field])
+
+    @property
+    def hosts(self) -> List[str]:
+        return self._hosts
+
+    def _host_code(self, host: str) -> int:
+        code = self._host_codes.get(host, None)
+        if code is None:
+            code = len(self._hosts)
+            self._hosts.append(sys.intern(host) if isinstance(host, str) else host)
+            self._host_codes[host] = code
+        return code
+
+    def add_response_time(self, host: str, timestamp: Any, duration: Any):
+        self._response_hosts.append(self._host_code(host))
+        self._response_timestamps.append(timestamp)
+        self._response_durations.append(duration)
+
+    def response_time_arrays(self, host: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the timestamps and response times of a host as NumPy arrays in the order they were added.
+        """
+        code = self._host_codes.get(host, None)
+        if code is None:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        rows = np.flatnonzero(self._response_hosts.array() == code)
+        return self._response_timestamps.array(rows), self._response_durations.array(rows)
+
+    def response_times(self) -> Dict[str, Tuple[Tuple[Any, Any], ...]]:
+        """
+        Builds {host1: ((timestamp1, response time 1), ...), host2: (...), ...} from the columns. The entries of a host
+        are a tuple, since changes would not reach the columns: add_response_time adds entries and
+        response_time_arrays returns them as NumPy arrays for computations.
+        """
+        result = {host: [] for host in self._hosts}
+        entries = zip(_python_values(self._response_timestamps), _python_values(self._response_durations))
+        for code, entry in zip(self._response_hosts.array().tolist(), entries):
+            result[self._hosts[code]].append(entry)
+        return {host: tuple(host_entries) for host, host_entries in result.items()}
+
+    def merge(self, other: 'SpanStore'):
+        """
+        Adds all spans and response times of another store. Values of already known span ids are overwritten.
+        """
+        other_rows = np.arange(len(other._ids), dtype=np.int64)
+        rows = np.fromiter((self.row(span_id) for span_id in other._ids), dtype=np.int64, count=len(other._ids))
+        self._spans.set_many(rows, other._spans, other_rows)
+        for field, column in self._columns.items():
+            column.set_many(rows, other._columns[field], other_rows)
+        self.error.update(other.error)
+        self.tags.update(other.tags)
+        self.logs.update(other.logs)
+
+        codes = np.fromiter((self._host_code(host) for host in other._hosts), dtype=np.int64, count=len(other._hosts))
+        self._response_hosts.extend_array(codes[other._response_hosts.array()])
+        self._response_timestamps.extend(other._response_timestamps)
+        self._response_durations.extend(other._response_durations)
+
+    def memory_usage(self) -> int:
+        """
+        Returns the amount of bytes used by the columns (without the span id index and the sparse tables).
+        """
+        columns = [self._spans, self._response_hosts, self._response_timestamps, self._response_durations]
+        return sum(column.nbytes for column in columns + list(self._columns.values()))
+
+
+def _python_values(column: Column) -> List[Any]:
+    """
+    Returns the values of all rows of a column without gaps as plain Python numbers, None values stay None.
+    """
+    values, states = column.data()
+    result = values.tolist()
+    for row in np.flatnonzero(states == NONE):
+        result[row] = None
+    return result
+
+
+class SpanIds(Set):
+    """
+    Read-only set view of the span ids that were added to a store.
+    """
+
+    def __init__(self, store: SpanStore, column: Column):
+        self._store = store
+        self._column = column
+
+    def __contains__(self, span_id) -> bool:
+        return self._column.contains(self._store.find(span_id))
+
+    def __iter__(self) -> Iterator[Hashable]:
+        for row in self._column.rows():
+            yield self._store.span_id(row)
+
+    def __len__(self) -> int:
+        return len(self._column)
+
+
+class SpanColumn(MutableMapping):
+    """
+    Dict-like view of one numeric field of a store, keyed by span id.
+    """
+
+    def __init__(self, store: SpanStore, column: Column):
+        self._store = store
+        self._column = column
+
+    def __getitem__(self, span_id):
+        row = self._store.find(span_id)
+        if row < 0 or not self._column.contains(row):
+            raise KeyError(span_id)
+        return self._column.get(row)
+
+    def __setitem__(self, span_id, value):
+        self._column.set(self._store.row(span_id), value)
+
+    def __delitem__(self, span_id):
+        row = self._store.find(span_id)
+        if row < 0 or not self._column.contains(row):
+            raise KeyError(span_id)
+        self._column.remove(row)
+
+    def __contains__(self, span_id) -> bool:
+        return self._column.contains(self._store.find(span_id))
+
+    def __iter__(self) -> Iterator[Hashable]:
+        for row in self._column.rows():
+            yield self._store.span_id(row)
+
+    def __len__(self) -> int:
+        return len(self._column)
+
+    def __repr__(self) -> str:
+        return repr(dict(self.items()))
+
+    def array(self) -> np.ndarray:
+        """
+        Returns all values as a NumPy array, in the same order as the span ids are iterated.
+        """
+        return self._column.array()
+
+
+_UNDECODED = object()
+
+
+def _typed_key(value: Any) -> Any:
+    """
+    Returns a key of a (nested tuple) value that contains the types of all elements. Values like True, 1 and 1.0 are
+    equal, but must not share an interned entry, because the shared one would change the type of the others.
+    """
+    if isinstance(value, tuple):
+        return (tuple,) + tuple(_typed_key(element) for element in value)
+    return type(value), value
+
+
+class _Raw:
+    """
+    Raw span data of a table entry that was not decoded yet. Entries of spans with the same raw data can share one
+    instance, it is decoded once for all of them.
+    """
+    __slots__ = ('value', 'decoder', 'decoded')
+
+    def __init__(self, value: Any, decoder: Callable[[Any], Any]):
+        self.value = value
+        self.decoder = decoder
+        self.decoded = _UNDECODED
+
+    def decode(self) -> Any:
+        if self.decoded is _UNDECODED:
+            self.decoded = self.decoder(self.value)
+        return self.decoded
+
+    def __reduce__(self):
+        return _Raw, (self.value, self.decoder)
+
+
+class LazyTable(MutableMapping):
+    """
+    Dict keyed by span id whose values can be added as raw span data together with a decoder. An entry is decoded the
+    first time it is accessed and replaced by the decoded value. Decoders have to be picklable, e.g. static methods, so
+    the table can be sent to other processes and stored in snapshots without decoding it.
+    """
+
+    def __init__(self):
+        self._entries: Dict[Hashable, Any] = {}
+
+    def add_raw(self, span_id: Hashable, value: Any, decoder: Callable[[Any], Any], pool: 'TagPool' = None):
+        """
+        Adds the raw data of a span, which is decoded with the given decoder once it is accessed.
+        @param pool:    If given, the entry is shared with all other spans of the pool with equal raw data.
+        """
+        self._entries[span_id] = _Raw(value, decoder) if pool is None else pool.raw(value, decoder)
+
+    def __getitem__(self, span_id):
+        value = self._entries[span_id]
+        if isinstance(value, _Raw):
+            value = value.decode()
+            self._entries[span_id] = value
+        return value
+
+    def __setitem__(self, span_id, value):
+        self._entries[span_id] = value
+
+    def __delitem__(self, span_id):
+        del self._entries[span_id]
+
+    def __contains__(self, span_id) -> bool:
+        return span_id in self._entries
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __repr__(self) -> str:
+        return repr(dict(self.items()))
+
+    def update(self, other=(), **kwargs):
+        # entries of another lazy table are taken over without decoding them
+        if isinstance(other, LazyTable):
+            self._entries.update(other._entries)
+            other = ()
+        super().update(other, **kwargs)
+
+    @property
+    def decoded(self) -> int:
+        """
+        Returns the amount of entries that were decoded or added as decoded values.
+        """
+        return sum(1 for value in self._entries.values() if not isinstance(value, _Raw))
+
+
+class TagPool:
+    """
+    Interning table for the tags of a model. Span tags repeat the same keys and mostly the same values, so equal
+    strings and equal tag sets are only stored once and referenced by all spans that contain them. Tag sets returned by
+    the pool are shared and must not be modified.
+    """
+
+    def __init__(self):
+        self._strings: Dict[str, str] = {}
+        self._raw: Dict[Tuple[Callable, Hashable], _Raw] = {}
+        self._tags: Dict[Tuple, Dict] = {}
+
+    def __len__(self) -> int:
+        return len(self._raw) + len(self._tags)
+
+    def string(self, value: Any) -> Any:
+        """
+        Returns the interned instance of a string, other values are returned unchanged.
+        """
+        if isinstance(value, str):
+            return self._strings.setdefault(value, value)
+        return value
+
+    def items(self, items: Iterable[Tuple[Any, Any]]) -> Tuple[Tuple[Any, Any], ...]:
+        """
+        Returns the key value pairs as tuple with interned keys and values.
+        """
+        return tuple((self.string(key), self.string(value)) for key, value in items)
+
+    def raw(self, value: Hashable, decoder: Callable[[Any], Any]) -> _Raw:
+        """
+        Returns the shared undecoded entry of the given raw data. Unhashable raw data can not be shared.
+        """
+        try:
+            return self._raw.setdefault((decoder, _typed_key(value)), _Raw(value, decoder))
+        except TypeError:
+            return _Raw(value, decoder)
+
+    def tags(self, tags: Dict) -> Dict:
+        """
+        Returns the shared instance of a decoded tag set. Tag sets with unhashable values are returned unchanged.
+        """
+        try:
+            return self._tags.setdefault((type(tags),) + _typed_key(self.items(tags.items())), tags)
+        except TypeError:
+            return tags
+
+    def intern(self, table: LazyTable):
+        """
+        Replaces the entries of a table, e.g. of a partial model that was parsed with another pool, by the shared ones.
+        """
+        if not isinstance(table, LazyTable):
+            return
+        for span_id, value in table._entries.items():
+            if isinstance(value, _Raw):
+                table._entries[span_id] = self.raw(value.value, value.decoder)
+            elif isinstance(value, dict):
+                table._entries[span_id] = self.tags(value)
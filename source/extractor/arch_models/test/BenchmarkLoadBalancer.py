@@ -0,0 +1,48 @@
+import sys
+import time
+
+import numpy as np
+
+from extractor.arch_models.load_balancer import LoadBalancer
+from extractor.arch_models.test.TestLoadBalancer import reference_error_percentage
+
+
+# Benchmark of the round-robin detection on synthetic histories.
+# Run from the source directory: python -m extractor.arch_models.test.BenchmarkLoadBalancer [entries]
+def synthetic_history(size: int, instance_count: int = 8, noise: float = 0.01, seed: int = 42) -> LoadBalancer:
+    """
+    Round-robin history with randomly swapped neighbours and an additional instance after half of the entries.
+    """
+    generator = np.random.default_rng(seed)
+    instances = np.arange(size) % instance_count
+    half = size // 2
+    instances[half:] = np.arange(size - half) % (instance_count + 1)
+    swaps = generator.choice(size - 1, int(size * noise), replace=False)
+    instances[swaps], instances[swaps + 1] = instances[swaps + 1], instances[swaps].copy()
+
+    load_balancer = LoadBalancer()
+    names = np.array(['10.0.0.%d:8080' % i for i in range(instance_count + 1)])
+    load_balancer.instance_history.extend_arrays(np.arange(0, size * 10, 10), names[instances])
+    return load_balancer
+
+
+def measure(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 7
+    for instance_count in (8, 64):
+        load_balancer = synthetic_history(size, instance_count)
+        history = load_balancer.instance_history
+        print('%d instances, history: %.1f MB' % (instance_count, history.memory_usage() / 1e6))
+
+        detected, duration = measure(load_balancer.detect_round_robin_pattern)
+        print('%d instances, array based: %.2fs, detected: %s, error percentage: %.5f'
+              % (instance_count, duration, detected, load_balancer.error_percentage))
+
+        entries = dict(history.items())
+        expected, duration = measure(lambda: reference_error_percentage(entries))
+        print('%d instances, list based:  %.2fs, error percentage: %.5f' % (instance_count, duration, expected))
@@ -1,6 +1,11 @@
 import unittest
 import os
 
+from extractor.arch_models.call_filter import CallFilter
+from extractor.arch_models.dependency import Dependency
+from extractor.arch_models.jaeger_trace import JaegerTrace
+from extractor.arch_models.operation import Operation
+from extractor.arch_models.service import Service
 from extractor.arch_models.test.TestUtil import TestUtil
 
 class TestExporter(unittest.TestCase):
@@ -26,4 +31,50 @@ class TestExporter(unittest.TestCase):
         # Source of example trace zipkin_trace.json: https://zipkin.io/pages/data_model.html
         path = os.path.join('source','extractor', 'arch_models', 'test', 'trace', 'jaeger_trace.json')
         model = TestUtil.loadZipkinMiSim(path)["microservices"]
-        TestUtil.MiSimBasicCheck(self, model)
\ No newline at end of file
+        TestUtil.MiSimBasicCheck(self, model)
+
+    def test_call_filter(self):
+        call_filter = CallFilter('^GET$')
+        self.assertTrue(call_filter.matches('GET'))
+        self.assertFalse(call_filter.matches('GET /a'))
+        # memoized results stay the same
+        self.assertTrue(call_filter.matches('GET'))
+        self.assertFalse(CallFilter().matches('GET'))
+
+        model = JaegerTrace(pattern='^get')
+        self.assertTrue(model.call_filter.matches('get /a'))
+        model.set_call_string('^post')
+        self.assertEqual('^post', model.call_filter.pattern)
+        self.assertFalse(model.call_filter.matches('get /a'))
+
+    def test_dependency_index(self):
+        service = Service('s')
+        caller, callee = Operation('a'), Operation('b')
+        service.add_operation(caller)
+        service.add_operation(callee)
+
+        first, second = Dependency(callee), Dependency(callee)
+        caller.add_dependencies([first, second])
+        self.assertTrue(caller.contains_operation_as_dependency(callee))
+        self.assertIs(first, caller.get_dependency_with_operation(callee))
+        caller.remove_dependency(first)
+        self.assertIs(second, caller.get_dependency_with_operation(callee))
+        caller.remove_dependency_with_duplicates(second)
+        self.assertFalse(caller.contains_operation_as_dependency(callee))
+        self.assertIsNone(caller.get_dependency_with_operation(callee))
+
+    def test_dependency_calling_spans(self):
+        service = Service('s')
+        callee = Operation('b')
+        service.add_operation(callee)
+
+        dependency, other = Dependency(callee), Dependency(callee)
+        for target, span_ids in [(dependency, ['1', '2']), (other, ['2', '3'])]:
+            for span_id in span_ids:
+                if span_id not in target.calling_spans:
+                    target.add_calling_span(span_id)
+                    target.add_call()
+        dependency.merge(other)
+        self.assertEqual({'1', '2', '3'}, dependency.calling_spans)
+        dependency.calculate_probability(6)
+        self.assertEqual(0.5, dependency.probability)
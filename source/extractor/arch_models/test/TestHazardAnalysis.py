@@ -0,0 +1,48 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from extractor.arch_models.hazard import ResponseTimeSpike
+from extractor.arch_models.hazard_analysis import DurationStatistics
+
+
+class TestHazardAnalysis(unittest.TestCase):
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    @staticmethod
+    def reference(durations: np.ndarray):
+        # per operation computation that was used by IModel.analyze before
+        series = pd.Series(durations)
+        filtered = series[~((series - series.mean()).abs() > series.std() * ResponseTimeSpike.DEVIATION_FACTOR)]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            diff = 1 - filtered.min() / filtered.max()
+        return diff, len(filtered), filtered.max() - series.max()
+
+    def test_matches_pandas(self):
+        random = np.random.default_rng(7)
+        durations = [np.empty(0, dtype=np.int64), np.array([5]), np.array([0, 0]), np.array([-1, 0, 4]),
+                     np.array([1.5, np.nan, 2.5]), np.array([np.nan])]
+        for _ in range(50):
+            values = random.integers(1, 1000, random.integers(1, 60))
+            values[random.integers(0, len(values))] = 100000
+            durations.append(values)
+        durations.append(np.concatenate([np.full(30, 10), [1000]]))
+
+        statistics = DurationStatistics(durations)
+        for i, values in enumerate(durations):
+            diff, filtered, spike = TestHazardAnalysis.reference(values)
+            np.testing.assert_equal(diff, statistics.deviation[i])
+            self.assertEqual(filtered, statistics.filtered_counts[i])
+            self.assertEqual(len(values), statistics.counts[i])
+            np.testing.assert_equal(spike, statistics.spike[i])
+        # the last operation has exactly one outlier
+        self.assertEqual(30, statistics.filtered_counts[-1])
+
+    def test_empty(self):
+        statistics = DurationStatistics([])
+        self.assertEqual(0, len(statistics.deviation))
@@ -0,0 +1,74 @@
+import json
+import os
+import unittest
+
+from extractor.arch_models.architecture_misim import ArchitectureMiSim
+from extractor.arch_models.jaeger_trace import JaegerTrace
+from extractor.arch_models.open_xtrace import OpenXTrace
+from extractor.arch_models.retry import Retry
+from extractor.arch_models.zipkin_trace import ZipkinTrace
+
+
+class TestIngest(unittest.TestCase):
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    @staticmethod
+    def load(name: str):
+        with open(os.path.join('source', 'extractor', 'arch_models', 'test', 'trace', name), 'r') as handle:
+            return json.load(handle)
+
+    def test_Jaeger_ingest_MiSim(self):
+        document = TestIngest.load('jaeger_trace.json')
+        expected = ArchitectureMiSim(JaegerTrace(document, False, ""), "", "mstd").export()
+
+        model = JaegerTrace()
+        traces = document['data']
+        half = len(traces) // 2
+        self.assertTrue(model.ingest({'data': traces[:half]}))
+        self.assertTrue(model.ingest(traces[half:]))
+        self.assertEqual(expected, ArchitectureMiSim(model, "", "mstd").export())
+
+    def test_Zipkin_ingest_MiSim(self):
+        spans = TestIngest.load('zipkin_round_robin.json')
+        expected = ZipkinTrace(spans, False, "")
+
+        traces = {}
+        for span in spans:
+            traces.setdefault(span['traceId'], []).append(span)
+        model = ZipkinTrace()
+        for trace in traces.values():
+            self.assertTrue(model.ingest(trace))
+
+        self.assertEqual(ArchitectureMiSim(expected, "", "mstd").export(), ArchitectureMiSim(model, "", "mstd").export())
+        for name, service in expected.services.items():
+            self.assertEqual(service.load_balancer.strategy, model.services[name].load_balancer.strategy)
+
+    def test_OpenXtrace_ingest_MiSim(self):
+        traces = TestIngest.load('open_xtrace_round_robin.json')
+        expected = ArchitectureMiSim(OpenXTrace(traces, False, ""), "", "mstd").export()
+
+        model = OpenXTrace()
+        for trace in traces:
+            self.assertTrue(model.ingest([trace]))
+        self.assertEqual(expected, ArchitectureMiSim(model, "", "mstd").export())
+
+    def test_retry_redetection(self):
+        retry = Retry()
+        retry.add_call_history_entry(1, {1: ("a", "400", 0.1, 0.2), 2: ("a", False, 0.4, 0.5)})
+        retry.detect_retry()
+        self.assertEqual(1, len(retry.retry_sequences))
+
+        # repeating the detection without new calls does not duplicate the sequences
+        retry.detect_retry()
+        self.assertEqual(1, len(retry.retry_sequences))
+
+        retry.add_call_history_entry(2, {1: ("b", "500", 1.1, 1.2), 2: ("b", False, 1.4, 1.5)})
+        retry.add_call_history_entry(1, {3: ("a", "400", 0.6, 0.7), 4: ("a", False, 0.9, 1.0)})
+        retry.detect_retry()
+        self.assertEqual(3, len(retry.retry_sequences))
+        self.assertEqual([(0.1, 0.2, "400"), (0.4, 0.5, False)], retry.retry_sequences[0].sequence)
+        self.assertEqual([(1.1, 1.2, "500"), (1.4, 1.5, False)], retry.retry_sequences[2].sequence)
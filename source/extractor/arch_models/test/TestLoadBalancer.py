@@ -1,114 +1,242 @@
+import random
 import unittest
 
 from extractor.arch_models.load_balancer import LoadBalancer
 
-class MyTestCase(unittest.TestCase):
+
+def add_entries(load_balancer, instance_history):
+    for timestamp, instance in instance_history.items():
+        load_balancer.add_instance_history_entry(timestamp, instance)
+
+
+def reference_error_percentage(instance_history):
+    """
+    List based implementation of the round-robin detection that the array based one has to match. Returns None if the
+    history is too short for a decision.
+    """
+    instances_in_order = [instance_history[timestamp] for timestamp in sorted(instance_history.keys())]
+    last_occurrence = {instance: index for index, instance in enumerate(instances_in_order)}
+    if not len(instances_in_order) > len(set(instances_in_order)) or len(set(instances_in_order)) < 2:
+        return None
+
+    building = True
+    round_robin_pattern = []
+    known_instances = []
+    current_pattern_index = 0
+    error_count = 0
+    for index, current_instance in enumerate(instances_in_order):
+        validating = False
+        if building:
+            if current_instance not in round_robin_pattern:
+                round_robin_pattern.append(current_instance)
+            elif len(round_robin_pattern) == 1:
+                error_count += 1
+                round_robin_pattern = []
+                current_pattern_index = 0
+            else:
+                building = False
+                validating = True
+        else:
+            validating = True
+
+        if validating:
+            expected_instance = round_robin_pattern[current_pattern_index % len(round_robin_pattern)]
+            if expected_instance == current_instance:
+                current_pattern_index += 1
+            else:
+                building = True
+                if current_instance in known_instances and last_occurrence[expected_instance] > index:
+                    error_count += 1
+                round_robin_pattern = []
+                current_pattern_index = 0
+
+        if current_instance not in known_instances:
+            known_instances.append(current_instance)
+
+    return error_count / len(instances_in_order)
+
+
+class TestLoadBalancer(unittest.TestCase):
     def test_round_robin_detection1(self):
         load_balancer = LoadBalancer()
         load_balancer.set_allowed_error_percentage(0.1)
-        load_balancer._instance_history = {1: "a", 2: "b", 3: "c", 4: "a", 5: "b", 6: "c"}
+        add_entries(load_balancer, {1: "a", 2: "b", 3: "c", 4: "a", 5: "b", 6: "c"})
         self.assertEqual(True, load_balancer.detect_round_robin_pattern())
 
     def test_round_robin_detection2(self):
         load_balancer = LoadBalancer()
         load_balancer.set_allowed_error_percentage(0.1)
-        load_balancer._instance_history = {4: "a", 5: "b", 6: "c", 1: "a", 2: "b", 3: "c"}
+        add_entries(load_balancer, {4: "a", 5: "b", 6: "c", 1: "a", 2: "b", 3: "c"})
         self.assertEqual(True, load_balancer.detect_round_robin_pattern())
 
     def test_round_robin_detection3(self):
         load_balancer = LoadBalancer()
         load_balancer.set_allowed_error_percentage(0.1)
-        load_balancer._instance_history = {4: "a", 5: "b", 6: "c", 1: "a", 2: "b", 3: "c", 7: "a", 8: "b"}
+        add_entries(load_balancer, {4: "a", 5: "b", 6: "c", 1: "a", 2: "b", 3: "c", 7: "a", 8: "b"})
         self.assertEqual(True, load_balancer.detect_round_robin_pattern())
 
     def test_round_robin_detection4(self):
         load_balancer = LoadBalancer()
         load_balancer.set_allowed_error_percentage(0.1)
-        load_balancer._instance_history = {1: "a", 2: "b", 3: "c", 4: "a", 5: "b", 6: "c", 7: "a", 8: "b", 9: "c",
-                                           10: "a", 11: "b", 12: "c"}
+        add_entries(load_balancer, {1: "a", 2: "b", 3: "c", 4: "a", 5: "b", 6: "c", 7: "a", 8: "b", 9: "c",
+                                    10: "a", 11: "b", 12: "c"})
         self.assertEqual(True, load_balancer.detect_round_robin_pattern())
 
     def test_round_robin_detection5(self):
         load_balancer = LoadBalancer()
         load_balancer.set_allowed_error_percentage(0.1)
-        load_balancer._instance_history = {1: "a", 2: "b", 3: "c", 4: "a", 5: "b", 6: "c", 7: "a", 8: "b", 9: "c",
-                                           10: "a", 11: "b", 12: "c", 13: "a"}
+        add_entries(load_balancer, {1: "a", 2: "b", 3: "c", 4: "a", 5: "b", 6: "c", 7: "a", 8: "b", 9: "c",
+                                    10: "a", 11: "b", 12: "c", 13: "a"})
         self.assertEqual(True, load_balancer.detect_round_robin_pattern())
 
     def test_round_robin_detection6(self):
         load_balancer = LoadBalancer()
         load_balancer.set_allowed_error_percentage(0.1)
-        load_balancer._instance_history = {1: "a", 2: "b", 3: "c", 4: "a"}
+        add_entries(load_balancer, {1: "a", 2: "b", 3: "c", 4: "a"})
         self.assertEqual(True, load_balancer.detect_round_robin_pattern())
 
     def test_round_robin_detection7(self):
         load_balancer = LoadBalancer()
         load_balancer.set_allowed_error_percentage(0.1)
-        load_balancer._instance_history = {1: "d", 2: "b", 3: "c", 4: "d", 5: "b", 6: "c"}
+        add_entries(load_balancer, {1: "d", 2: "b", 3: "c", 4: "d", 5: "b", 6: "c"})
         self.assertEqual(True, load_balancer.detect_round_robin_pattern())
 
     def test_round_robin_detection8(self):
         load_balancer = LoadBalancer()
         load_balancer.set_allowed_error_percentage(0.1)
-        load_balancer._instance_history = {1: "a", 2: "b", 3: "c", 4: "d", 5: "e", 6: "f", 7: "g", 8: "a", 9: "b",
-                                           10: "c", 11: "d", 12: "e", 13: "f"}
+        add_entries(load_balancer, {1: "a", 2: "b", 3: "c", 4: "d", 5: "e", 6: "f", 7: "g", 8: "a", 9: "b",
+                                    10: "c", 11: "d", 12: "e", 13: "f"})
         self.assertEqual(True, load_balancer.detect_round_robin_pattern())
 
     def test_round_robin_detection9(self):
         load_balancer = LoadBalancer()
         load_balancer.set_allowed_error_percentage(0.1)
-        load_balancer._instance_history = {1: "a", 2: "b", 3: "c", 4: "a", 5: "b", 6: "c", 7: "a", 8: "b", 9: "c",
-                                           10: "a", 11: "b", 12: "c", 13: "a", 14: "b", 15: "c", 16: "a", 17: "b",
-                                           18: "c", 19: "a", 20: "b"}
+        add_entries(load_balancer, {1: "a", 2: "b", 3: "c", 4: "a", 5: "b", 6: "c", 7: "a", 8: "b", 9: "c",
+                                    10: "a", 11: "b", 12: "c", 13: "a", 14: "b", 15: "c", 16: "a", 17: "b",
+                                    18: "c", 19: "a", 20: "b"})
         self.assertEqual(True, load_balancer.detect_round_robin_pattern())
 
     def test_round_robin_detection_fail_1(self):
         load_balancer = LoadBalancer()
         load_balancer.set_allowed_error_percentage(0.1)
-        load_balancer._instance_history = {1: "a", 2: "b", 3: "c", 4: "a", 5: "c", 6: "b"}
+        add_entries(load_balancer, {1: "a", 2: "b", 3: "c", 4: "a", 5: "c", 6: "b"})
         self.assertEqual(False, load_balancer.detect_round_robin_pattern())
 
     def test_round_robin_detection_fail_2(self):
         load_balancer = LoadBalancer()
         load_balancer.set_allowed_error_percentage(0.1)
-        load_balancer._instance_history = {1: "a", 2: "b", 3: "c"}
+        add_entries(load_balancer, {1: "a", 2: "b", 3: "c"})
         self.assertEqual(False, load_balancer.detect_round_robin_pattern())
 
     def test_round_robin_detection_fail_3(self):
         load_balancer = LoadBalancer()
         load_balancer.set_allowed_error_percentage(0.1)
-        load_balancer._instance_history = {1: "a", 2: "c", 3: "c", 4: "a"}
+        add_entries(load_balancer, {1: "a", 2: "c", 3: "c", 4: "a"})
         self.assertEqual(False, load_balancer.detect_round_robin_pattern())
 
     def test_round_robin_detection_fail_4(self):
         load_balancer = LoadBalancer()
         load_balancer.set_allowed_error_percentage(0.1)
-        load_balancer._instance_history = {1: "a", 2: "b", 3: "c", 4: "a", 5: "b", 6: "c", 7: "c",  8: "a"}
+        add_entries(load_balancer, {1: "a", 2: "b", 3: "c", 4: "a", 5: "b", 6: "c", 7: "c",  8: "a"})
         self.assertEqual(False, load_balancer.detect_round_robin_pattern())
 
     def test_round_robin_detection_fail_5(self):
         load_balancer = LoadBalancer()
         load_balancer.set_allowed_error_percentage(0.1)
-        load_balancer._instance_history = {1: "a", 2: "a", 3: "a", 4: "a", 5: "a", 6: "a"}
+        add_entries(load_balancer, {1: "a", 2: "a", 3: "a", 4: "a", 5: "a", 6: "a"})
         self.assertEqual(False, load_balancer.detect_round_robin_pattern())
 
     def test_round_robin_detection_fail_7(self):
         load_balancer = LoadBalancer()
         load_balancer.set_allowed_error_percentage(0.1)
-        load_balancer._instance_history = {1: "a", 2: "c", 3: "b", 4: "a", 5: "b", 6: "c"}
+        add_entries(load_balancer, {1: "a", 2: "c", 3: "b", 4: "a", 5: "b", 6: "c"})
         self.assertEqual(False, load_balancer.detect_round_robin_pattern())
 
     def test_round_robin_detection_new_instance(self):
         load_balancer = LoadBalancer()
         load_balancer.set_allowed_error_percentage(0.1)
-        load_balancer._instance_history = {1: "a", 2: "b", 3: "c", 4: "a", 5: "d", 6: "c"}
+        add_entries(load_balancer, {1: "a", 2: "b", 3: "c", 4: "a", 5: "d", 6: "c"})
         self.assertEqual(True, load_balancer.detect_round_robin_pattern())
 
     def test_round_robin_detection_not_so_strict(self):
         # only one error at the end -> inside the tolerance
         load_balancer = LoadBalancer()
         load_balancer.set_allowed_error_percentage(0.1)
-        load_balancer._instance_history = {1: "a", 2: "b", 3: "c", 4: "a", 5: "b", 6: "c", 7: "a", 8: "b", 9: "c",
-                                           10: "a", 11: "b", 12: "c", 13: "a", 14: "b", 15: "c", 16: "a", 17: "b",
-                                           18: "c", 19: "a", 20: "b", 21: "b"}
+        add_entries(load_balancer, {1: "a", 2: "b", 3: "c", 4: "a", 5: "b", 6: "c", 7: "a", 8: "b", 9: "c",
+                                    10: "a", 11: "b", 12: "c", 13: "a", 14: "b", 15: "c", 16: "a", 17: "b",
+                                    18: "c", 19: "a", 20: "b", 21: "b"})
+        self.assertEqual(True, load_balancer.detect_round_robin_pattern())
+
+    def test_error_percentage(self):
+        load_balancer = LoadBalancer()
+        add_entries(load_balancer, {1: "a", 2: "b", 3: "c", 4: "a", 5: "c", 6: "b"})
+        self.assertEqual(False, load_balancer.detect_round_robin_pattern())
+        self.assertAlmostEqual(1 / 6, load_balancer.error_percentage)
+
+        load_balancer = LoadBalancer()
+        add_entries(load_balancer, {1: "a", 2: "b", 3: "c"})
+        self.assertEqual(False, load_balancer.detect_round_robin_pattern())
+        self.assertIsNone(load_balancer.error_percentage)
+
+    def test_round_robin_detection_matches_reference(self):
+        generator = random.Random(42)
+        for _ in range(500):
+            instances = [str(i) for i in range(generator.randint(1, 6))]
+            history = []
+            length = generator.randint(2, 300)
+            while len(history) < length:
+                choice = generator.random()
+                if choice < 0.6:
+                    # a few rounds of a round-robin pattern
+                    history += instances * generator.randint(1, 5)
+                elif choice < 0.8:
+                    history.append(generator.choice(instances))
+                elif choice < 0.9:
+                    # up- and down-scaling
+                    instances.append(str(len(instances) + generator.randint(0, 10)))
+                elif len(instances) > 1:
+                    instances.remove(generator.choice(instances))
+            timestamps = generator.sample(range(10 * len(history)), len(history))
+            if generator.random() < 0.8:
+                # mostly ordered histories, the others are shuffled
+                timestamps.sort()
+            instance_history = dict(zip(timestamps, history))
+
+            load_balancer = LoadBalancer()
+            add_entries(load_balancer, instance_history)
+            expected = reference_error_percentage(instance_history)
+            self.assertEqual(expected is not None and expected <= 0.1, load_balancer.detect_round_robin_pattern())
+            self.assertEqual(expected, load_balancer.error_percentage)
+
+    def test_equal_timestamps(self):
+        # requests in the same microsecond are all kept, in the order they were added
+        load_balancer = LoadBalancer()
+        add_entries(load_balancer, {3: "c", 1: "a", 2: "b", 4: "a", 6: "c"})
+        load_balancer.add_instance_history_entry(5, "b")
+        load_balancer.add_instance_history_entry(5, "c")
+        self.assertEqual([(1, "a"), (2, "b"), (3, "c"), (4, "a"), (5, "b"), (5, "c"), (6, "c")],
+                         list(load_balancer.instance_history.items()))
+        self.assertEqual(7, len(load_balancer.instance_history))
+
+    def test_merge_history(self):
+        load_balancer, other = LoadBalancer(), LoadBalancer()
+        add_entries(load_balancer, {1: "a", 2: "b", 3: "c"})
+        add_entries(other, {4: "a", 5: "b", 6: "c", 7: "d"})
+        load_balancer.merge(other)
+        self.assertEqual(["a", "b", "c", "d"], load_balancer.instance_history.instances)
+        self.assertEqual([0, 1, 2, 0, 1, 2, 3], load_balancer.instance_history.codes().tolist())
         self.assertEqual(True, load_balancer.detect_round_robin_pattern())
+        self.assertGreater(load_balancer.instance_history.memory_usage(), 0)
+
+    def test_extend_arrays(self):
+        expected, load_balancer = LoadBalancer(), LoadBalancer()
+        entries = [(3, "c"), (1, "a"), (2, "c"), (4, "b"), (2, "a"), (5, "c")]
+        expected.add_instance_history_entry(0, "b")
+        load_balancer.add_instance_history_entry(0, "b")
+        for timestamp, instance in entries:
+            expected.add_instance_history_entry(timestamp, instance)
+        load_balancer.instance_history.extend_arrays([timestamp for timestamp, _ in entries],
+                                                     [instance for _, instance in entries])
+        self.assertEqual(expected.instance_history.instances, load_balancer.instance_history.instances)
+        self.assertEqual(list(expected.instance_history.items()), list(load_balancer.instance_history.items()))
+        self.assertRaises(ValueError, load_balancer.instance_history.extend_arrays, [1, 2], ["a"])
@@ -0,0 +1,83 @@
+import os
+import unittest
+
+from extractor.arch_models.architecture_misim import ArchitectureMiSim
+from extractor.arch_models.jaeger_trace import JaegerTrace
+from extractor.arch_models.open_xtrace import OpenXTrace
+from extractor.arch_models.zipkin_trace import ZipkinTrace
+
+
+class TestParallel(unittest.TestCase):
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    def test_Jaeger_parallel_MiSim(self):
+        path = os.path.join('source', 'extractor', 'arch_models', 'test', 'trace', 'jaeger_trace.json')
+        expected = ArchitectureMiSim(JaegerTrace(path, False, ""), "", "mstd").export()
+        model = JaegerTrace(path, False, "", workers=2)
+        self.assertEqual(expected, ArchitectureMiSim(model, "", "mstd").export())
+
+    def test_Zipkin_parallel_MiSim(self):
+        path = os.path.join('source', 'extractor', 'arch_models', 'test', 'trace', 'zipkin_trace.json')
+        expected = ArchitectureMiSim(ZipkinTrace(path, False, ""), "", "mstd").export()
+        model = ZipkinTrace(path, False, "", workers=2)
+        self.assertEqual(expected, ArchitectureMiSim(model, "", "mstd").export())
+
+    def test_parallel_calculations(self):
+        path = os.path.join('source', 'extractor', 'arch_models', 'test', 'trace', 'zipkin_round_robin.json')
+
+        def build():
+            model = ZipkinTrace(path, False, "")
+            # retries with exponential backoffs in the call histories of all operations
+            for index, operation in enumerate(o for service in model.services.values()
+                                              for o in service.operations.values()):
+                for span in range(3):
+                    start = 1000000 * span
+                    for attempt in range(3 + index % 3):
+                        end = start + 1000
+                        operation.retry.add_call(span, start, 'callee', attempt < 2 + index % 3, start, end)
+                        start = end + 1000 * 2 ** attempt * (index + 1)
+            return model
+
+        expected = build()
+        expected.subsequent_calculations(workers=1)
+        model = build()
+        model.subsequent_calculations(workers=2)
+
+        for name, service in expected.services.items():
+            load_balancer = model.services[name].load_balancer
+            self.assertEqual(service.load_balancer.strategy, load_balancer.strategy)
+            self.assertEqual(service.load_balancer.detected, load_balancer.detected)
+            self.assertEqual(service.load_balancer.error_percentage, load_balancer.error_percentage)
+            for operation in service.operations.values():
+                retry = model.services[name].operations[operation.name].retry
+                self.assertFalse(retry.has_new_calls())
+                self.assertTrue(retry.has_retry())
+                self.assertEqual([sequence.sequence for sequence in operation.retry.retry_sequences],
+                                 [sequence.sequence for sequence in retry.retry_sequences])
+                for attribute in ('strategy', 'maxTries', 'base', 'baseBackoff', 'maxBackoff', 'error'):
+                    self.assertEqual(getattr(operation.retry, attribute), getattr(retry, attribute))
+
+    def test_merge(self):
+        path = os.path.join('source', 'extractor', 'arch_models', 'test', 'trace', 'open_xtrace_from_zipkin.json')
+        expected = OpenXTrace(path, False, "")
+
+        # merging a partial model into an empty one has to result in the same model
+        partial = OpenXTrace()
+        partial.read(path)
+        model = OpenXTrace()
+        model.merge(partial)
+        model.subsequent_calculations()
+
+        self.assertEqual(ArchitectureMiSim(expected, "", "m").export(), ArchitectureMiSim(model, "", "m").export())
+        for name, service in expected.services.items():
+            self.assertEqual(service.hosts, model.services[name].hosts)
+            for operation in service.operations.values():
+                merged = model.services[name].operations[operation.name]
+                self.assertEqual(operation.durations, merged.durations)
+                self.assertIsNot(operation, merged)
+                for dependency in merged.dependencies:
+                    self.assertIs(model.services[dependency.service.name], dependency.service)
@@ -1,7 +1,42 @@
+import random
 import unittest
 
+import numpy as np
+
 from extractor.arch_models import architecture_misim
-from extractor.arch_models.retry import Retry, RetrySequence
+from extractor.arch_models.retry import CallHistory, Retry, RetrySequence, estimate_parameters
+
+
+def reference_sequences(entry):
+    # extraction of the retry sequences from the calls {timestamp: (Operation, hasError, startTime, endTime)} of a span
+    # with a loop over the sorted timestamps, which the columnar call history has to match
+    sequences = []
+    last_call = (None, None, None, None)
+    retry_sequence = None
+    for timestamp in sorted(entry.keys()):
+        current_call = entry[timestamp]
+        if last_call[0] == current_call[0] and last_call[1]:
+            if retry_sequence is None:
+                retry_sequence = [(last_call[2], last_call[3], last_call[1])]
+                sequences.append(retry_sequence)
+            retry_sequence.append((current_call[2], current_call[3], current_call[1]))
+        if not current_call[1] or last_call[0] != current_call[0]:
+            retry_sequence = None
+        last_call = current_call
+    return sequences
+
+
+def build_sequence(waits, ends_with_error):
+    # builds a retry sequence of calls with a duration of 1ms and the given wait times (in seconds) between them
+    sequence = RetrySequence("a")
+    start = 1656349746228000
+    for index in range(len(waits) + 1):
+        has_error = index < len(waits) or ends_with_error
+        sequence.add_call_entry((start, start + 1000, has_error))
+        if index < len(waits):
+            start += 1000 + int(waits[index] * 1000000)
+    return sequence
+
 
 class TestRetry(unittest.TestCase):
     def test_retry1(self):
@@ -372,3 +407,70 @@ class TestRetry(unittest.TestCase):
             {'type': 'retry', 'config': {'maxTries': 5},
              'strategy': {'type': 'exponential', 'config': {'baseBackoff': 1, 'maxBackoff': 4, 'base': 2}}}
             , architecture_misim.build_retry_description([retry1, retry2, retry3]))
+
+    def test_batched_estimation(self):
+        generator = random.Random(7)
+        waits = [[0.1, 0.2, 0.4], [0.1, 0.1, 0.1, 0.1], [0.5, 1, 1, 1, 1], [0.3], [0.2, -0.1, 0.3]]
+        for _ in range(200):
+            exponential = generator.random() < 0.5
+            base = generator.uniform(1.5, 3) if exponential else generator.uniform(0, 0.2)
+            base_backoff = generator.uniform(0.05, 0.5)
+            waits.append([(base_backoff * base ** i if exponential else base * i + base_backoff)
+                          * generator.uniform(0.95, 1.05) for i in range(generator.randint(3, 7))])
+
+        expected = [build_sequence(wait, index % 3 == 0) for index, wait in enumerate(waits)]
+        batched = [build_sequence(wait, index % 3 == 0) for index, wait in enumerate(waits)]
+        for sequence in expected:
+            sequence.estimate_parameters()
+        estimate_parameters(batched)
+
+        for sequence, result in zip(expected, batched):
+            self.assertEqual(sequence.strategy, result.strategy)
+            self.assertEqual(sequence.maxTries, result.maxTries)
+            for value, estimated in [(sequence.base, result.base), (sequence.baseBackoff, result.baseBackoff),
+                                     (sequence.maxBackoff, result.maxBackoff), (sequence.error, result.error)]:
+                if value is None:
+                    self.assertIsNone(estimated)
+                else:
+                    self.assertAlmostEqual(value, estimated, delta=1e-4 * abs(value) + 1e-9)
+
+    def test_call_history_duplicates(self):
+        # a call with the same span and timestamp replaces the one added before
+        retry = Retry()
+        retry.add_call_history_entry(1, {1: ("a", "400", 0.1, 0.2), 2: ("a", "400", 0.4, 0.5)})
+        retry.add_call_history_entry(1, {2: ("a", False, 0.4, 0.6)})
+        self.assertEqual({1: ("a", "400", 0.1, 0.2), 2: ("a", False, 0.4, 0.6)}, retry.call_history.entries(1))
+        self.assertEqual(2, len(retry.call_history))
+
+        retry.detect_retry()
+        self.assertEqual(1, len(retry.retry_sequences))
+        self.assertListEqual(retry.retry_sequences[0].sequence, [(0.1, 0.2, "400"), (0.4, 0.6, False)])
+
+    def test_call_history_merge(self):
+        retry, other = Retry(), Retry()
+        retry.add_call_history_entry(1, {1: ("a", "400", 0.1, 0.2)})
+        other.add_call_history_entry(2, {1: ("b", True, 0.1, 0.2), 2: ("b", False, 0.5, 0.6)})
+        other.add_call_history_entry(1, {2: ("a", False, 0.4, 0.5)})
+        retry.merge(other)
+        self.assertEqual([1, 2], retry.call_history.spans)
+
+        retry.detect_retry()
+        self.assertListEqual([[(0.1, 0.2, "400"), (0.4, 0.5, False)], [(0.1, 0.2, True), (0.5, 0.6, False)]],
+                             [sequence.sequence for sequence in retry.retry_sequences])
+
+    def test_call_history_matches_reference(self):
+        generator = random.Random(11)
+        history = CallHistory()
+        entries = {}
+        for _ in range(3000):
+            span = generator.randint(0, 200)
+            timestamp = generator.randint(0, 50)
+            call = (generator.choice("ab"), generator.choice([False, False, True, "500"]), timestamp, timestamp + 1)
+            history.add(span, timestamp, *call)
+            entries.setdefault(span, {})[timestamp] = call
+
+        sequences = history.sequences(np.arange(len(history.spans)))
+        for code, span in enumerate(history.spans):
+            self.assertEqual(entries[span], history.entries(span))
+            self.assertEqual(reference_sequences(entries[span]),
+                             [sequence.sequence for sequence in sequences.get(code, [])])
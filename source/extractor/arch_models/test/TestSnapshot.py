@@ -0,0 +1,134 @@
+import json
+import os
+import pickle
+import tempfile
+import unittest
+
+from extractor.arch_models.architecture_misim import ArchitectureMiSim
+from extractor.arch_models.jaeger_trace import JaegerTrace
+from extractor.arch_models.model import IModel
+from extractor.arch_models.open_xtrace import OpenXTrace
+from extractor.arch_models.snapshot import SnapshotError, is_snapshot
+from extractor.arch_models.span_store import LazyTable
+from extractor.arch_models.zipkin_trace import ZipkinTrace
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self._path = os.path.join(self._directory.name, 'model.dat')
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    @staticmethod
+    def trace(name: str) -> str:
+        return os.path.join('source', 'extractor', 'arch_models', 'test', 'trace', name)
+
+    def assertSameModel(self, expected: IModel, model: IModel):
+        self.assertIs(expected.__class__, model.__class__)
+        self.assertEqual(ArchitectureMiSim(expected, "", "mstd").export(), ArchitectureMiSim(model, "", "mstd").export())
+        for name, service in expected.services.items():
+            loaded_service = model.services[name]
+            self.assertEqual(service.id, loaded_service.id)
+            self.assertEqual(service.hosts, loaded_service.hosts)
+            self.assertEqual(list(service.load_balancer.instance_history.items()),
+                             list(loaded_service.load_balancer.instance_history.items()))
+            for operation in service.operations.values():
+                loaded = loaded_service.operations[operation.name]
+                self.assertEqual(set(operation.spans), set(loaded.spans))
+                self.assertEqual(dict(operation.durations), dict(loaded.durations))
+                self.assertEqual(operation.tags, loaded.tags)
+                self.assertEqual(operation.logs, loaded.logs)
+                self.assertEqual(operation.response_times, loaded.response_times)
+                self.assertEqual(len(operation.retry.retry_sequences), len(loaded.retry.retry_sequences))
+                for dependency in loaded.dependencies:
+                    self.assertIs(model.services[dependency.service.name], dependency.service)
+
+    def test_round_trip(self):
+        models = [JaegerTrace(TestSnapshot.trace('jaeger_trace.json'), False, ""),
+                  ZipkinTrace(TestSnapshot.trace('zipkin_round_robin.json'), False, ""),
+                  OpenXTrace(TestSnapshot.trace('open_xtrace_from_zipkin.json'), False, "")]
+        for expected in models:
+            expected.hazards = expected.analyze()
+            expected.save(self._path)
+            self.assertTrue(is_snapshot(self._path))
+            model = IModel.load(self._path)
+            self.assertSameModel(expected, model)
+            self.assertEqual({key: [hazard.id for hazard in hazards] for key, hazards in expected.hazards.items()},
+                             {key: [hazard.id for hazard in hazards] for key, hazards in model.hazards.items()})
+
+    def test_lazy_payloads(self):
+        JaegerTrace(TestSnapshot.trace('jaeger_trace.json'), False, "").save(self._path)
+        model = IModel.load(self._path)
+        operation = next(iter(next(iter(model.services.values())).operations.values()))
+        self.assertNotIn('tags', vars(operation.store))
+        self.assertGreater(len(operation.durations.array()), 0)
+        self.assertNotIn('_ids', vars(operation.store))
+        self.assertIsInstance(operation.tags, LazyTable)
+        self.assertIn('tags', vars(operation.store))
+
+    def test_ingest_after_load(self):
+        with open(TestSnapshot.trace('jaeger_trace.json'), 'r') as handle:
+            document = json.load(handle)
+        traces = document['data']
+        expected = JaegerTrace(document, False, "")
+
+        JaegerTrace({'data': traces[:1]}, False, "").save(self._path)
+        model = IModel.load(self._path)
+        self.assertTrue(model.ingest(traces[1:]))
+        self.assertEqual(ArchitectureMiSim(expected, "", "mstd").export(), ArchitectureMiSim(model, "", "mstd").export())
+
+        # a loaded model can still be pickled
+        self.assertEqual(ArchitectureMiSim(model, "", "mstd").export(),
+                         ArchitectureMiSim(pickle.loads(pickle.dumps(model)), "", "mstd").export())
+
+    def test_save_loaded_snapshot_to_its_path(self):
+        expected = JaegerTrace(TestSnapshot.trace('jaeger_trace.json'), False, "")
+        expected.save(self._path)
+        model = IModel.load(self._path)
+        model.save(self._path)
+        self.assertSameModel(expected, model)
+        self.assertSameModel(expected, IModel.load(self._path))
+        self.assertEqual(['model.dat'], os.listdir(self._directory.name))
+
+    def test_invalid(self):
+        with open(self._path, 'wb') as handle:
+            pickle.dump(OpenXTrace(), handle)
+        self.assertFalse(is_snapshot(self._path))
+        self.assertRaises(SnapshotError, IModel.load, self._path)
+
+    def test_legacy_pickle(self):
+        # models pickled with the baseline version, before the span store, the columnar histories and the tag pool
+        for model_class, name in [(JaegerTrace, 'jaeger_trace'), (ZipkinTrace, 'zipkin_round_robin'),
+                                  (OpenXTrace, 'open_xtrace_from_zipkin')]:
+            expected = model_class(TestSnapshot.trace(name + '.json'), False, "")
+            with open(os.path.join('source', 'extractor', 'arch_models', 'test', 'pickle', name + '.dat'), 'rb') as handle:
+                model = pickle.load(handle)
+
+            self.assertIs(model_class, model.__class__)
+            self.assertEqual(ArchitectureMiSim(expected, "", "mstd").export(), ArchitectureMiSim(model, "", "mstd").export())
+            for service in model.services.values():
+                expected_service = expected.services[service.name]
+                self.assertEqual(list(expected_service.load_balancer.instance_history.items()),
+                                 list(service.load_balancer.instance_history.items()))
+                self.assertEqual(expected_service.load_balancer.strategy, service.load_balancer.strategy)
+                for operation in service.operations.values():
+                    expected_operation = expected_service.operations[operation.name]
+                    self.assertEqual(set(expected_operation.spans), set(operation.spans))
+                    self.assertEqual(dict(expected_operation.durations), dict(operation.durations))
+                    self.assertEqual(expected_operation.tags, operation.tags)
+                    self.assertEqual(expected_operation.logs, operation.logs)
+                    self.assertEqual(expected_operation.response_times, operation.response_times)
+                    self.assertEqual(len(expected_operation.retry.retry_sequences), len(operation.retry.retry_sequences))
+                    self.assertEqual([dependency.calling_spans for dependency in expected_operation.dependencies],
+                                     [dependency.calling_spans for dependency in operation.dependencies])
+                    for dependency in operation.dependencies:
+                        self.assertIs(dependency, operation.get_dependency_with_operation(dependency.operation))
+
+            # a migrated model can be analyzed, stored as snapshot and extended like a parsed one
+            model.hazards = model.analyze()
+            model.save(self._path)
+            self.assertSameModel(model, IModel.load(self._path))
+            with open(TestSnapshot.trace(name + '.json'), 'r') as handle:
+                self.assertTrue(model.ingest(json.load(handle)))
@@ -0,0 +1,138 @@
+import os
+import pickle
+import unittest
+
+import numpy as np
+
+from extractor.arch_models.jaeger_trace import JaegerTrace
+from extractor.arch_models.operation import Operation
+from extractor.arch_models.span_store import LazyTable, SpanStore, TagPool
+
+
+class TestSpanStore(unittest.TestCase):
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    def test_columns(self):
+        operation = Operation('op')
+        for i in range(40):
+            operation.add_span(str(i))
+            operation.durations[str(i)] = i * 10
+        operation.latency['5'] = 2.5
+        operation.timestamp['6'] = None
+
+        self.assertEqual(40, len(operation.spans))
+        self.assertIn('39', operation.spans)
+        self.assertNotIn('40', operation.spans)
+        self.assertEqual({str(i): i * 10 for i in range(40)}, dict(operation.durations))
+        self.assertIsInstance(operation.durations['3'], int)
+        self.assertEqual({'5': 2.5}, dict(operation.latency))
+        self.assertIsNone(operation.timestamp['6'])
+        self.assertNotIn('7', operation.timestamp)
+        self.assertRaises(KeyError, lambda: operation.latency['4'])
+        np.testing.assert_array_equal(np.arange(40) * 10, operation.durations.array())
+
+        del operation.durations['0']
+        self.assertEqual(39, len(operation.durations))
+        self.assertEqual(40, len(operation.spans))
+
+    def test_response_times(self):
+        operation = Operation('op')
+        operation.add_response_time('b', 1, 10)
+        operation.add_response_time('a', 2, 20)
+        operation.add_response_time('b', None, 30)
+        self.assertEqual({'b': ((1, 10), (None, 30)), 'a': ((2, 20),)}, operation.response_times)
+        self.assertEqual(['b', 'a'], list(operation.response_times.keys()))
+        with self.assertRaises(TypeError):
+            operation.response_times['c'] = ()
+        with self.assertRaises(AttributeError):
+            operation.response_times['b'].append((3, 40))
+
+        timestamps, durations = operation.store.response_time_arrays('b')
+        np.testing.assert_array_equal([10, 30], durations)
+        self.assertTrue(np.isnan(timestamps[1]))
+
+    def test_merge(self):
+        store, other = SpanStore(), SpanStore()
+        store.add_span('a')
+        store.view('durations')['a'] = 1
+        store.add_response_time('h1', 1, 1)
+        other.add_span('b')
+        other.view('durations')['b'] = 2.5
+        other.add_response_time('h2', 2, 2)
+        other.add_response_time('h1', 3, 3)
+        other.tags['b'] = {'key': 'value'}
+
+        store.merge(other)
+        self.assertEqual({'a', 'b'}, set(store.spans))
+        self.assertEqual({'a': 1.0, 'b': 2.5}, dict(store.view('durations')))
+        self.assertEqual({'h1': ((1, 1), (3, 3)), 'h2': ((2, 2),)}, store.response_times())
+        self.assertEqual({'b': {'key': 'value'}}, store.tags)
+
+    def test_lazy_tags(self):
+        table = LazyTable()
+        table.add_raw('a', (('k', 1),), JaegerTrace._parse_tags)
+        table['b'] = {'k': 2}
+        self.assertEqual(1, table.decoded)
+
+        # entries stay raw when they are merged or pickled
+        other = LazyTable()
+        other.update(pickle.loads(pickle.dumps(table)))
+        self.assertEqual(1, other.decoded)
+        self.assertEqual({'k': 1}, other['a'])
+        self.assertEqual(2, other.decoded)
+        self.assertEqual({'a': {'k': 1}, 'b': {'k': 2}}, dict(other))
+
+    def test_lazy_trace_tags(self):
+        model = JaegerTrace(os.path.join('source', 'extractor', 'arch_models', 'test', 'trace', 'jaeger_trace.json'),
+                            False, "")
+        operations = [operation for service in model.services.values() for operation in service.operations.values()]
+        self.assertEqual(0, sum(operation.tags.decoded + operation.logs.decoded for operation in operations))
+        for operation in operations:
+            for span_id, tags in operation.tags.items():
+                self.assertIsInstance(tags, dict)
+                self.assertIn(span_id, operation.spans)
+        self.assertEqual(sum(len(operation.tags) for operation in operations),
+                         sum(operation.tags.decoded for operation in operations))
+
+    def test_tag_pool(self):
+        pool = TagPool()
+        table = LazyTable()
+        for i in range(10):
+            table.add_raw(i, pool.items([('component', 'java'), ('http.status_code', 200 + i % 2)]),
+                          JaegerTrace._parse_tags, pool)
+        table.add_raw(10, [('unhashable', [])], JaegerTrace._parse_tags, pool)
+        self.assertEqual(2, len(pool))
+        self.assertEqual({'component': 'java', 'http.status_code': 201}, table[1])
+        self.assertIs(table[0], table[2])
+        self.assertIsNot(table[0], table[1])
+        self.assertEqual({'unhashable': []}, table[10])
+        self.assertIs(pool.tags({'a': 'b'}), pool.tags({'a': 'b'}))
+
+    def test_tag_pool_types(self):
+        pool = TagPool()
+        # equal values of different types keep their own entries
+        self.assertIs(True, pool.tags({'error': True})['error'])
+        self.assertIs(int, type(pool.tags({'error': 1})['error']))
+        self.assertIs(float, type(pool.tags({'http.status_code': 200.0})['http.status_code']))
+        self.assertIs(int, type(pool.tags({'http.status_code': 200})['http.status_code']))
+        raw = [pool.raw(pool.items([('error', value)]), JaegerTrace._parse_tags) for value in (True, 1, 1.0, 1)]
+        self.assertEqual([bool, int, float, int], [type(entry.decode()['error']) for entry in raw])
+        self.assertIs(raw[1], raw[3])
+        self.assertEqual(7, len(pool))
+
+    def test_tag_pool_merge(self):
+        path = os.path.join('source', 'extractor', 'arch_models', 'test', 'trace', 'jaeger_trace.json')
+        model, partial = JaegerTrace(path, False, ""), JaegerTrace(path, False, "")
+        operations = [operation for service in model.services.values() for operation in service.operations.values()]
+        decoded = [{span_id: id(tags) for span_id, tags in operation.tags.items()} for operation in operations]
+        size = len(model.tag_pool)
+
+        # the tags of the partial model are replaced by the shared entries of the model
+        model.merge(partial)
+        self.assertEqual(size, len(model.tag_pool))
+        self.assertEqual(decoded,
+                         [{span_id: id(tags) for span_id, tags in operation.tags.items()} for operation in operations])
@@ -0,0 +1,52 @@
+import io
+import json
+import os
+import unittest
+
+from extractor.arch_models.architecture_misim import ArchitectureMiSim
+from extractor.arch_models.jaeger_trace import JaegerTrace
+from extractor.arch_models.zipkin_trace import ZipkinTrace
+from util.json_stream import iter_json_array
+
+
+class TestStreaming(unittest.TestCase):
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    def test_iter_json_array(self):
+        document = '{"total": 2, "nested": {"data": [0]}, "data": [{"a": [1, 2]}, 12345, "x,]"], "errors": null}'
+        # a tiny chunk size forces values to be split between reads
+        self.assertEqual([{"a": [1, 2]}, 12345, "x,]"], list(iter_json_array(io.StringIO(document), 'data', 3)))
+        self.assertEqual([[1], [2, 3], []], list(iter_json_array(io.StringIO(' [[1], [2,3] ,[]] '), chunk_size=2)))
+        self.assertEqual([], list(iter_json_array(io.StringIO('{"data": []}'), 'data')))
+        self.assertEqual([], list(iter_json_array(io.StringIO('{"total": 0}'), 'data')))
+
+    def test_iter_json_array_binary(self):
+        tags = [{"key": "user", "value": "J\u00fcrgen \u65e5\u672c \U0001f600"}, {"key": "error", "value": True}]
+        document = json.dumps({"data": tags}, ensure_ascii=False).encode('utf-8')
+        # every chunk size splits some of the multi-byte characters between two reads
+        for chunk_size in range(1, 8):
+            self.assertEqual(tags, list(iter_json_array(io.BytesIO(document), 'data', chunk_size)))
+
+    def test_Jaeger_streaming_MiSim(self):
+        path = os.path.join('source', 'extractor', 'arch_models', 'test', 'trace', 'jaeger_trace.json')
+        expected = ArchitectureMiSim(JaegerTrace(path, False, ""), "", "m").export()
+        model = JaegerTrace(path, False, "", streaming=True)
+        self.assertEqual(expected, ArchitectureMiSim(model, "", "m").export())
+
+        with open(path, 'r') as handle:
+            model = JaegerTrace(handle, False, "", streaming=True)
+        self.assertEqual(json.loads(expected), json.loads(ArchitectureMiSim(model, "", "m").export()))
+
+    def test_Zipkin_streaming_MiSim(self):
+        trace_lists = []
+        for name in ['zipkin_trace_for_openxtrace.json', 'zipkin_round_robin.json']:
+            with open(os.path.join('source', 'extractor', 'arch_models', 'test', 'trace', name), 'r') as handle:
+                trace_lists.append(json.load(handle))
+
+        expected = ArchitectureMiSim(ZipkinTrace(trace_lists, True, ""), "", "m").export()
+        model = ZipkinTrace(io.StringIO(json.dumps(trace_lists)), False, "", streaming=True)
+        self.assertEqual(expected, ArchitectureMiSim(model, "", "m").export())
@@ -1,38 +1,117 @@
 from collections import OrderedDict
 import json
-import re
 
 from extractor.arch_models.circuit_breaker import CircuitBreaker
 from extractor.arch_models.dependency import Dependency
 
 from extractor.arch_models.model import IModel
-from typing import Union, Any, Dict, List
+from typing import Union, Any, Dict, List, Iterable, Iterator
 
 from typing import IO
 
 from extractor.arch_models.operation import Operation
 from extractor.arch_models.service import Service
+from util.json_stream import iter_json_array
 
 
 class ZipkinTrace(IModel):
 
-    def __init__(self, source: Union[str, IO, list] = None, multiple: bool = False, pattern: str = None):
-        super().__init__(self.__class__.__name__, source, multiple, pattern)
+    def __init__(self, source: Union[str, IO, list] = None, multiple: bool = False, pattern: str = None,
+                 streaming: bool = False, workers: int = 1):
+        super().__init__(self.__class__.__name__, source, multiple, pattern, streaming, workers)
+
+    @staticmethod
+    def _parse_tags(tags) -> Dict[str, Any]:
+        return OrderedDict(tags)
+
+    @staticmethod
+    def _parse_logs(annotations) -> Dict[int, Dict[str, str]]:
+        return {a['timestamp']: {'log': a['value']} for a in annotations}
 
     def _parse_multiple(self, model: List[List[Dict[str, Any]]]) -> bool:
-        multiple = [trace for trace_list in model for trace in trace_list]
-        return self._parse(multiple)
+        self._set_default_call_string()
+
+        if not self._parse_all(model):
+            return False
+
+        self.subsequent_calculations()
+
+        return True
 
     def _parse(self, model: List[Dict[str, Any]]) -> bool:
-        # Store span_id: span
-        span_ids = {}
+        self._set_default_call_string()
 
-        client_span_ids = {}
+        if not self._parse_all(self._split(model)):
+            return False
 
-        # Set default value for the call string pattern
+        self.subsequent_calculations()
+
+        return True
+
+    def _parse_traces(self, traces: List[List[Dict[str, Any]]]) -> bool:
+        return self._parse_spans([span for trace_list in traces for span in trace_list])
+
+    def _split(self, model: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """
+        For parallel parsing the spans of a single list are grouped by their trace, otherwise they are parsed as one.
+        """
+        if self._workers == 1:
+            return [model]
+
+        traces = {}
+        for span in model:
+            traces.setdefault(span.get('traceId', None), []).append(span)
+        return list(traces.values())
+
+    def _parse_stream(self, trace_lists: Iterable[Union[List[Dict[str, Any]], Dict[str, Any]]]) -> bool:
+        self._set_default_call_string()
+
+        # Spans of a single list export can belong to any trace, so they can only be parsed once all are known.
+        single = []
+
+        def inner_lists():
+            for trace_list in trace_lists:
+                if isinstance(trace_list, dict):
+                    single.append(trace_list)
+                else:
+                    yield trace_list
+
+        if self._workers > 1:
+            if not self._parse_parallel(inner_lists()):
+                return False
+        else:
+            # Each inner list is parsed on its own and merged into the existing services.
+            for trace_list in inner_lists():
+                if not self._parse_spans(trace_list):
+                    return False
+
+        if single and not self._parse_all(self._split(single)):
+            return False
+
+        self.subsequent_calculations()
+
+        return True
+
+    def _set_default_call_string(self):
         if self._call_string == "" or self._call_string is None:
             self.set_call_string('^get$')
 
+    def _batch_traces(self, batch: List[Union[List[Dict[str, Any]], Dict[str, Any]]]) -> List[List[Dict[str, Any]]]:
+        # A batch can be a single list of spans or a list of span lists, like the exports read() and read_multiple() take
+        trace_lists = [trace_list for trace_list in batch if not isinstance(trace_list, dict)]
+        single = [span for span in batch if isinstance(span, dict)]
+        return trace_lists + (self._split(single) if single else [])
+
+    def _parse_spans(self, model: List[Dict[str, Any]]) -> bool:
+        """
+        Adds the services, operations and dependencies of a list of spans to the model.
+        Parent spans are only looked up within the given list.
+        """
+        # Store span_id: span
+        span_ids = {}
+
+        client_span_ids = {}
+
         # Store all services
         for span in model:
             if span.get('kind', None) != 'CLIENT':
@@ -90,7 +169,7 @@ class ZipkinTrace(IModel):
                 return False
 
             operation_name = span['name']
-            if re.search(self._call_string, operation_name):
+            if self._call_filter.matches(operation_name):
                 continue
 
             if operation_name in self.services[service_name].operations:
@@ -113,23 +192,20 @@ class ZipkinTrace(IModel):
 
             # store the response time (duration) of the operation
             if duration != -1:
-                if operation.response_times.keys().__contains__(local_host):
-                    operation.response_times[local_host].append((span['timestamp'], duration))
-                else:
-                    operation.response_times[local_host] = [(span['timestamp'], duration)]
+                operation.add_response_time(local_host, span['timestamp'], duration)
 
             # Save which instance was used in order to determine the load balancer later
             self._services[service_name].load_balancer.add_instance_history_entry(span['timestamp'], local_host)
 
             operation.durations[span_id] = duration
-            operation.tags[span_id] = OrderedDict(sorted(span.get('tags', {}).items(), key=lambda t: t[0]))
-            operation.logs[span_id] = {a['timestamp']: {'log': a['value']} for a in span.get('annotations', {})}
+            # tags and logs are only decoded if they are accessed, spans with equal tags (or without logs) share an entry
+            tags = self._tag_pool.items(sorted(span.get('tags', {}).items(), key=lambda t: t[0]))
+            operation.tags.add_raw(span_id, tags, ZipkinTrace._parse_tags, self._tag_pool)
+            operation.logs.add_raw(span_id, span.get('annotations') or (), ZipkinTrace._parse_logs, self._tag_pool)
 
-            for s in operation.tags.items():
-                for value in s[1]:
-                    if value == 'pattern.circuitBreaker':
-                        if bool(s[1][value]):
-                            operation.add_circuit_breaker(CircuitBreaker())
+            # only the tags of the current span have to be checked, the ones of earlier spans were checked before
+            if bool(span.get('tags', {}).get('pattern.circuitBreaker', False)):
+                operation.add_circuit_breaker(CircuitBreaker())
 
         # Add dependencies
         for span in model:
@@ -140,7 +216,7 @@ class ZipkinTrace(IModel):
                 local = span.get('localEndpoint', {})
                 service_name = local.get('serviceName', '')
                 operation_name = span['name']
-                if re.search(self._call_string, operation_name):
+                if self._call_filter.matches(operation_name):
                     continue
 
                 operation = self._services[service_name].operations[operation_name]
@@ -151,7 +227,7 @@ class ZipkinTrace(IModel):
                 parent = parent_span.get('localEndpoint', {})
                 parent_service_name = parent.get('serviceName', '')
                 parent_operation_name = parent_span['name']
-                while re.search(self._call_string, parent_operation_name):
+                while self._call_filter.matches(parent_operation_name):
                     parent_id = parent_span.get('parentId', None)
                     if parent_id is None:
                         break
@@ -165,14 +241,16 @@ class ZipkinTrace(IModel):
 
                 parent_operation = self._services[parent_service_name].operations[parent_operation_name]
 
-                if not parent_operation.contains_operation_as_dependency(operation):
-                    parent_operation.add_dependency(Dependency(operation))
+                dependency = parent_operation.get_dependency_with_operation(operation)
+                if dependency is None:
+                    dependency = Dependency(operation)
+                    parent_operation.add_dependency(dependency)
 
                 # keep track of spans that call this operation in order to calculate probabilities later
-                if not parent_operation.get_dependency_with_operation(operation).calling_spans.__contains__(
-                        parent_span):
-                    parent_operation.get_dependency_with_operation(operation).add_calling_span(parent_span)
-                    parent_operation.get_dependency_with_operation(operation).add_call()
+                parent_span_id = (parent_span.get('traceId', None), parent_span['id'])
+                if parent_span_id not in dependency.calling_spans:
+                    dependency.add_calling_span(parent_span_id)
+                    dependency.add_call()
 
                 if span.get('kind', '') != 'PRODUCER' and span.get('kind', '') != 'CONSUMER':
                     # save start time and end time (needed for retry detection)
@@ -184,19 +262,15 @@ class ZipkinTrace(IModel):
                         client_span = client_span_ids[ID]
                         latency = span['timestamp'] - client_span['timestamp']
                         if latency > 0:
-                            parent_operation.get_dependency_with_operation(operation).add_latency(latency)
+                            dependency.add_latency(latency)
 
                         # update start- and end time
                         start_time = client_span['timestamp']
                         end_time = start_time + client_span['duration']
 
                     # add this call to the call history of the parent span in order to detect retries later
-                    parent_operation.retry.add_call_history_entry(
-                        parent_span['id'],
-                        {span['timestamp']: (
-                        operation_name, span.get('tags', {}).get('error', False), start_time, end_time)})
-
-        self.subsequent_calculations()
+                    parent_operation.retry.add_call(parent_span['id'], span['timestamp'], operation_name,
+                                                    span.get('tags', {}).get('error', False), start_time, end_time)
 
         return True
 
@@ -209,6 +283,19 @@ class ZipkinTrace(IModel):
             return self._parse_multiple(source)
         return False
 
+    def read_stream(self, source: Union[str, IO, list, Iterator] = None) -> bool:
+        if isinstance(source, str):
+            with open(source, 'r') as handle:
+                return self._parse_stream(iter_json_array(handle))
+        elif isinstance(source, list):
+            return self._parse_stream(source)
+        elif hasattr(source, 'read'):
+            return self._parse_stream(iter_json_array(source))
+        elif isinstance(source, Iterator):
+            # e.g. the traces fetched by the ZipkinNetworkManager
+            return self._parse_stream(source)
+        return False
+
     def read(self, source: Union[str, IO, list] = None) -> bool:
         if isinstance(source, str):
             return self._parse(json.load(open(source, 'r')))
@@ -0,0 +1,19 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Status codes after which a request is repeated
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+def create_session(workers: int, retries: int, backoff: float) -> requests.Session:
+    """
+    Creates a session that keeps up to `workers` connections open and retries failed requests with exponential backoff.
+    """
+    retry = Retry(total=retries, backoff_factor=backoff, status_forcelist=RETRY_STATUS_CODES,
+                  allowed_methods=frozenset(['GET']), raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers, max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
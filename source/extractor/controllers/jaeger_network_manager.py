@@ -1,67 +1,105 @@
 import json
-import requests
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from typing import Any, Dict, List
 
-URL_ALL_SERVICES = 'http://localhost:16686/api/services'
-URL_SERVICE = 'http://localhost:16686/api/traces?service='
+from extractor.controllers.http_session import create_session
+
+URL_JAEGER = 'http://localhost:16686'
+PATH_ALL_SERVICES = '/api/services'
+PATH_TRACES = '/api/traces'
+
+# Services that are not part of the examined application
+IGNORED_SERVICES = {'jaeger-query'}
 
 
 class JaegerNetworkManager:
     """
-    This class offers the functionality to use the Jaeger HTTP API
+    This class offers the functionality to use the Jaeger HTTP API.
+    The traces of the services are requested concurrently by at most `workers` threads, which share the connections of
+    a single session. Failed requests are repeated up to `retries` times with an exponentially growing delay.
     """
 
-    def __init__(self):
+    def __init__(self, url: str = URL_JAEGER, workers: int = 4, limit: int = None, start: int = None,
+                 end: int = None, lookback: str = None, retries: int = 3, backoff: float = 0.5, timeout: float = 30):
+        """
+        @param url:      Base URL of the Jaeger query service.
+        @param workers:  Maximum number of concurrent requests.
+        @param limit:    Maximum number of traces per service, the default of Jaeger is used if None.
+        @param start:    Start of the time window in microseconds since the epoch.
+        @param end:      End of the time window in microseconds since the epoch.
+        @param lookback: Length of the time window ending now (e.g. '1h', '2d'), used by Jaeger if start is None.
+        @param retries:  Number of retries of a failed request.
+        @param backoff:  Factor of the delay between retries in seconds (backoff, 2 * backoff, 4 * backoff, ...).
+        @param timeout:  Timeout of a single request in seconds.
+        """
+        self.url = url.rstrip('/')
+        self.workers = max(1, workers)
+        self.limit = limit
+        self.start = start
+        self.end = end
+        self.lookback = lookback
+        self.timeout = timeout
+        self.session = create_session(self.workers, retries, backoff)
+        self.services = None
+        # Maps service: response of the Jaeger HTTP API, kept for the backup
+        self.responses: Dict[str, Dict[str, Any]] = {}
         self.traces = {'data': []}
 
-    def get_traces(self):
+    def get_services(self) -> Dict[str, Any]:
         """
-        A method that retrieves all traces from the Jaeger HTTP API
+        Returns the response with the list of all services, which is only requested once.
         """
+        if self.services is None:
+            self.services = self._get(PATH_ALL_SERVICES)
+        return self.services
 
-        # get all services
-        services = requests.get(URL_ALL_SERVICES).json()
+    def get_parameters(self, service: str) -> Dict[str, Any]:
+        """
+        Returns the query parameters of the request of the traces of a service.
+        """
+        parameters = {'service': service, 'limit': self.limit, 'start': self.start, 'end': self.end,
+                      'lookback': self.lookback}
+        return {key: value for key, value in parameters.items() if value is not None}
 
-        # List of all trace IDs used to eliminate duplicate traces
-        traceIDs = []
+    def get_traces_of_service(self, service: str) -> Dict[str, Any]:
+        return self._get(PATH_TRACES, self.get_parameters(service))
 
-        # get the traces for each service and collect them in the traces array
-        for service in services['data']:
-            if service != 'jaeger-query':
-                url = URL_SERVICE + service
-                new_traces = requests.get(url).json()['data']
+    def get_traces(self):
+        """
+        A method that retrieves all traces from the Jaeger HTTP API
+        """
+        services = [service for service in self.get_services()['data'] or [] if service not in IGNORED_SERVICES]
+        missing = [service for service in services if service not in self.responses]
 
-                # Elimination of duplicate traces
-                for trace in new_traces:
-                    if trace['traceID'] not in traceIDs:
-                        traceIDs.append(trace['traceID'])
-                        self.traces['data'].append(trace)
+        # the responses are collected in the order of the services, so the traces keep a deterministic order
+        with ThreadPoolExecutor(self.workers) as executor:
+            for service, response in zip(missing, executor.map(self.get_traces_of_service, missing)):
+                self.responses[service] = response
 
+        self.traces = {'data': unique_traces(self.responses[service]['data'] for service in services)}
         return self.traces
 
     def create_backup(self):
         """
-        A method that saves all files retrieved from the Jaeger HTTP API as json files in a new backup directory
+        A method that saves all files retrieved from the Jaeger HTTP API as json files in a new backup directory.
+        The responses of get_traces are reused, so the API is only requested if the traces weren't retrieved before.
         """
+        self.get_traces()
 
         # create backup directory
         backup_path = 'backup_{}'.format(datetime.now().strftime("%d-%m-%Y_%H-%M-%S"))
         os.makedirs(backup_path)
 
         # backup services.json
-        services = requests.get(URL_ALL_SERVICES).json()
-        handle = open(backup_path + '/services.json', 'w+')
-        handle.write(json.dumps(services))
-        handle.close()
+        with open(backup_path + '/services.json', 'w+') as handle:
+            handle.write(json.dumps(self.get_services()))
 
-        # get the traces for each service and collect them in the traces array
-        for service in services['data']:
-            if service != 'jaeger-query':
-                url = URL_SERVICE + service
-                handle = open(backup_path + '/' + service + '.json', 'w+')
-                handle.write(json.dumps(requests.get(url).json()))
-                handle.close()
+        for service, response in self.responses.items():
+            with open(backup_path + '/' + service + '.json', 'w+') as handle:
+                handle.write(json.dumps(response))
+        return backup_path
 
     def load_backup(self, path):
         """
@@ -72,21 +110,35 @@ class JaegerNetworkManager:
         with open(file) as f:
             services = json.load(f)
 
-        # List of all trace IDs used to eliminate duplicate traces
-        traceIDs = []
-
         # get the traces for each service from the corresponding file and collect them in the traces array
+        responses = []
         for service in services['data']:
-            if service != 'jaeger-query':
+            if service not in IGNORED_SERVICES:
                 file_path = path + '/' + service + '.json'
                 with open(file_path) as f:
-                    file = json.load(f)
-                    new_traces = file['data']
-
-                    # Elimination of duplicate traces
-                    for trace in new_traces:
-                        if trace['traceID'] not in traceIDs:
-                            traceIDs.append(trace['traceID'])
-                            self.traces['data'].append(trace)
+                    responses.append(json.load(f)['data'])
 
+        self.traces['data'].extend(unique_traces(responses, {trace['traceID'] for trace in self.traces['data']}))
         return self.traces
+
+    def close(self):
+        self.session.close()
+
+    def _get(self, path: str, parameters: Dict[str, Any] = None) -> Dict[str, Any]:
+        response = self.session.get(self.url + path, params=parameters, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+
+def unique_traces(trace_lists, trace_ids: set = None) -> List[Dict[str, Any]]:
+    """
+    Concatenates the lists of traces and eliminates duplicate traces, which occur if a trace spans several services.
+    """
+    trace_ids = set() if trace_ids is None else trace_ids
+    traces = []
+    for new_traces in trace_lists:
+        for trace in new_traces or []:
+            if trace['traceID'] not in trace_ids:
+                trace_ids.add(trace['traceID'])
+                traces.append(trace)
+    return traces
@@ -0,0 +1,94 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from extractor.controllers.jaeger_network_manager import JaegerNetworkManager
+
+
+def trace(trace_id: str, service: str) -> dict:
+    return {'traceID': trace_id, 'spans': [], 'processes': {'p1': {'serviceName': service, 'tags': []}}}
+
+
+# Trace 't2' is returned for both services and must only be collected once
+TRACES = {'frontend': [trace('t1', 'frontend'), trace('t2', 'frontend')],
+          'backend': [trace('t2', 'frontend'), trace('t3', 'backend')]}
+
+
+class StubJaegerHandler(BaseHTTPRequestHandler):
+    """
+    Answers like the Jaeger HTTP API. The first request of the traces of each service fails, so it has to be retried.
+    """
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parameters = {key: values[0] for key, values in parse_qs(url.query).items()}
+        with self.server.lock:
+            self.server.requests.append((url.path, parameters))
+            attempt = sum(1 for path, other in self.server.requests if path == url.path and other == parameters)
+        if url.path == '/api/services':
+            self.respond(200, {'data': list(TRACES) + ['jaeger-query']})
+        elif url.path == '/api/traces' and attempt == 1:
+            self.respond(503, {'errors': ['unavailable']})
+        elif url.path == '/api/traces':
+            self.respond(200, {'data': TRACES[parameters['service']][:int(parameters.get('limit', 20))]})
+        else:
+            self.respond(404, {})
+
+    def respond(self, status: int, body: dict):
+        content = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestJaegerNetworkManager(unittest.TestCase):
+    def setUp(self):
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), StubJaegerHandler)
+        self._server.requests = []
+        self._server.lock = threading.Lock()
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        self._url = 'http://127.0.0.1:%d' % self._server.server_address[1]
+        self._directory = tempfile.TemporaryDirectory()
+        self._cwd = os.getcwd()
+
+    def tearDown(self):
+        os.chdir(self._cwd)
+        self._directory.cleanup()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def test_get_traces(self):
+        manager = JaegerNetworkManager(self._url, workers=2, limit=5, start=1000, end=2000, backoff=0)
+        traces = manager.get_traces()
+        manager.close()
+
+        self.assertEqual(['t1', 't2', 't3'], [trace['traceID'] for trace in traces['data']])
+        trace_requests = [parameters for path, parameters in self._server.requests if path == '/api/traces']
+        # every service is requested twice because of the retry, jaeger-query is never requested
+        self.assertEqual(['backend', 'backend', 'frontend', 'frontend'],
+                         sorted(parameters['service'] for parameters in trace_requests))
+        for parameters in trace_requests:
+            self.assertEqual({'limit': '5', 'start': '1000', 'end': '2000'},
+                             {key: parameters[key] for key in ('limit', 'start', 'end')})
+
+    def test_backup(self):
+        os.chdir(self._directory.name)
+        manager = JaegerNetworkManager(self._url, workers=2, backoff=0)
+        traces = manager.get_traces()
+        number_of_requests = len(self._server.requests)
+        backup_path = manager.create_backup()
+        manager.close()
+
+        # the backup reuses the responses of get_traces
+        self.assertEqual(number_of_requests, len(self._server.requests))
+        self.assertEqual(1, sum(1 for path, parameters in self._server.requests if path == '/api/services'))
+        self.assertEqual(traces, JaegerNetworkManager().load_backup(backup_path))
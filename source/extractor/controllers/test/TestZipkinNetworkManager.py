@@ -0,0 +1,139 @@
+import copy
+import json
+import os
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from extractor.arch_models.architecture_misim import ArchitectureMiSim
+from extractor.arch_models.zipkin_trace import ZipkinTrace
+from extractor.controllers.zipkin_network_manager import ZipkinNetworkManager, get_trace_id
+
+# End of the time span of the synthetic traces in milliseconds
+END_TS = 1657538143000 + 6 * 60 * 60 * 1000
+# Distance between the synthetic traces in milliseconds
+TRACE_INTERVAL = 10 * 60 * 1000
+
+
+def synthetic_traces(count: int) -> list:
+    """
+    Copies of the round-robin trace with their own ids, one every TRACE_INTERVAL before END_TS. The stub server uses
+    the timestamp of the first span as the one of the trace.
+    """
+    with open(os.path.join('source', 'extractor', 'arch_models', 'test', 'trace', 'zipkin_round_robin.json')) as handle:
+        spans = json.load(handle)
+    first_timestamp = spans[0]['timestamp']
+    traces = []
+    for i in range(count):
+        offset = (END_TS - i * TRACE_INTERVAL) * 1000 - first_timestamp
+        trace = copy.deepcopy(spans)
+        for span in trace:
+            span['traceId'] = '%016x' % i
+            span['id'] = '%04x' % i + span['id'][4:]
+            if 'parentId' in span:
+                span['parentId'] = '%04x' % i + span['parentId'][4:]
+            span['timestamp'] += offset
+        traces.append(trace)
+    return traces
+
+
+class StubZipkinHandler(BaseHTTPRequestHandler):
+    """
+    Answers like the Zipkin HTTP API: Returns the latest traces of a service within the window of endTs and lookback.
+    The first request of the services fails, so it has to be retried.
+    """
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parameters = {key: values[0] for key, values in parse_qs(url.query).items()}
+        with self.server.lock:
+            self.server.requests.append((url.path, parameters))
+            attempt = sum(1 for path, _ in self.server.requests if path == url.path)
+        if url.path == '/api/v2/services' and attempt == 1:
+            self.respond(503, [])
+        elif url.path == '/api/v2/services':
+            self.respond(200, sorted({span['localEndpoint']['serviceName'] for span in self.server.traces[0]}))
+        elif url.path == '/api/v2/traces':
+            end_ts = int(parameters['endTs'])
+            start_ts = end_ts - int(parameters['lookback'])
+            traces = [trace for trace in self.server.traces
+                      if start_ts <= trace[0]['timestamp'] // 1000 <= end_ts
+                      and any(span['localEndpoint']['serviceName'] == parameters['serviceName'] for span in trace)]
+            traces.sort(key=lambda trace: -trace[0]['timestamp'])
+            self.respond(200, traces[:int(parameters['limit'])])
+        else:
+            self.respond(404, [])
+
+    def respond(self, status: int, body: list):
+        content = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestZipkinNetworkManager(unittest.TestCase):
+    def setUp(self):
+        self._traces = synthetic_traces(36)
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), StubZipkinHandler)
+        self._server.traces = self._traces
+        self._server.requests = []
+        self._server.lock = threading.Lock()
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        self._url = 'http://127.0.0.1:%d' % self._server.server_address[1]
+        self._directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._directory.cleanup()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def network_manager(self) -> ZipkinNetworkManager:
+        # 2 hour windows contain 12 traces each, so every page of 5 traces is split up until it is complete
+        return ZipkinNetworkManager(self._url, workers=3, limit=5, end_ts=END_TS, lookback=6 * 60 * 60 * 1000,
+                                    window=2 * 60 * 60 * 1000, backoff=0)
+
+    def test_windows(self):
+        manager = self.network_manager()
+        self.assertEqual([(END_TS, 7200000), (END_TS - 7200000, 7200000), (END_TS - 14400000, 7200000)],
+                         manager.get_windows())
+        manager.lookback = 5 * 60 * 60 * 1000
+        self.assertEqual((END_TS - 14400000, 3600000), manager.get_windows()[-1])
+        manager.close()
+
+    def test_iter_traces(self):
+        manager = self.network_manager()
+        trace_ids = [get_trace_id(trace) for trace in manager.iter_traces()]
+        manager.close()
+
+        self.assertEqual(sorted(get_trace_id(trace) for trace in self._traces), sorted(trace_ids))
+        pages = [parameters for path, parameters in self._server.requests if path == '/api/v2/traces']
+        self.assertTrue(all(parameters['limit'] == '5' for parameters in pages))
+        self.assertTrue(any(int(parameters['lookback']) < 7200000 for parameters in pages))
+        # the services are requested once, the first attempt fails and is retried
+        self.assertEqual(2, sum(1 for path, _ in self._server.requests if path == '/api/v2/services'))
+
+    def test_stream_into_model(self):
+        manager = self.network_manager()
+        # the order of the traces is deterministic, but differs from the one of the synthetic traces
+        expected = ZipkinTrace(list(manager.iter_traces()), True)
+        model = ZipkinTrace(manager.iter_traces(), streaming=True)
+        manager.close()
+
+        self.assertEqual(ArchitectureMiSim(expected, "", "mstd").export(), ArchitectureMiSim(model, "", "mstd").export())
+
+    def test_write_traces(self):
+        path = os.path.join(self._directory.name, 'zipkin.json')
+        manager = self.network_manager()
+        self.assertEqual(len(self._traces), manager.write_traces(path))
+        expected = ZipkinTrace(list(manager.iter_traces()), True)
+        manager.close()
+
+        model = ZipkinTrace(path, streaming=True)
+        self.assertEqual(ArchitectureMiSim(expected, "", "mstd").export(), ArchitectureMiSim(model, "", "mstd").export())
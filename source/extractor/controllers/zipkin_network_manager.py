@@ -1,16 +1,55 @@
+import codecs
 import json
-import requests
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from typing import Any, Dict, Iterator, List, Tuple
 
-URL_Traces = 'http://localhost:9411/api/v2/traces?limit='
+from extractor.controllers.http_session import create_session
+from util.json_stream import iter_json_array
+
+URL_ZIPKIN = 'http://localhost:9411'
+PATH_ALL_SERVICES = '/api/v2/services'
+PATH_TRACES = '/api/v2/traces'
+
+# Default length of the time windows in milliseconds (one hour)
+DEFAULT_WINDOW = 60 * 60 * 1000
+# Default time span that is fetched in milliseconds (one day, like the default of Zipkin)
+DEFAULT_LOOKBACK = 24 * 60 * 60 * 1000
 
 
 class ZipkinNetworkManager:
     """
-    This class offers the functionality to use the Zipkin HTTP API
+    This class offers the functionality to use the Zipkin HTTP API.
+    Besides a single request of the latest traces, the traces can be fetched page by page: The time span of `lookback`
+    milliseconds before `end_ts` is split into windows, and the traces of every service and window are requested
+    concurrently by at most `workers` threads. A window whose page reaches the limit is split into halves and fetched
+    again, so no traces are cut off. The pages are passed on one at a time, so only a few pages are in memory at once.
     """
 
-    def __init__(self):
+    def __init__(self, url: str = URL_ZIPKIN, workers: int = 4, limit: int = 1000, end_ts: int = None,
+                 lookback: int = DEFAULT_LOOKBACK, window: int = DEFAULT_WINDOW, retries: int = 3,
+                 backoff: float = 0.5, timeout: float = 60):
+        """
+        @param url:      Base URL of the Zipkin server.
+        @param workers:  Maximum number of concurrent requests.
+        @param limit:    Maximum number of traces per page.
+        @param end_ts:   End of the fetched time span in milliseconds since the epoch, the current time if None.
+        @param lookback: Length of the fetched time span in milliseconds.
+        @param window:   Length of the time window of a single page in milliseconds.
+        @param retries:  Number of retries of a failed request.
+        @param backoff:  Factor of the delay between retries in seconds (backoff, 2 * backoff, 4 * backoff, ...).
+        @param timeout:  Timeout of a single request in seconds.
+        """
+        self.url = url.rstrip('/')
+        self.workers = max(1, workers)
+        self.limit = limit
+        self.end_ts = end_ts
+        self.lookback = lookback
+        self.window = max(1, window)
+        self.timeout = timeout
+        self.session = create_session(self.workers, retries, backoff)
         self.traces = None
 
     def get_traces(self, limit: int):
@@ -21,7 +60,7 @@ class ZipkinNetworkManager:
             # take default value if input is invalid
             limit = 10
 
-        self.traces = requests.get(URL_Traces + str(limit)).json()
+        self.traces = self._get(PATH_TRACES, {'limit': limit})
         return self.traces
 
     def create_backup(self, limit):
@@ -39,3 +78,86 @@ class ZipkinNetworkManager:
         handle = open(backup_path + '.json', 'w+')
         handle.write(json.dumps(self.traces))
         handle.close()
+
+    def get_services(self) -> List[str]:
+        return self._get(PATH_ALL_SERVICES)
+
+    def get_windows(self) -> List[Tuple[int, int]]:
+        """
+        Returns the (endTs, lookback) pairs of the windows that cover the fetched time span, the latest first.
+        """
+        end_ts = self.end_ts if self.end_ts is not None else int(time.time() * 1000)
+        start_ts = end_ts - self.lookback
+        return [(end, min(self.window, end - start_ts)) for end in range(end_ts, start_ts, -self.window)]
+
+    def get_page(self, service: str, end_ts: int, lookback: int) -> List[List[Dict[str, Any]]]:
+        """
+        Returns the traces of a service within a single window. The response is decoded while it is received, so
+        its text is never held in memory as a whole.
+        """
+        parameters = {'serviceName': service, 'endTs': end_ts, 'lookback': lookback, 'limit': self.limit}
+        with self.session.get(self.url + PATH_TRACES, params=parameters, timeout=self.timeout, stream=True) as response:
+            response.raise_for_status()
+            response.raw.decode_content = True
+            return list(iter_json_array(codecs.getreader('utf-8')(response.raw)))
+
+    def iter_traces(self) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Lazily yields every trace (a list of spans) of the fetched time span once, in the order of the windows.
+        The iterator can directly be used as the source of a streaming ZipkinTrace.
+        """
+        services = self.get_services()
+        queries = deque((service, end_ts, lookback) for end_ts, lookback in self.get_windows() for service in services)
+        # Traces that span several services (or overlapping windows) are returned multiple times
+        trace_ids = set()
+        with ThreadPoolExecutor(self.workers) as executor:
+            # The results are consumed in the order of the queries, the next queries are already running meanwhile
+            pending = deque()
+            while queries or pending:
+                while queries and len(pending) < 2 * self.workers:
+                    query = queries.popleft()
+                    pending.append((query, executor.submit(self.get_page, *query)))
+                query, future = pending.popleft()
+                page = future.result()
+
+                service, end_ts, lookback = query
+                if len(page) >= self.limit and lookback > 1:
+                    # the page might be cut off, so both halves of the window are fetched again
+                    half = lookback // 2
+                    queries.appendleft((service, end_ts - half, lookback - half))
+                    queries.appendleft((service, end_ts, half))
+
+                for trace in page:
+                    trace_id = get_trace_id(trace)
+                    if trace_id not in trace_ids:
+                        trace_ids.add(trace_id)
+                        yield trace
+
+    def write_traces(self, path: str) -> int:
+        """
+        Writes the traces of the fetched time span page by page to a json file, which has the format of a Zipkin export
+        with multiple traces. Returns the number of written traces.
+        """
+        number_of_traces = 0
+        with open(path, 'w') as handle:
+            handle.write('[')
+            for trace in self.iter_traces():
+                if number_of_traces:
+                    handle.write(',\n')
+                json.dump(trace, handle)
+                number_of_traces += 1
+            handle.write(']\n')
+        return number_of_traces
+
+    def close(self):
+        self.session.close()
+
+    def _get(self, path: str, parameters: Dict[str, Any] = None) -> Any:
+        response = self.session.get(self.url + path, params=parameters, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+
+def get_trace_id(trace: List[Dict[str, Any]]) -> str:
+    # all spans of a trace returned by the API share the trace id
+    return trace[0]['traceId'] if trace else None
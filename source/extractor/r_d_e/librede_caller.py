@@ -1,55 +1,132 @@
 import os
-import pathlib
-import shutil
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import numpy as np
 import platform
 
 from extractor.arch_models.model import IModel
 from extractor.arch_models.operation import Operation
 from extractor.arch_models.service import Service
+from extractor.r_d_e.librede_configuration_creator import LibredeConfigurationCreator
+from extractor.r_d_e.librede_estimate_cache import LibredeEstimateCache
 from extractor.r_d_e.librede_input_creator import LibredeInputCreator
 from extractor.r_d_e.librede_output_parser import LibredeOutputParser
+from extractor.r_d_e.librede_settings import LibredeSettings
 from input.input_utils import get_valid_string_input_with_predicates, get_valid_dir_path_input, get_valid_yes_no_input
 
 
+class LibredeRun:
+    """
+    Result of a single call of LibReDE for one configuration: The exit status of the script and the time it took.
+    The configuration and the output of LibReDE in a log file are stored in the directory of the run.
+    """
+
+    def __init__(self, configuration: LibredeConfigurationCreator, directory: str):
+        self.configuration = configuration
+        self.directory = directory
+        self.path_to_configuration_file = os.path.abspath(directory + configuration.get_file_name())
+        self.path_to_log_file = directory + "librede.log"
+        self.return_code: int = None
+        self.duration: float = None
+
+    def succeeded(self) -> bool:
+        return self.return_code == 0
+
+    def __str__(self):
+        return self.configuration.get_description() + ": exit status " + str(self.return_code) + \
+               " after " + "{:.1f}".format(self.duration) + "s"
+
+
 class LibredeCaller:
     """
     Class which contains the functionality to extract the input for LibReDE out of a generic model, call LibReDE,
     parse its output and write the gained information back in the generic model (to the field "demand" of an operation).
     All of this automatically happens at instantiation.
+    In batched mode all operations of a host are estimated by a single call of LibReDE.
+    Estimates are cached on disk, LibReDE is only called for configurations with changed inputs or another LibReDE command.
+    Everything that is not given by the settings is asked for via the command line.
     """
 
-    def __init__(self, model: IModel):
-        self.approaches = ["ResponseTimeApproximationApproach", "ServiceDemandLawApproach", "WangKalmanFilterApproach"]
+    # Approaches of LibReDE that are used for the estimation
+    APPROACHES = ["ResponseTimeApproximationApproach", "ServiceDemandLawApproach", "WangKalmanFilterApproach"]
+
+    def __init__(self, model: IModel, settings: LibredeSettings = None):
+        self.approaches = list(LibredeCaller.APPROACHES)
         self.relative_path_to_librede_script_file = os.path.sep + "tools.descartes.librede.releng.standalone" + os.path.sep + "target" \
                                                     + os.path.sep + "standalone" + os.path.sep + "console" + os.path.sep
         self.model: IModel = model
-        self.path_to_librede_files = str(pathlib.Path(__file__).parent.resolve()) + os.path.sep + "librede_files" + os.path.sep
-        self.librede_input_creator: LibredeInputCreator = LibredeInputCreator(self.model, self.path_to_librede_files, self.approaches)
-        self.path_to_librede_bat_file: str = self.ask_for_path_of_librede_installation() + self.relative_path_to_librede_script_file
+        self.settings: LibredeSettings = settings or LibredeSettings()
+        self.settings.check_approaches(self.approaches)
+        self.path_to_librede_files = self.settings.path_to_librede_files
+        self.path_to_run_directories = self.path_to_librede_files + "runs" + os.path.sep
+        # amount of LibReDE processes that run at the same time
+        self.workers: int = self.settings.workers
+        self.runs: list[LibredeRun] = []
+        # the command is part of the fingerprints of the cache, so it is needed even if all estimates are cached
+        self.librede_command: list[str] = self.get_librede_command()
+        # the script of an installation finds its libraries relative to its own directory, other commands are run in
+        # the current working directory, so relative paths in them keep working
+        self.librede_working_directory: str = None if self.settings.librede_command else os.path.dirname(self.librede_command[0])
+        self.estimate_cache: LibredeEstimateCache = LibredeEstimateCache(self.path_to_librede_files + "estimate_cache.json", self.librede_command) \
+            if self.settings.use_cache else None
+        self.librede_input_creator: LibredeInputCreator = LibredeInputCreator(self.model, self.path_to_librede_files, self.approaches, self.settings.batched,
+                                                                                 self.estimate_cache, self.settings)
 
         self.call_librede()
-        self.librede_output_parser = LibredeOutputParser(self.librede_input_creator.operations_on_host, self.path_to_librede_files + "output" + os.path.sep, self.approaches, model)
+        self.librede_output_parser = LibredeOutputParser(self.librede_input_creator.configurations, self.path_to_librede_files + "output" + os.path.sep, self.approaches, model,
+                                                          self.estimate_cache, self.settings.approaches_to_use,
+                                                          [run.configuration for run in self.runs if not run.succeeded()])
         self.parse_output_of_librede()
+        if self.estimate_cache is not None:
+            self.estimate_cache.save()
+
+    def get_librede_command(self) -> list[str]:
+        """
+        Returns the command that runs LibReDE: Either the command of the settings or the script of the LibReDE
+        installation. Asks for the path of the installation if neither is set.
+        """
+        if self.settings.librede_command:
+            return list(self.settings.librede_command)
+        path_to_librede_installation = self.settings.path_to_librede_installation or self.ask_for_path_of_librede_installation()
+        name_of_script_file = "librede.bat" if platform.system() == "Windows" else "librede.sh"
+        return [os.path.abspath(path_to_librede_installation + self.relative_path_to_librede_script_file + name_of_script_file)]
 
     def call_librede(self):
         """
-        Calls LibReDE for each configuration which was created by the LibredeInputCreator.
-        LibReDE needs a workaround: The .bat needs to be called from the path where it is and the configurations must be in the same folder.
-        That's why the current working directory is changed, later restored and the configuration file gets copied to the location of the
-        .bat and then deleted.
-        """
-        old_dir = os.getcwd()
-        for configuration in self.librede_input_creator.configurations:
-            shutil.copy(configuration.get_path_to_configuration_file(), self.path_to_librede_bat_file)
-        os.chdir(self.path_to_librede_bat_file)
-        for configuration in self.librede_input_creator.configurations:
-            name_of_script_file = "librede.bat" if platform.system() == "Windows" else "./librede.sh"
-            command: str = name_of_script_file + " -c " + configuration.get_file_name() + ""
-            print("Running \"" + command + "\" for operation \"" + configuration.service_operation.operation_name + "\" on host \"" + configuration.service_operation.host.name + "\"")
-            os.system(command)
-            os.remove(self.path_to_librede_bat_file + configuration.get_file_name())
-        os.chdir(old_dir)
+        Calls LibReDE for each configuration which was created by the LibredeInputCreator and is not in the cache.
+        The calls run concurrently in a pool of at most self.workers processes. Each run gets its own directory with
+        its configuration, which is passed to LibReDE by its absolute path, and its log, while all runs share
+        self.librede_working_directory. The exit status and duration of every run are stored in self.runs.
+        """
+        self.runs = [LibredeRun(configuration, self.path_to_run_directories + os.path.splitext(configuration.get_file_name())[0] + os.path.sep)
+                     for configuration in self.librede_input_creator.uncached_configurations]
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [executor.submit(self.run_librede, run) for run in self.runs]
+            for future in as_completed(futures):
+                run = future.result()
+                print("Finished LibReDE for " + str(run))
+
+    def run_librede(self, run: LibredeRun) -> LibredeRun:
+        """
+        Calls LibReDE for the configuration of a single run and waits for it to finish.
+        """
+        os.makedirs(run.directory, exist_ok=True)
+        # the output of an earlier run must not be taken for the result of this one
+        for approach in run.configuration.approaches:
+            if os.path.exists(run.configuration.get_path_to_output_file(approach)):
+                os.remove(run.configuration.get_path_to_output_file(approach))
+        with open(run.path_to_configuration_file, "w") as configuration_file:
+            configuration_file.write(run.configuration.get_xml_content())
+
+        command = self.librede_command + ["-c", run.path_to_configuration_file]
+        print("Running \"" + " ".join(command) + "\" for " + run.configuration.get_description())
+        start = time.perf_counter()
+        with open(run.path_to_log_file, "w") as log_file:
+            run.return_code = subprocess.call(command, cwd=self.librede_working_directory, stdout=log_file, stderr=subprocess.STDOUT)
+        run.duration = time.perf_counter() - start
+        return run
 
     def ask_for_path_of_librede_installation(self):
         """
@@ -118,5 +195,8 @@ class LibredeCaller:
         Prints a string summarising the call of librede.
         """
         print("Summary of use of LibReDE:")
+        for run in self.runs:
+            print(("" if run.succeeded() else "FAILED: ") + "LibReDE for " + str(run) + " (log: " + run.path_to_log_file + ")")
         self.librede_input_creator.print_summary_of_input()
+        self.librede_output_parser.print_configurations_without_estimates()
         self.librede_output_parser.print_final_results()
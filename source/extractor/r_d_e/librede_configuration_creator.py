@@ -4,12 +4,14 @@ from extractor.r_d_e.librede_service_operation import LibredeServiceOperation
 
 class LibredeConfigurationCreator:
     """
-    Creates a LibReDE_Configuration-File out of the given service.
+    Creates a LibReDE_Configuration-File out of the given operations, which all run on the same host.
+    A configuration with a single operation is estimated on its own. A batched configuration contains all operations of
+    a host as separate services of the same resource, so LibReDE has to be started only once per host.
     """
 
-    def __init__(self, service_operation: LibredeServiceOperation, approaches: list[str], path_for_input_files: str, path_for_output_files: str):
-        self.service_operation = service_operation
-        self.host: LibredeHost = service_operation.host
+    def __init__(self, service_operations: list[LibredeServiceOperation], approaches: list[str], path_for_input_files: str, path_for_output_files: str):
+        self.service_operations = service_operations
+        self.host: LibredeHost = service_operations[0].host
         self.path_for_input_files = path_for_input_files
         self.path_for_output_files = path_for_output_files
         self.start_timestamp = int(self.host.start_time / 10 ** 3)
@@ -18,11 +20,35 @@ class LibredeConfigurationCreator:
         self.content = ""
         self.create_content()
 
+    def is_batched(self) -> bool:
+        return len(self.service_operations) > 1
+
     def get_path_to_configuration_file(self) -> str:
         return self.path_for_input_files + self.get_file_name()
 
     def get_file_name(self) -> str:
-        return "configuration_" + str(self.host.id) + "_" + str(self.service_operation.id) + ".librede"
+        if self.is_batched():
+            return "configuration_" + str(self.host.id) + ".librede"
+        return "configuration_" + str(self.host.id) + "_" + str(self.service_operations[0].id) + ".librede"
+
+    def get_output_file_prefix(self) -> str:
+        if self.is_batched():
+            return "host" + str(self.host.id)
+        return str(self.service_operations[0].id)
+
+    def get_path_to_output_file(self, approach: str) -> str:
+        return self.path_for_output_files + self.get_output_file_prefix() + "_" + approach + "_fold_0.csv"
+
+    def get_output_column(self, service_operation: LibredeServiceOperation) -> int:
+        """
+        Returns the column of the estimates of the given operation in the output-csv-files of LibReDE.
+        The first column is the time, followed by the estimates of the services in the order of the workload description.
+        """
+        return self.service_operations.index(service_operation) + 1
+
+    def get_description(self) -> str:
+        operation_names = "\", \"".join(service_operation.operation_name for service_operation in self.service_operations)
+        return ("operations" if self.is_batched() else "operation") + " \"" + operation_names + "\" on host \"" + self.host.name + "\""
 
     def get_xml_content(self):
         return self.content
@@ -40,22 +66,24 @@ class LibredeConfigurationCreator:
     def create_workload_description(self):
         self.content += "<workloadDescription>\n"
         self.content += "   <resources name=\"host" + str(self.host.id) + "\"/>\n"
-        self.content += "   <services name=\"op" + str(self.service_operation.id) + "\"/>\n"
+        for service_operation in self.service_operations:
+            self.content += "   <services name=\"op" + str(service_operation.id) + "\"/>\n"
         self.content += "</workloadDescription>\n"
 
     def create_input(self):
         self.content += "<input>\n"
         self.content += "   <dataSources name=\"CSV_Data\" type=\"tools.descartes.librede.datasource.csv.CsvDataSource\"/>\n"
-        self.content += "   <observations xsi:type=\"librede:FileTraceConfiguration\" metric=\"RESPONSE_TIME\" dataSource=\"//@input/@dataSources.0\" file=\"" + self.path_for_input_files + self.service_operation.get_csv_file_name() + "\">\n"
-        self.content += "       <mappings entity=\"//@workloadDescription/@services.0\"/>\n"
-        self.content += "   </observations>\n"
+        for index, service_operation in enumerate(self.service_operations):
+            self.content += "   <observations xsi:type=\"librede:FileTraceConfiguration\" metric=\"RESPONSE_TIME\" dataSource=\"//@input/@dataSources.0\" file=\"" + self.path_for_input_files + service_operation.get_csv_file_name() + "\">\n"
+            self.content += "       <mappings entity=\"//@workloadDescription/@services." + str(index) + "\"/>\n"
+            self.content += "   </observations>\n"
         self.content += "   <observations xsi:type=\"librede:FileTraceConfiguration\" metric=\"UTILIZATION\" dataSource=\"//@input/@dataSources.0\" file=\"" + self.path_for_input_files + self.host.get_csv_file_name() + "\">\n"
         self.content += "       <mappings entity=\"//@workloadDescription/@resources.0\"/>\n"
         self.content += "   </observations>\n"
         self.content += "</input>\n"
 
     def create_estimation(self):
-        window = len(self.service_operation.response_times)
+        window = max(service_operation.get_number_of_response_times() for service_operation in self.service_operations)
         step_size = int((self.end_timestamp - self.start_timestamp) / window)
         self.content += "<estimation window=\"" + str(window) + "\" stepSize=\"" + str(step_size) + "\" startTimestamp=\"" + str(self.start_timestamp) + "\" endTimestamp=\"" + str(self.end_timestamp) + "\">\n"
         for approach in self.approaches:
@@ -63,7 +91,7 @@ class LibredeConfigurationCreator:
         self.content += "</estimation>\n"
 
     def create_output(self):
-        output_file_name_prefix: str = str(self.service_operation.id)
+        output_file_name_prefix: str = self.get_output_file_prefix()
         self.content += "<output>\n"
         self.content += "   <exporters name=\"CSV_Export\" type=\"tools.descartes.librede.export.csv.CsvExporter\">\n"
         self.content += "       <parameters name=\"OutputDirectory\" value=\"" + self.path_for_output_files + "\"/>\n"
@@ -76,11 +104,19 @@ class LibredeConfigurationCreator:
 
 
 def create_configurations(service_operations: list[LibredeServiceOperation], approaches: list[str],
-                          path_for_input_files: str, path_for_output_files: str) -> list[LibredeConfigurationCreator]:
+                          path_for_input_files: str, path_for_output_files: str, batched: bool = False) -> list[LibredeConfigurationCreator]:
     """
     Creates a configuration for every given service.
+    If batched is set, a single configuration is created for all services on the same host instead.
     """
+    if batched:
+        operations_per_host = dict[LibredeHost, list[LibredeServiceOperation]]()
+        for service_operation in service_operations:
+            operations_per_host.setdefault(service_operation.host, []).append(service_operation)
+        groups = list(operations_per_host.values())
+    else:
+        groups = [[service_operation] for service_operation in service_operations]
     configurations = list[LibredeConfigurationCreator]()
-    for service_operation in service_operations:
-        configurations.append(LibredeConfigurationCreator(service_operation, approaches, path_for_input_files, path_for_output_files))
+    for group in groups:
+        configurations.append(LibredeConfigurationCreator(group, approaches, path_for_input_files, path_for_output_files))
     return configurations
@@ -0,0 +1,92 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+# Size of the write buffer of the csv-files.
+BUFFER_SIZE = 1 << 20
+# Values that are formatted as fixed-point numbers must be smaller, so they can be scaled to integers.
+MAX_FIXED_POINT_VALUE = 10 ** 15
+
+
+def format_fixed_point(values: np.ndarray, decimals: int):
+    """
+    Formats non-negative numbers with the given amount of decimals as ASCII characters without leading zeros and with
+    at most one trailing zero, like str() does for short numbers (e.g. "0.25", "12.0", "1657538143.939"). Unlike str(),
+    numbers below 1e-4 are written without exponent (e.g. "0.00001" instead of "1e-05").
+    The characters of all rows are computed at once: Returns a matrix with a row of characters per value and a mask of
+    the characters that belong to the number. Returns None if the values cannot be written with the given decimals.
+    """
+    scale = 10 ** decimals
+    if len(values) == 0 or not np.all(np.isfinite(values)) or values.min() < 0 or values.max() * scale >= MAX_FIXED_POINT_VALUE:
+        return None
+    scaled = np.rint(values * scale).astype(np.int64)
+    if not np.array_equal(scaled / scale, values):
+        return None
+
+    integer_digits = len(str(scaled.max() // scale))
+    digit_columns = list(range(integer_digits)) + list(range(integer_digits + 1, integer_digits + 1 + decimals))
+    characters = np.full((len(values), digit_columns[-1] + 1), ord("."), dtype=np.uint8)
+    # the digits are filled in from the right, one column for all values at a time
+    for column in reversed(digit_columns):
+        scaled, digit = np.divmod(scaled, 10)
+        characters[:, column] = digit + ord("0")
+
+    nonzero = (characters != ord("0")) & (characters != ord("."))
+    columns = np.arange(characters.shape[1])
+    # leading zeros of the integer part are left out, except for its last digit
+    first = np.where(nonzero[:, :integer_digits - 1].any(axis=1), nonzero.argmax(axis=1), integer_digits - 1)
+    keep = columns >= first[:, None]
+    if decimals > 0:
+        # trailing zeros of the decimals are left out, except for the first decimal
+        last = np.where(nonzero[:, integer_digits + 2:].any(axis=1), columns[-1] - nonzero[:, ::-1].argmax(axis=1),
+                        integer_digits + 1)
+        keep &= columns <= last[:, None]
+    return characters, keep
+
+
+def get_csv_bytes(first_column: np.ndarray, second_column: np.ndarray, decimals: tuple[int, int]) -> bytes:
+    """
+    Builds the rows of a .csv-file from two columns formatted with format_fixed_point in bulk.
+    Returns None if a column cannot be formatted with the given decimals.
+    """
+    first = format_fixed_point(first_column, decimals[0])
+    second = format_fixed_point(second_column, decimals[1])
+    if first is None or second is None:
+        return None
+    separators = np.full((len(first_column), 1), ord(","), dtype=np.uint8)
+    line_ends = np.full((len(first_column), 1), ord("\n"), dtype=np.uint8)
+    always = np.ones((len(first_column), 1), dtype=bool)
+    characters = np.hstack([first[0], separators, second[0], line_ends])
+    keep = np.hstack([first[1], always, second[1], always])
+    # the rows of the kept characters are concatenated in row-major order
+    return characters[keep].tobytes()
+
+
+def write_csv(target, first_column: np.ndarray, second_column: np.ndarray):
+    """
+    Writes two columns in the .csv-format for LibReDE looking like:
+    <first0>,<second0>\n<first1>,<second1> etc.
+    The rows are formatted in bulk by pandas, which formats the numbers like str() does.
+    """
+    pd.DataFrame({0: first_column, 1: second_column}).to_csv(target, header=False, index=False, lineterminator="\n")
+
+
+def write_csv_file(path: str, first_column: np.ndarray, second_column: np.ndarray, decimals: tuple[int, int] = None):
+    """
+    Writes two columns to a .csv-file. If the amount of decimals of the columns is known, the file is written with
+    format_fixed_point, which is a lot faster than formatting every number on its own.
+    """
+    content = get_csv_bytes(first_column, second_column, decimals) if decimals is not None else None
+    if content is not None:
+        with open(path, "wb") as csv_file:
+            csv_file.write(content)
+        return
+    with open(path, "w", newline="", buffering=BUFFER_SIZE) as csv_file:
+        write_csv(csv_file, first_column, second_column)
+
+
+def get_csv_content(first_column: np.ndarray, second_column: np.ndarray) -> str:
+    csv_content = io.StringIO()
+    write_csv(csv_content, first_column, second_column)
+    return csv_content.getvalue()
@@ -0,0 +1,69 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from extractor.r_d_e.librede_configuration_creator import LibredeConfigurationCreator
+from extractor.r_d_e.librede_service_operation import LibredeServiceOperation
+
+
+class LibredeEstimateCache:
+    """
+    On-disk cache of the estimates of LibReDE, so unchanged inputs don't have to be estimated again.
+    The estimates of a configuration are stored under a fingerprint of the estimator and of everything it gets from the
+    configuration: The command that runs LibReDE, the approaches, the estimation interval, the cpu-utilization of the
+    host and the response-times of the operations. The fingerprint also contains FORMAT_VERSION, which is increased
+    whenever the estimates of an older version must not be reused.
+    """
+
+    FORMAT_VERSION = 2
+
+    def __init__(self, path_to_cache_file: str, librede_command: list[str]):
+        """
+        @param path_to_cache_file: Json-file the estimates are read from and saved to.
+        @param librede_command:    Command that runs LibReDE, estimates of other commands are not reused.
+        """
+        self.path_to_cache_file = path_to_cache_file
+        self.librede_command = librede_command
+        self.estimates = dict[str, dict[str, list[float]]]()  # fingerprint: {approach: [estimate of each operation]}
+        self.fingerprints = dict[LibredeConfigurationCreator, str]()  # the series are only hashed once per configuration
+        if os.path.isfile(path_to_cache_file):
+            with open(path_to_cache_file, "r") as cache_file:
+                self.estimates = json.load(cache_file)
+
+    def get_fingerprint(self, configuration: LibredeConfigurationCreator) -> str:
+        if configuration in self.fingerprints:
+            return self.fingerprints[configuration]
+        fingerprint = hashlib.sha256()
+        fingerprint.update(json.dumps([LibredeEstimateCache.FORMAT_VERSION, self.librede_command, configuration.approaches, configuration.start_timestamp, configuration.end_timestamp,
+                                       configuration.host.cpu_utilization]).encode("utf-8"))
+        for service_operation in configuration.service_operations:
+            for series in (service_operation.timestamps, service_operation.durations):
+                fingerprint.update(str(series.dtype).encode("utf-8"))
+                fingerprint.update(np.ascontiguousarray(series).tobytes())
+        self.fingerprints[configuration] = fingerprint.hexdigest()
+        return self.fingerprints[configuration]
+
+    def contains(self, configuration: LibredeConfigurationCreator) -> bool:
+        return self.get_fingerprint(configuration) in self.estimates
+
+    def get(self, configuration: LibredeConfigurationCreator) -> dict[LibredeServiceOperation, dict[str, float]]:
+        """
+        Returns the cached estimates of the operations of the configuration as {operation: {approach: estimation}},
+        or None if the configuration was not estimated before.
+        """
+        estimates = self.estimates.get(self.get_fingerprint(configuration), None)
+        if estimates is None:
+            return None
+        return {service_operation: {approach: estimates[approach][index] for approach in configuration.approaches}
+                for index, service_operation in enumerate(configuration.service_operations)}
+
+    def put(self, configuration: LibredeConfigurationCreator, estimates: dict[LibredeServiceOperation, dict[str, float]]):
+        self.estimates[self.get_fingerprint(configuration)] = \
+            {approach: [estimates[service_operation][approach] for service_operation in configuration.service_operations]
+             for approach in configuration.approaches}
+
+    def save(self):
+        with open(self.path_to_cache_file, "w") as cache_file:
+            json.dump(self.estimates, cache_file)
@@ -1,6 +1,9 @@
 import sys
 
+import numpy as np
+
 from extractor.arch_models.model import IModel
+from extractor.r_d_e.librede_csv_writer import get_csv_content, write_csv_file
 from extractor.r_d_e.librede_service_operation import LibredeServiceOperation
 
 
@@ -32,12 +35,14 @@ class LibredeHost:
         """
         Parses the cpu-utilization in a .csv-format for LibReDE looking like:
         <time0>,<cpu_utilization0>\n<time1>,<cpu_utilization1> etc.
-        Needs to be done with a list, because concatenation of many, long strings reduces the performance.
         """
-        csv_file_content = list[str]()
-        for cpu_utilization_entry in self.cpu_utilization:
-            csv_file_content.append(str(cpu_utilization_entry[0]) + "," + str(cpu_utilization_entry[1]) + "\n")
-        return "".join(csv_file_content)
+        return get_csv_content(*self.get_cpu_utilization_arrays())
+
+    def write_csv_file(self, path: str):
+        write_csv_file(path, *self.get_cpu_utilization_arrays())
+
+    def get_cpu_utilization_arrays(self) -> tuple[np.ndarray, np.ndarray]:
+        return np.array([entry[0] for entry in self.cpu_utilization]), np.array([entry[1] for entry in self.cpu_utilization])
 
     def __str__(self) -> str:
         return "<" + self.name + "> (id " + str(self.id) + ") with " + str(len(self.cpu_utilization)) + " cpu-utilization-entries."
@@ -4,31 +4,38 @@ from extractor.arch_models.model import IModel
 from extractor.r_d_e.librede_configuration_creator import LibredeConfigurationCreator, create_configurations
 from extractor.r_d_e.librede_host import LibredeHost, get_hosts
 from extractor.r_d_e.default_cpu_utilization import get_default_cpu_utilization
+from extractor.r_d_e.librede_estimate_cache import LibredeEstimateCache
 from extractor.r_d_e.librede_service_operation import LibredeServiceOperation, get_operations
+from extractor.r_d_e.librede_settings import LibredeSettings
 from input.input_utils import get_valid_string_input_with_predicates, str_is_float, get_valid_float_input, get_valid_file_path_input, read_csv
 
 
 class LibredeInputCreator:
     """
     Creates all necessary .csv-Files and configurations at instantiation.
+    The files are only created for configurations whose estimates are not in the given cache.
     """
 
-    def __init__(self, model: IModel, path_to_librede_files: str, approaches: list[str]):
+    def __init__(self, model: IModel, path_to_librede_files: str, approaches: list[str], batched: bool = False,
+                 estimate_cache: LibredeEstimateCache = None, settings: LibredeSettings = None):
         self.model = model
         self.approaches = approaches
         self.hosts: list[LibredeHost] = get_hosts(model)
         self.operations_on_host: list[LibredeServiceOperation] = get_operations(model, self.hosts)
-        add_cpu_utilization(self.hosts)
+        add_cpu_utilization(self.hosts, settings)
         for librede_service_operation in self.operations_on_host:
             librede_service_operation.clean_response_times()
         self.absolute_path_to_input: str = path_to_librede_files + "input" + os.path.sep
         self.absolute_path_to_output: str = path_to_librede_files + "output" + os.path.sep
         self.set_indices_to_hosts_and_services()
         self.configurations: list[LibredeConfigurationCreator] = create_configurations(self.operations_on_host, approaches,
-                                                                                       self.absolute_path_to_input, self.absolute_path_to_output)
+                                                                                       self.absolute_path_to_input, self.absolute_path_to_output, batched)
+        # configurations that have to be estimated by LibReDE
+        self.uncached_configurations: list[LibredeConfigurationCreator] = [
+            configuration for configuration in self.configurations if estimate_cache is None or not estimate_cache.contains(configuration)]
         # Create necessary directories, in case they don't exist.
         if not os.path.exists(path_to_librede_files):
-            os.mkdir(path_to_librede_files)
+            os.makedirs(path_to_librede_files)
         if not os.path.exists(self.absolute_path_to_input):
             os.mkdir(self.absolute_path_to_input)
         if not os.path.exists(self.absolute_path_to_output):
@@ -36,18 +43,16 @@ class LibredeInputCreator:
         self.create_csv_files()
 
     def create_csv_files(self):
+        hosts = list(dict.fromkeys(configuration.host for configuration in self.uncached_configurations))
+        operations = [operation for configuration in self.uncached_configurations for operation in configuration.service_operations]
         # Create cpu_utilization-csv-files for all hosts
-        for host in self.hosts:
-            new_csv_file_handler = open(self.absolute_path_to_input + host.get_csv_file_name(), "w")
-            new_csv_file_handler.write(host.get_csv_file_content())
-            new_csv_file_handler.close()
+        for host in hosts:
+            host.write_csv_file(self.absolute_path_to_input + host.get_csv_file_name())
         # Create response_times-csv-files for all distinct operation, host pairs
-        for operation in self.operations_on_host:
-            new_csv_file_handler = open(self.absolute_path_to_input + operation.get_csv_file_name(), "w")
-            new_csv_file_handler.write(operation.get_csv_file_content())
-            new_csv_file_handler.close()
+        for operation in operations:
+            operation.write_csv_file(self.absolute_path_to_input + operation.get_csv_file_name())
         # Creates LibReDE_Configuration-Files
-        for configuration in self.configurations:
+        for configuration in self.uncached_configurations:
             new_csv_file_handler = open(self.absolute_path_to_input + configuration.get_file_name(), "w")
             new_csv_file_handler.write(configuration.get_xml_content())
             new_csv_file_handler.close()
@@ -87,7 +92,20 @@ class LibredeInputCreator:
             print(str(operation))
 
 
-def add_cpu_utilization(all_hosts: list[LibredeHost]):
+def add_cpu_utilization(all_hosts: list[LibredeHost], settings: LibredeSettings = None):
+    """
+    Sets the cpu-utilization of all hosts, either from the settings or by asking the user.
+    """
+    if settings is not None and settings.cpu_utilization is not None:
+        for host in all_hosts:
+            host.cpu_utilization = get_default_cpu_utilization(host.start_time, host.end_time, settings.cpu_utilization)
+        return
+    if settings is not None and settings.cpu_utilization_files is not None:
+        settings.check_cpu_utilization_files([host.name for host in all_hosts])
+        for host in all_hosts:
+            add_cpu_utilization_from_csv(host, settings.cpu_utilization_files[host.name])
+        return
+
     answer = get_valid_string_input_with_predicates("Set cpu-utilization for LibReDE.",
                                                     ["number in [0, 1] (will be default for all hosts)",
                                                      "\"manual\" (set fix utilization for each host manually)",
@@ -105,9 +123,12 @@ def add_cpu_utilization(all_hosts: list[LibredeHost]):
             host.cpu_utilization = get_default_cpu_utilization(host.start_time, host.end_time, get_valid_float_input("Set cpu utilization for host <" + host.name + ">."))
     else:
         for host in all_hosts:
-            csv_file_path = get_valid_file_path_input("Path to cpu utiliztation csv-file for host <" + host.name + ">")
-            cpu_progress = read_csv(csv_file_path)
-            for row in cpu_progress:
-                timestamp = int(float(row[0]))
-                utilization = float(row[1])
-                host.cpu_utilization.append((timestamp, utilization))
+            add_cpu_utilization_from_csv(host, get_valid_file_path_input("Path to cpu utiliztation csv-file for host <" + host.name + ">"))
+
+
+def add_cpu_utilization_from_csv(host: LibredeHost, csv_file_path: str):
+    cpu_progress = read_csv(csv_file_path)
+    for row in cpu_progress:
+        timestamp = int(float(row[0]))
+        utilization = float(row[1])
+        host.cpu_utilization.append((timestamp, utilization))
@@ -1,8 +1,11 @@
 import math
+import os
 
 import numpy as np
 
 from extractor.arch_models.model import IModel
+from extractor.r_d_e.librede_configuration_creator import LibredeConfigurationCreator
+from extractor.r_d_e.librede_estimate_cache import LibredeEstimateCache
 from extractor.r_d_e.librede_service_operation import LibredeServiceOperation
 from input.input_utils import get_valid_yes_no_input
 
@@ -13,11 +16,19 @@ class LibredeOutputParser:
     Will calculate the final estimated utilization_demand as the average of all approaches the user wants to use.
     """
 
-    def __init__(self, service_operations: list[LibredeServiceOperation], path_to_output_files: str, approaches: list[str], model: IModel):
+    def __init__(self, configurations: list[LibredeConfigurationCreator], path_to_output_files: str, approaches: list[str], model: IModel,
+                 estimate_cache: LibredeEstimateCache = None, approaches_to_use: list[str] = None,
+                 failed_configurations: list[LibredeConfigurationCreator] = None):
         self.model = model
-        self.service_operations = service_operations
+        self.approaches_to_use = approaches_to_use  # asked for via the command line if None
+        self.configurations = configurations
+        self.estimate_cache = estimate_cache
         self.possible_approaches = approaches
         self.path_to_output_files = path_to_output_files
+        # configurations whose run of LibReDE failed, their estimates are NaN
+        self.failed_configurations = failed_configurations or []
+        # configurations without estimates because their run failed or some of their output files are missing
+        self.configurations_without_estimates = list[LibredeConfigurationCreator]()
         self.final_results = self.calcualate_results_of_librede()
 
     def get_results_of_librede(self) -> dict[tuple[str, str], float]:
@@ -78,23 +89,46 @@ class LibredeOutputParser:
         """
         Retrieves the data from the output-csv-files of LibReDE and stores them in a mapping between LibredeServiceOperation and
         [a mapping between approach and its estimation]. This method simply parses the content of the output .csv-files into
-        a format which can be manipulated easier.
+        a format which can be manipulated easier. The estimates of configurations that are in the cache are taken from it instead,
+        the others are added to the cache. The estimates of failed runs and missing output files are NaN and are not cached.
         """
         results_of_approaches_per_operation_per_host = dict[LibredeServiceOperation, dict[str, float]]()
-        for service_operation in self.service_operations:
-            results_of_approaches_per_operation_per_host[service_operation] = dict[str, float]()
+        for configuration in self.configurations:
+            cached_results = self.estimate_cache.get(configuration) if self.estimate_cache is not None else None
+            if cached_results is not None:
+                results_of_approaches_per_operation_per_host.update(cached_results)
+                continue
+            for service_operation in configuration.service_operations:
+                results_of_approaches_per_operation_per_host[service_operation] = dict[str, float]()
+            complete = configuration not in self.failed_configurations
             for approach_name in self.possible_approaches:
-                output_file_handler = open(self.path_to_output_files + str(service_operation.id) + "_" + approach_name + "_fold_0.csv")
-                output_file_content: str = output_file_handler.read()
-                estimated_utilization = float(output_file_content.split(",")[1])
-                results_of_approaches_per_operation_per_host[service_operation][approach_name] = estimated_utilization
+                path_to_output_file = self.path_to_output_files + configuration.get_output_file_prefix() + "_" + approach_name + "_fold_0.csv"
+                if not complete or not os.path.isfile(path_to_output_file):
+                    complete = False
+                    for service_operation in configuration.service_operations:
+                        results_of_approaches_per_operation_per_host[service_operation][approach_name] = math.nan
+                    continue
+                output_file_handler = open(path_to_output_file)
+                output_file_content: list[str] = output_file_handler.readline().split(",")
                 output_file_handler.close()
+                # a batched configuration contains the estimates of all of its operations, which are split up again
+                for service_operation in configuration.service_operations:
+                    estimated_utilization = float(output_file_content[configuration.get_output_column(service_operation)])
+                    results_of_approaches_per_operation_per_host[service_operation][approach_name] = estimated_utilization
+            if not complete:
+                print("No estimates of LibReDE for " + configuration.get_description())
+                self.configurations_without_estimates.append(configuration)
+            elif self.estimate_cache is not None:
+                self.estimate_cache.put(configuration, results_of_approaches_per_operation_per_host)
         return results_of_approaches_per_operation_per_host
 
     def get_approaches_to_use(self) -> list[str]:
         """
-        Calculates a list of approaches. The user decides via command line input which one of the possible approaches is considered.
+        Calculates a list of approaches. The user decides via command line input which one of the possible approaches is considered,
+        unless the approaches to use were given.
         """
+        if self.approaches_to_use is not None:
+            return [approach for approach in self.possible_approaches if approach in self.approaches_to_use]
         approaches_to_use = list[str]()
         for approach in self.possible_approaches:
             user_approach = get_valid_yes_no_input("Use output of approach \"" + approach + "\"?")
@@ -110,6 +144,10 @@ class LibredeOutputParser:
             for approach in result_per_approach.keys():
                 print("      " + approach + ": " + str(result_per_approach[approach]))
 
+    def print_configurations_without_estimates(self):
+        for configuration in self.configurations_without_estimates:
+            print("MISSING: estimates of LibReDE for " + configuration.get_description())
+
     def print_final_results(self):
         for unique_operation in self.final_results:
             print("Estimated final demand of <" + unique_operation[1] + "> of service <" + unique_operation[0] + "> = " + str(self.final_results[unique_operation]))
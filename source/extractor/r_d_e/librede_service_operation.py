@@ -1,5 +1,8 @@
+import numpy as np
+
 from extractor.arch_models.model import IModel
 from extractor.arch_models.service import Service
+from extractor.r_d_e.librede_csv_writer import get_csv_content, write_csv_file
 
 
 class LibredeServiceOperation:
@@ -15,7 +18,27 @@ class LibredeServiceOperation:
         self.id = -1  # id for unambiguous identification for LibReDE, will be set later.
         self.host = host  # LibReDEHost which ran this operation.
         self.service = service  # The Service-Object which contains this operation.
-        self.response_times = list[tuple[float, float]]()  # list of <time, response-time of query>
+        self.timestamps = np.empty(0, dtype=np.int64)  # times of the queries
+        self.durations = np.empty(0, dtype=np.int64)  # response-times of the queries
+
+    @property
+    def response_times(self) -> list[tuple[float, float]]:
+        """
+        List of <time, response-time of query>.
+        """
+        return list(zip(self.timestamps.tolist(), self.durations.tolist()))
+
+    @response_times.setter
+    def response_times(self, response_times: list[tuple[float, float]]):
+        self.timestamps = np.array([entry[0] for entry in response_times])
+        self.durations = np.array([entry[1] for entry in response_times])
+
+    def add_response_times(self, timestamps: np.ndarray, durations: np.ndarray):
+        self.timestamps = np.concatenate([self.timestamps, timestamps])
+        self.durations = np.concatenate([self.durations, durations])
+
+    def get_number_of_response_times(self) -> int:
+        return len(self.timestamps)
 
     def get_csv_file_name(self) -> str:
         return "operation_" + str(self.id) + "_response_times.csv"
@@ -24,16 +47,19 @@ class LibredeServiceOperation:
         """
         Transforms the response-times in a .csv-format for LibReDE looking like:
         <time0>,<response-time0>\n<time1>,<response-time1> etc.
-        Needs to be done with a list, because concatenation of many, long strings reduces the performance.
         """
-        csv_file_content_elements = list[str]()
-        for response_time_entry in self.response_times:
-            csv_file_content_elements.append(str(response_time_entry[0]) + "," + str(response_time_entry[1]) + "\n")
-        return "".join(csv_file_content_elements)
+        return get_csv_content(self.timestamps, self.durations)
+
+    def write_csv_file(self, path: str):
+        """
+        Writes the cleaned response-times, which are given in milli- and microseconds, in bulk (see clean_response_times).
+        """
+        write_csv_file(path, self.timestamps, self.durations, (3, 6))
 
     def __str__(self):
         string_representation = "operation: <" + self.operation_name + "> (id " + str(self.id) + ") at host: <" + self.host.name + "> with "
-        string_representation += str(len(self.response_times)) + " " + ("response-time-entries" if len(self.response_times) > 1 or len(self.response_times) == 0 else "response-time-entry")
+        number_of_response_times = self.get_number_of_response_times()
+        string_representation += str(number_of_response_times) + " " + ("response-time-entries" if number_of_response_times > 1 or number_of_response_times == 0 else "response-time-entry")
         return string_representation
 
     def __hash__(self):
@@ -52,12 +78,9 @@ class LibredeServiceOperation:
         """
         Sorts the response times and converts the time stamps and response times to seconds (while remaining the milliseconds).
         """
-        self.response_times = sorted(self.response_times, key=lambda response_time_entry: response_time_entry[0])
-        for i in range(len(self.response_times)):
-            current_response_time_entry = self.response_times[i]
-            new_time = int(current_response_time_entry[0] / 10 ** 3) / 10 ** 3
-            new_response_time = current_response_time_entry[1] / 10 ** 6
-            self.response_times[i] = (new_time, new_response_time)
+        order = np.argsort(self.timestamps, kind="stable")
+        self.timestamps = np.trunc(self.timestamps[order] / 10 ** 3) / 10 ** 3
+        self.durations = self.durations[order] / 10 ** 6
 
 
 def get_operations(model: IModel, hosts):
@@ -68,8 +91,7 @@ def get_operations(model: IModel, hosts):
     all_operations_on_hosts = []
     for service in model.services.values():
         for operation in service.operations.values():
-            hosts_of_operation = operation.response_times.keys()
-            for host in hosts_of_operation:
+            for host in operation.store.hosts:
                 # get the Librede host object of the host of this operation
                 librede_host = get_host(host, hosts)
 
@@ -81,19 +103,19 @@ def get_operations(model: IModel, hosts):
                 librede_host.add_service(operation_for_librede)
 
                 # get the response times from the model
-                response_times = operation.response_times[host]
+                timestamps, durations = operation.store.response_time_arrays(host)
 
                 # calculate the minimum and the maximum timestamps of the response time entries
                 # if they exceed the current boundaries of the corresponding host, the boundaries are updated
-                minimum_timestamp = get_minimum_timestamp(response_times)
-                maximum_timestamp = get_maximum_timestamp(response_times)
+                minimum_timestamp = timestamps.min().item()
+                maximum_timestamp = timestamps.max().item()
 
                 if minimum_timestamp < librede_host.start_time:
                     librede_host.start_time = minimum_timestamp
                 if maximum_timestamp > librede_host.end_time:
                     librede_host.end_time = maximum_timestamp
 
-                operation_for_librede.response_times.extend(response_times)
+                operation_for_librede.add_response_times(timestamps, durations)
                 all_operations_on_hosts.append(operation_for_librede)
 
     return all_operations_on_hosts
@@ -109,24 +131,3 @@ def get_host(hostname, hosts):
             return host
     return None
 
-
-def get_minimum_timestamp(times):
-    """
-    Returns the minimum timestamp of a list of (timestamp, response time) pairs
-    """
-    minimum = times[0][0]
-    for time_pair in times:
-        if time_pair[0] < minimum:
-            minimum = time_pair[0]
-    return minimum
-
-
-def get_maximum_timestamp(times):
-    """
-    Returns the maximum timestamp of a list of (timestamp, response time) pairs
-    """
-    maximum = times[0][0]
-    for time_pair in times:
-        if time_pair[0] > maximum:
-            maximum = time_pair[0]
-    return maximum
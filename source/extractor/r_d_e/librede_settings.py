@@ -0,0 +1,66 @@
+import os
+import pathlib
+
+
+class LibredeSettingsError(BaseException):
+    def __init__(self, message: str):
+        super().__init__("Invalid settings for the estimation of the demands: {}".format(message))
+
+
+class LibredeSettings:
+    """
+    Settings for the estimation of the resource demands with LibReDE.
+    Every setting that is None is asked for via the command line, so the pipeline runs unattended if all are set.
+    """
+
+    def __init__(self, path_to_librede_installation: str = None, librede_command: list[str] = None,
+                 cpu_utilization: float = None, cpu_utilization_files: dict[str, str] = None,
+                 approaches_to_use: list[str] = None, path_to_librede_files: str = None,
+                 workers: int = None, batched: bool = False, use_cache: bool = True):
+        """
+        @param path_to_librede_installation: Path to the cloned and built LibReDE repository.
+        @param librede_command:              Command that is called instead of the script of the LibReDE installation,
+                                             e.g. a fake LibReDE. It gets "-c <configuration file>" as arguments.
+        @param cpu_utilization:              Default cpu-utilization in [0, 1] for all hosts.
+        @param cpu_utilization_files:        Maps {host name: path to csv-file with the cpu-utilization of the host}.
+        @param approaches_to_use:            Approaches whose estimations are averaged to the demand of an operation.
+        @param path_to_librede_files:        Directory for the input and output files of LibReDE and the estimate cache,
+                                             relative paths are resolved against the current working directory.
+        @param workers:                      Amount of LibReDE processes that run at the same time, default: cpu count.
+        @param batched:                      Estimate all operations of a host in a single configuration.
+        @param use_cache:                    Reuse the estimates of unchanged configurations from earlier runs.
+        """
+        self.path_to_librede_installation = path_to_librede_installation
+        self.librede_command = librede_command
+        self.cpu_utilization = cpu_utilization
+        self.cpu_utilization_files = cpu_utilization_files
+        self.approaches_to_use = approaches_to_use
+        # absolute, since the configurations refer to their files by this path and LibReDE runs in its own directory
+        self.path_to_librede_files = os.path.abspath(path_to_librede_files) if path_to_librede_files \
+            else str(pathlib.Path(__file__).parent.resolve()) + os.path.sep + "librede_files"
+        if not self.path_to_librede_files.endswith(os.path.sep):
+            self.path_to_librede_files += os.path.sep
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.batched = batched
+        self.use_cache = use_cache
+
+    def check_approaches(self, possible_approaches: list[str]):
+        """
+        Raises a LibredeSettingsError if approaches to use are set that are not among the possible approaches, instead of
+        silently leaving them out of the estimation.
+        """
+        if self.approaches_to_use is None:
+            return
+        unknown = [approach for approach in self.approaches_to_use if approach not in possible_approaches]
+        if unknown or not self.approaches_to_use:
+            raise LibredeSettingsError("unknown approaches {}, possible approaches are {}".format(unknown, possible_approaches))
+
+    def check_cpu_utilization_files(self, host_names: list[str]):
+        """
+        Raises a LibredeSettingsError if csv-files with the cpu-utilization are set, but not for all of the hosts.
+        """
+        if self.cpu_utilization is not None or self.cpu_utilization_files is None:
+            return
+        missing = [host_name for host_name in host_names if host_name not in self.cpu_utilization_files]
+        if missing:
+            raise LibredeSettingsError("no csv-file with the cpu-utilization of the hosts {}".format(missing))
@@ -0,0 +1,113 @@
+import numpy as np
+
+from extractor.arch_models.model import IModel
+from extractor.r_d_e.librede_host import LibredeHost, get_hosts
+from extractor.r_d_e.librede_input_creator import add_cpu_utilization
+from extractor.r_d_e.librede_output_parser import LibredeOutputParser
+from extractor.r_d_e.librede_service_operation import LibredeServiceOperation, get_operations
+from extractor.r_d_e.librede_settings import LibredeSettings
+
+
+class NativeDemandEstimator:
+    """
+    Fast alternative to the LibredeCaller, which estimates the resource demands of the operations without LibReDE.
+    The two approaches of LibReDE that don't need an optimization are computed directly for all operations at once:
+    - Service Demand Law: The demand is the utilization of the host divided by the throughput of the operation. If
+      the operations of a host are estimated together (batched), the utilization is split up by their busy times.
+    - Response Time Approximation: The demand is the mean response time of the operation.
+    The estimations are combined and written back in the generic model like the ones of LibReDE.
+    All of this automatically happens at instantiation.
+    """
+    APPROACHES = ["ResponseTimeApproximationApproach", "ServiceDemandLawApproach"]
+    # Shorter intervals of activity of a host count as one second, so a host with a single request has a throughput.
+    MIN_INTERVAL = 1.0
+
+    def __init__(self, model: IModel, settings: LibredeSettings = None):
+        self.model: IModel = model
+        self.settings: LibredeSettings = settings or LibredeSettings()
+        self.settings.check_approaches(NativeDemandEstimator.APPROACHES)
+        self.hosts: list[LibredeHost] = get_hosts(model)
+        self.operations_on_host: list[LibredeServiceOperation] = get_operations(model, self.hosts)
+        add_cpu_utilization(self.hosts, self.settings)
+        for service_operation in self.operations_on_host:
+            service_operation.clean_response_times()
+
+        self.estimates: dict[LibredeServiceOperation, dict[str, float]] = self.estimate()
+        self.output_parser = NativeOutputParser(self.estimates, NativeDemandEstimator.APPROACHES, model, self.settings.approaches_to_use)
+        results: dict[tuple[str, str], float] = self.output_parser.get_results_of_librede()
+        for service_name, operation_name in results.keys():
+            self.add_demand_to_operation(service_name, operation_name, results[(service_name, operation_name)])
+
+    def estimate(self) -> dict[LibredeServiceOperation, dict[str, float]]:
+        """
+        Estimates the demand of every operation on every host with both approaches. The response times of all operations
+        are concatenated, so the sums per operation and per host are computed with a single pass over the arrays.
+        """
+        if not self.operations_on_host:
+            return {}
+        host_indices = {host: index for index, host in enumerate(self.hosts)}
+        hosts = np.array([host_indices[service_operation.host] for service_operation in self.operations_on_host])
+        counts = np.array([service_operation.get_number_of_response_times() for service_operation in self.operations_on_host])
+        operations = np.repeat(np.arange(len(self.operations_on_host)), counts)
+        durations = np.concatenate([service_operation.durations for service_operation in self.operations_on_host]).astype(np.float64)
+
+        busy_times = np.bincount(operations, weights=durations, minlength=len(counts))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean_response_times = busy_times / counts
+
+            # the timestamps of the hosts are in microseconds
+            intervals = np.array([max((host.end_time - host.start_time) / 10 ** 6, NativeDemandEstimator.MIN_INTERVAL) for host in self.hosts])
+            utilizations = np.array([get_mean_utilization(host) for host in self.hosts])
+            throughputs = counts / intervals[hosts]
+            shares = np.ones(len(counts))
+            if self.settings.batched:
+                shares = busy_times / np.bincount(hosts, weights=busy_times, minlength=len(self.hosts))[hosts]
+            service_demands = utilizations[hosts] * shares / throughputs
+
+        return {service_operation: {"ResponseTimeApproximationApproach": float(mean_response_times[i]),
+                                    "ServiceDemandLawApproach": float(service_demands[i])}
+                for i, service_operation in enumerate(self.operations_on_host)}
+
+    def add_demand_to_operation(self, service_name, operation_name, estimated_demand: float):
+        """
+        Sets the demand of an operation of a service by multiplying the estimated utilization with the capacity of the service.
+        Won't do anything if demanded_utilization is NaN
+        """
+        if not np.isnan(estimated_demand):
+            service = self.model.services[service_name]
+            service.operations[operation_name].set_demand(int(estimated_demand * service.capacity))
+
+    def print_summary(self):
+        print("Summary of the built-in estimation of the demands:")
+        for host in self.hosts:
+            print("host: " + str(host))
+        for service_operation in self.operations_on_host:
+            print(str(service_operation))
+        self.output_parser.print_final_results()
+
+
+class NativeOutputParser(LibredeOutputParser):
+    """
+    Combines the estimations of the NativeDemandEstimator like the ones of LibReDE, but takes them from memory instead
+    of the output files of LibReDE.
+    """
+
+    def __init__(self, estimates: dict[LibredeServiceOperation, dict[str, float]], approaches: list[str], model: IModel,
+                 approaches_to_use: list[str] = None):
+        self.estimates = estimates
+        super().__init__([], "", approaches, model, None, approaches_to_use)
+
+    def parse_output_of_librede(self) -> dict[LibredeServiceOperation, dict[str, float]]:
+        return self.estimates
+
+
+def get_mean_utilization(host: LibredeHost) -> float:
+    """
+    Returns the mean cpu-utilization of the host while it was active, or the mean of all entries if there are none in
+    this interval. The timestamps of the cpu-utilization are in seconds.
+    """
+    timestamps, utilizations = host.get_cpu_utilization_arrays()
+    if len(utilizations) == 0:
+        return np.nan
+    active = (timestamps >= int(host.start_time / 10 ** 6)) & (timestamps <= int(host.end_time / 10 ** 6))
+    return float(np.mean(utilizations[active] if active.any() else utilizations))
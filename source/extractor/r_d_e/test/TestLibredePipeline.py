@@ -0,0 +1,136 @@
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import unittest
+
+from extractor.arch_models.jaeger_trace import JaegerTrace
+from extractor.arch_models.zipkin_trace import ZipkinTrace
+from extractor.r_d_e.librede_caller import LibredeCaller
+from extractor.r_d_e.librede_settings import LibredeSettings, LibredeSettingsError
+
+FAKE_LIBREDE = os.path.join('source', 'extractor', 'r_d_e', 'test', 'fake_librede.py')
+
+
+class TestLibredePipeline(unittest.TestCase):
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    @staticmethod
+    def trace(name: str) -> str:
+        return os.path.join('source', 'extractor', 'arch_models', 'test', 'trace', name)
+
+    def settings(self, batched: bool = False) -> LibredeSettings:
+        return LibredeSettings(librede_command=[sys.executable, os.path.abspath(FAKE_LIBREDE)], cpu_utilization=0.5,
+                               approaches_to_use=LibredeCaller.APPROACHES, path_to_librede_files=self._directory.name, workers=2,
+                               batched=batched)
+
+    @staticmethod
+    def demands(model) -> dict:
+        return {(service.name, operation.name): operation.demand
+                for service in model.services.values() for operation in service.operations.values()}
+
+    def test_unattended(self):
+        model = ZipkinTrace(TestLibredePipeline.trace('zipkin_round_robin.json'), False, "")
+        caller = LibredeCaller(model, self.settings())
+
+        self.assertEqual(len(caller.librede_input_creator.operations_on_host), len(caller.runs))
+        self.assertTrue(all(run.succeeded() for run in caller.runs))
+        for configuration in caller.librede_input_creator.configurations:
+            self.assertTrue(os.path.isfile(caller.path_to_run_directories + configuration.get_file_name()[:-len(".librede")]
+                                           + os.path.sep + configuration.get_file_name()))
+        # every operation of the trace got a demand from the estimation instead of the default one
+        self.assertTrue(all(demand != 100 for demand in TestLibredePipeline.demands(model).values()))
+
+    def test_batched(self):
+        model = JaegerTrace(TestLibredePipeline.trace('jaeger_trace.json'), False, "")
+        caller = LibredeCaller(model, self.settings(batched=True))
+
+        hosts = {operation.host for operation in caller.librede_input_creator.operations_on_host}
+        self.assertEqual(len(hosts), len(caller.runs))
+        self.assertLess(len(caller.runs), len(caller.librede_input_creator.operations_on_host))
+        self.assertTrue(all(run.succeeded() for run in caller.runs))
+        results = caller.librede_output_parser.get_results_of_librede()
+        self.assertEqual({(operation.service.name, operation.operation_name)
+                          for operation in caller.librede_input_creator.operations_on_host}, set(results.keys()))
+
+    def test_cache(self):
+        model = JaegerTrace(TestLibredePipeline.trace('jaeger_trace.json'), False, "")
+        LibredeCaller(model, self.settings())
+        expected = TestLibredePipeline.demands(model)
+
+        # the inputs did not change, so LibReDE is not called again
+        model = JaegerTrace(TestLibredePipeline.trace('jaeger_trace.json'), False, "")
+        caller = LibredeCaller(model, self.settings())
+        self.assertEqual([], caller.runs)
+        self.assertEqual(expected, TestLibredePipeline.demands(model))
+
+        # the estimates of another command are not reused
+        model = JaegerTrace(TestLibredePipeline.trace('jaeger_trace.json'), False, "")
+        settings = self.settings()
+        settings.librede_command = [sys.executable, '-c', 'import sys; sys.exit(1)']
+        caller = LibredeCaller(model, settings)
+        self.assertGreater(len(caller.runs), 0)
+        self.assertFalse(any(run.succeeded() for run in caller.runs))
+
+    @unittest.skipIf(platform.system() == "Windows", "the fake installation has a shell script")
+    def test_installation(self):
+        # like the script of LibReDE, the one of the fake installation finds its libraries relative to its working directory
+        installation = os.path.join(self._directory.name, 'librede')
+        console = os.path.join(installation, 'tools.descartes.librede.releng.standalone', 'target', 'standalone', 'console')
+        os.makedirs(os.path.join(console, 'lib'))
+        shutil.copy(FAKE_LIBREDE, os.path.join(console, 'lib'))
+        script = os.path.join(console, 'librede.sh')
+        with open(script, 'w') as script_file:
+            script_file.write('#!/bin/sh\nexec "{}" lib/fake_librede.py "$@"\n'.format(sys.executable))
+        os.chmod(script, 0o755)
+
+        model = ZipkinTrace(TestLibredePipeline.trace('zipkin_round_robin.json'), False, "")
+        settings = self.settings()
+        settings.librede_command = None
+        settings.path_to_librede_installation = installation
+        settings.path_to_librede_files = os.path.join(self._directory.name, 'files') + os.path.sep
+        caller = LibredeCaller(model, settings)
+
+        self.assertGreater(len(caller.runs), 0)
+        self.assertTrue(all(run.succeeded() for run in caller.runs))
+        self.assertTrue(all(demand != 100 for demand in TestLibredePipeline.demands(model).values()))
+
+    def test_failed_run(self):
+        model = ZipkinTrace(TestLibredePipeline.trace('zipkin_round_robin.json'), False, "")
+        failing = LibredeCaller(ZipkinTrace(TestLibredePipeline.trace('zipkin_round_robin.json'), False, ""),
+                                self.settings()).librede_input_creator.configurations[0]
+        os.remove(os.path.join(self._directory.name, "estimate_cache.json"))
+        os.environ["FAKE_LIBREDE_FAIL"] = failing.get_file_name()
+        try:
+            caller = LibredeCaller(model, self.settings())
+        finally:
+            del os.environ["FAKE_LIBREDE_FAIL"]
+
+        self.assertEqual([False] + [True] * (len(caller.runs) - 1), [run.succeeded() for run in caller.runs])
+        self.assertEqual([failing.get_file_name()],
+                         [configuration.get_file_name() for configuration in caller.librede_output_parser.configurations_without_estimates])
+        # the operation of the failed run keeps its default demand, the others got their estimates
+        failed_operation = failing.service_operations[0]
+        demands = TestLibredePipeline.demands(model)
+        self.assertEqual(100, demands[(failed_operation.service.name, failed_operation.operation_name)])
+        self.assertEqual(len(demands) - 1, sum(1 for demand in demands.values() if demand != 100))
+
+        # the estimates of the successful runs were cached, so only the failed configuration runs again
+        caller = LibredeCaller(ZipkinTrace(TestLibredePipeline.trace('zipkin_round_robin.json'), False, ""), self.settings())
+        self.assertEqual([failing.get_file_name()], [run.configuration.get_file_name() for run in caller.runs])
+
+    def test_invalid_settings(self):
+        model = JaegerTrace(TestLibredePipeline.trace('jaeger_trace.json'), False, "")
+        settings = self.settings()
+        settings.approaches_to_use = ["ServiceDemandLawAproach"]
+        self.assertRaisesRegex(LibredeSettingsError, "ServiceDemandLawAproach", LibredeCaller, model, settings)
+
+        settings = self.settings()
+        settings.cpu_utilization = None
+        settings.cpu_utilization_files = {"unknown-host": "cpu.csv"}
+        self.assertRaisesRegex(LibredeSettingsError, "no csv-file", LibredeCaller, model, settings)
@@ -0,0 +1,62 @@
+import unittest
+
+from extractor.arch_models.jaeger_trace import JaegerTrace
+from extractor.arch_models.operation import Operation
+from extractor.arch_models.service import Service
+from extractor.r_d_e.librede_settings import LibredeSettings
+from extractor.r_d_e.native_demand_estimator import NativeDemandEstimator
+
+
+def build_model():
+    # two operations on one host, which is active for 10s: "a" is called 4 times for 100ms, "b" 2 times for 300ms
+    model = JaegerTrace()
+    service = Service('S')
+    service.add_host('h')
+    for name, calls in [('a', [(0, 100000), (2500000, 100000), (5000000, 100000), (10000000, 100000)]),
+                        ('b', [(1000000, 300000), (9000000, 300000)])]:
+        operation = Operation(name)
+        service.add_operation(operation)
+        for timestamp, duration in calls:
+            operation.add_response_time('h', timestamp, duration)
+    model.services['S'] = service
+    return model
+
+
+class TestNativeDemandEstimator(unittest.TestCase):
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    @staticmethod
+    def estimate(model, batched: bool = False, approaches=None) -> NativeDemandEstimator:
+        return NativeDemandEstimator(model, LibredeSettings(cpu_utilization=0.4, batched=batched,
+                                                            approaches_to_use=approaches or NativeDemandEstimator.APPROACHES))
+
+    def assertEstimates(self, expected: dict, estimator: NativeDemandEstimator):
+        estimates = {service_operation.operation_name: estimate for service_operation, estimate in estimator.estimates.items()}
+        for name, (response_time, service_demand) in expected.items():
+            self.assertAlmostEqual(response_time, estimates[name]["ResponseTimeApproximationApproach"])
+            self.assertAlmostEqual(service_demand, estimates[name]["ServiceDemandLawApproach"])
+
+    def test_estimates(self):
+        model = build_model()
+        # throughputs are 0.4/s and 0.2/s, each operation gets the whole utilization
+        self.assertEstimates({'a': (0.1, 1.0), 'b': (0.3, 2.0)}, TestNativeDemandEstimator.estimate(model))
+        # the demand is the average of both approaches multiplied by the capacity
+        self.assertAlmostEqual(550, model.services['S'].operations['a'].demand, delta=1)
+        self.assertAlmostEqual(1150, model.services['S'].operations['b'].demand, delta=1)
+
+    def test_batched_estimates(self):
+        model = build_model()
+        # the utilization is split up by the busy times 0.4s and 0.6s
+        self.assertEstimates({'a': (0.1, 0.4), 'b': (0.3, 1.2)}, TestNativeDemandEstimator.estimate(model, batched=True))
+        self.assertAlmostEqual(250, model.services['S'].operations['a'].demand, delta=1)
+        self.assertAlmostEqual(750, model.services['S'].operations['b'].demand, delta=1)
+
+    def test_approaches_to_use(self):
+        model = build_model()
+        TestNativeDemandEstimator.estimate(model, approaches=["ServiceDemandLawApproach"])
+        self.assertAlmostEqual(1000, model.services['S'].operations['a'].demand, delta=1)
+        self.assertAlmostEqual(2000, model.services['S'].operations['b'].demand, delta=1)
@@ -0,0 +1,65 @@
+import argparse
+import os
+import sys
+import time
+import xml.etree.ElementTree as ElementTree
+
+# Stand-in for the console script of LibReDE, so the demand estimation can be tested and benchmarked without a Java
+# installation: python fake_librede.py -c <configuration file>
+# It reads the configuration and the csv-files like LibReDE does and writes an output file per approach, which
+# contains a row with the estimates of all services (the utilization split up by the share of the busy time).
+# The environment variable FAKE_LIBREDE_DELAY adds a delay in seconds, e.g. to simulate the start of the JVM.
+# The environment variable FAKE_LIBREDE_FAIL lets the runs of configuration files with the given name fail without output.
+
+
+def read_column(path: str, column: int) -> list[float]:
+    with open(path, "r") as csv_file:
+        return [float(line.split(",")[column]) for line in csv_file if line.strip()]
+
+
+def estimate(configuration: ElementTree.Element) -> list[float]:
+    services = configuration.findall("workloadDescription/services")
+    estimation = configuration.find("estimation")
+    duration = max(1.0, (int(estimation.get("endTimestamp")) - int(estimation.get("startTimestamp"))) / 10 ** 3)
+
+    utilization = 0.0
+    busy_times = [0.0] * len(services)
+    counts = [0] * len(services)
+    for observation in configuration.findall("input/observations"):
+        entity = observation.find("mappings").get("entity")
+        if observation.get("metric") == "UTILIZATION":
+            values = read_column(observation.get("file"), 1)
+            utilization = sum(values) / len(values) if values else 0.0
+        else:
+            index = int(entity[entity.rfind(".") + 1:])
+            response_times = read_column(observation.get("file"), 1)
+            busy_times[index] = sum(response_times)
+            counts[index] = len(response_times)
+
+    total_busy_time = sum(busy_times)
+    return [utilization * busy_time / total_busy_time * duration / count if total_busy_time > 0 and count > 0 else float("nan")
+            for busy_time, count in zip(busy_times, counts)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake LibReDE console.')
+    parser.add_argument('-c', dest='configuration', required=True)
+    args = parser.parse_args()
+
+    time.sleep(float(os.environ.get("FAKE_LIBREDE_DELAY", "0")))
+    if os.path.basename(args.configuration) == os.environ.get("FAKE_LIBREDE_FAIL"):
+        return 1
+
+    configuration = ElementTree.parse(args.configuration).getroot()
+    parameters = {parameter.get("name"): parameter.get("value") for parameter in configuration.findall("output/exporters/parameters")}
+    end_timestamp = configuration.find("estimation").get("endTimestamp")
+    row = ",".join([end_timestamp] + [str(value) for value in estimate(configuration)]) + "\n"
+    for approach in configuration.findall("estimation/approaches"):
+        approach_name = approach.get("type").split(".")[-1]
+        with open(os.path.join(parameters["OutputDirectory"], parameters["FileName"] + "_" + approach_name + "_fold_0.csv"), "w") as output_file:
+            output_file.write(row)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -5,12 +5,15 @@ from extractor.arch_models.architecture_resirio import ArchitectureResirio
 from extractor.arch_models.architecture_misim import ArchitectureMiSim
 from extractor.arch_models.jaeger_trace import JaegerTrace
 from extractor.arch_models.misim_model import MiSimModel
+from extractor.arch_models.model import IModel
+from extractor.arch_models.snapshot import is_snapshot
 from extractor.arch_models.open_xtrace import OpenXTrace
 from extractor.arch_models.zipkin_trace import ZipkinTrace
 from extractor.controllers.analyzer import Analyzer
 from extractor.controllers.exporter import Exporter
 from extractor.controllers.validator import Validator
 from extractor.r_d_e.librede_caller import LibredeCaller
+from extractor.r_d_e.native_demand_estimator import NativeDemandEstimator
 from input.InteractiveInput import InteractiveInput
 from datetime import datetime
 
@@ -23,7 +26,10 @@ def create_generic_model(model_input, trace_input, settings_input):
     """
     generic_model = None
     if model_input.contains_generic_model:
-        generic_model = pickle.load(open(model_input.get_model_file_path(), 'rb'))
+        if is_snapshot(model_input.get_model_file_path()):
+            generic_model = IModel.load(model_input.get_model_file_path())
+        else:
+            generic_model = pickle.load(open(model_input.get_model_file_path(), 'rb'))
     elif model_input.contains_misim_model:
         generic_model = MiSimModel(model_input.get_model_file_path())
     elif trace_input.traces_are_jaeger:
@@ -74,8 +80,8 @@ def export(settings_input, generic_model, architecture):
     name_of_output_file = (
                               "RESIRIO" if settings_input.should_export_for_resirio else "MiSim") + "-extraction_" + current_date
     if settings_input.should_store_in_pickle_format:
-        pickle.dump(generic_model, open("Generic_model_extraction_" + current_date + "_pickle_export.dat",
-                                        'wb+'))  # stores the generic model in a binary format
+        # stores the generic model in a binary format
+        generic_model.save("Generic_model_extraction_" + current_date + "_snapshot_export.dat")
     export_file_type = "json" if settings_input.resirio_export_should_be_json or settings_input.should_export_for_misim else "js"
     export_type = export_file_type if settings_input.should_export_for_resirio else "MiSim"
     output_file = open(name_of_output_file + "." + export_file_type, 'w+')  # creates output file
@@ -90,10 +96,11 @@ def call_librede_if_user_wants(generic_model):
     the user can put in a default value as demand for every operation in the model.
     """
     answer = get_valid_string_input_with_predicates("Estimate Resource-Demands with LibReDE or enter a default demand?",
-                                                    ["y (for LibReDE)", "int (default demand for all operations)",
+                                                    ["y (for LibReDE)", "\"native\" (for the built-in estimator)",
+                                                     "int (default demand for all operations)",
                                                      "\"manual\" (set demand manually for each operation)",
                                                      "Path to csv-file with demands of operations"],
-                                                    [lambda a: a == "y", lambda a: str_is_int(a),
+                                                    [lambda a: a == "y", lambda a: a == "native", lambda a: str_is_int(a),
                                                      lambda a: a == "manual", os.path.isfile])
     option_the_user_decided_for = answer[0]
     user_input = answer[1]
@@ -101,10 +108,12 @@ def call_librede_if_user_wants(generic_model):
         librede_caller = LibredeCaller(generic_model)
         librede_caller.print_summary()
     elif option_the_user_decided_for == 1:
+        NativeDemandEstimator(generic_model).print_summary()
+    elif option_the_user_decided_for == 2:
         for service in generic_model.services.values():
             for operation in service.operations.values():
                 operation.set_demand(int(user_input))
-    elif option_the_user_decided_for == 2:
+    elif option_the_user_decided_for == 3:
         for service in generic_model.services.values():
             for operation in service.operations.values():
                 operation.set_demand(get_valid_int_input(
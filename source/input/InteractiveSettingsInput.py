@@ -33,7 +33,7 @@ class InteractiveSettingsInput:
         export_type_answer = get_valid_string_input_with_finite_valid_options("Do you want to create an architecture model for RESIRIO or MiSim?", ["r", "m"])
         self.should_export_for_resirio = export_type_answer == "r"
         self.should_export_for_misim = export_type_answer == "m"
-        self.should_store_in_pickle_format = get_valid_yes_no_input("Do you want to store the generic model in an intermediate format (pickle), too?")
+        self.should_store_in_pickle_format = get_valid_yes_no_input("Do you want to store the generic model in an intermediate format (binary snapshot), too?")
         self.ask_for_additional_resirio_settings()
         if self.traces_require_pattern:
             self.ask_for_call_string_pattern()
@@ -70,7 +70,7 @@ class InteractiveSettingsInput:
         print("Validate Model: " + str(self.should_validate_model))
         print("Validate Architecture: " + str(self.should_validate_architecture))
         print("Export Model for " + ("RESIRIO" if self.should_export_for_resirio else "MiSim"))
-        print("Additionally store in intermediate (pickle)-format: " + str(self.should_store_in_pickle_format))
+        print("Additionally store in intermediate (snapshot)-format: " + str(self.should_store_in_pickle_format))
         if self.should_export_for_resirio:
             print("Export data-type: " + (".json" if self.resirio_export_should_be_json else ".js"))
             print("Lightweight Export: " + str(self.should_be_lightweight_export))
@@ -1,16 +1,23 @@
 import pickle
 import argparse
+import shlex
 import sys
 
 from extractor.controllers.analyzer import Analyzer
 from extractor.controllers.exporter import Exporter
 from extractor.controllers.validator import Validator
+from extractor.controllers.zipkin_network_manager import ZipkinNetworkManager
 from extractor.arch_models.architecture_resirio import ArchitectureResirio
 from extractor.arch_models.architecture_misim import ArchitectureMiSim
 from extractor.arch_models.jaeger_trace import JaegerTrace
 from extractor.arch_models.misim_model import MiSimModel
+from extractor.arch_models.model import IModel
+from extractor.arch_models.snapshot import is_snapshot
 from extractor.arch_models.zipkin_trace import ZipkinTrace
 from extractor.arch_models.open_xtrace import OpenXTrace
+from extractor.r_d_e.librede_caller import LibredeCaller
+from extractor.r_d_e.librede_settings import LibredeSettings, LibredeSettingsError
+from extractor.r_d_e.native_demand_estimator import NativeDemandEstimator
 from input import InteractiveMain
 from util.parse import bool_from_string
 
@@ -20,7 +27,7 @@ def cli():
 
     # Transformation
     parser.add_argument('-m', '--model', dest='model', nargs=1, required=False, metavar='generic_model',
-                        help='Stores a previously converted model.')
+                        help='Loads a previously converted model (snapshot or pickle).')
     parser.add_argument('--misim', dest='misim', type=str, nargs='+', required=False, metavar='misim_json_model',
                         help='Converts a MiSim model. Takes the architecture model and an optional experiment model.')
     parser.add_argument('--jaeger', dest='jaeger', type=str, nargs=1, required=False, metavar='jaeger_json_trace',
@@ -29,8 +36,57 @@ def cli():
                         help='Converts a Zipkin trace.')
     parser.add_argument('--openxtrace', dest='openxtrace', type=str, nargs=1, required=False, metavar='openxtrace_json_trace',
                         help='Converts a OPENXTrace trace.')    
+    parser.add_argument('--zipkin-api', dest='zipkin_api', type=str, nargs=1, required=False, metavar='zipkin_url',
+                        help='Fetches the traces from the Zipkin HTTP API (e.g. http://localhost:9411) window by window '
+                             'and streams them into the model.')
+    parser.add_argument('--zipkin-lookback', dest='zipkin_lookback', type=float, default=24, required=False,
+                        metavar='hours', help='Fetches the traces of the last given hours from the Zipkin HTTP API.')
+    parser.add_argument('--zipkin-window', dest='zipkin_window', type=float, default=60, required=False,
+                        metavar='minutes', help='Length of the time windows requested from the Zipkin HTTP API.')
+    parser.add_argument('--zipkin-limit', dest='zipkin_limit', type=int, default=1000, required=False, metavar='N',
+                        help='Maximum number of traces per request to the Zipkin HTTP API.')
+    parser.add_argument('--zipkin-download', dest='zipkin_download', type=str, nargs=1, required=False,
+                        metavar='zipkin_json_trace', help='Writes the traces fetched from the Zipkin HTTP API to a file '
+                                                          'first and reads them from there.')
     parser.add_argument('--multiple', dest='multiple', action='store_true', required=False,
                         help='Can be used for Zipkin or Jaeger, when multiple traces are defined.')
+    parser.add_argument('--streaming', dest='streaming', action='store_true', required=False,
+                        help='Reads Jaeger traces or Zipkin trace lists one at a time instead of loading the whole file '
+                             'into memory.')
+    parser.add_argument('--workers', dest='workers', type=int, default=1, required=False, metavar='N',
+                        help='Parses the traces of Jaeger, Zipkin or OPEN.xtrace in N parallel processes.')
+
+    # Resource demands
+    parser.add_argument('--librede', dest='librede', type=str, nargs=1, required=False, metavar='librede_installation',
+                        help='Estimates the resource demands of the operations with the given (built) LibReDE '
+                             'installation.')
+    parser.add_argument('--librede-command', dest='librede_command', type=str, nargs=1, required=False,
+                        metavar='command',
+                        help='Estimates the resource demands with the given command instead of a LibReDE installation, '
+                             'e.g. "python source/extractor/r_d_e/test/fake_librede.py".')
+    parser.add_argument('--native-demands', dest='native_demands', action='store_true', required=False,
+                        help='Estimates the resource demands of the operations with the built-in Service Demand Law and '
+                             'Response Time Approximation instead of LibReDE.')
+    parser.add_argument('--cpu-utilization', dest='cpu_utilization', type=float, required=False, metavar='U',
+                        help='Default cpu-utilization in [0, 1] of all hosts for the estimation of the demands (this or '
+                             '--cpu-utilization-csv is required by the estimation).')
+    parser.add_argument('--cpu-utilization-csv', dest='cpu_utilization_csv', type=str, nargs='+', required=False,
+                        metavar='host=csv_file',
+                        help='Csv-files with the cpu-utilization of each host for the estimation of the demands.')
+    parser.add_argument('--librede-approaches', dest='librede_approaches', type=str, nargs='+', required=False,
+                        metavar='approach', choices=LibredeCaller.APPROACHES,
+                        help='Approaches whose estimations are averaged to the demands (default: all approaches).')
+    parser.add_argument('--librede-workers', dest='librede_workers', type=int, required=False, metavar='N',
+                        help='Runs N LibReDE processes at the same time (default: amount of cpus).')
+    parser.add_argument('--librede-batched', dest='librede_batched', action='store_true', required=False,
+                        help='Estimates all operations of a host with a single run of LibReDE (or together with the '
+                             'built-in estimator).')
+    parser.add_argument('--librede-files', dest='librede_files', type=str, required=False, metavar='directory',
+                        help='Directory for the input and output files of LibReDE and the estimate cache.')
+    parser.add_argument('--no-librede-cache', dest='librede_cache', action='store_false', required=False,
+                        help='Estimates all demands again instead of reusing the estimates of unchanged inputs.')
+    parser.add_argument('--capacity', dest='capacity', type=int, required=False, metavar='capacity',
+                        help='Capacity of all services, the estimated utilizations are multiplied by it.')
 
     # Validation
     parser.add_argument('-vm', '--validate-model', dest='validate_model', action='store_true',
@@ -46,7 +102,7 @@ def cli():
 
     # Export
     parser.add_argument('-em', '--export-model', dest='export_model', action='store_true',
-                        help='Exports the converted model in an intermediate format (pickle).')
+                        help='Exports the converted model in an intermediate format (binary snapshot).')
     parser.add_argument('-ea', '--export-architecture', dest='export_architecture', type=str, nargs='+', required=False,
                         metavar='export_type',
                         help='Stores a d3 graph and hazards of the architecture in the specified format '
@@ -56,6 +112,18 @@ def cli():
 
     args = parser.parse_args()
 
+    # the estimation must not fall back to asking for the cpu-utilization on stdin
+    cpu_utilization_files = None
+    if args.librede or args.librede_command or args.native_demands:
+        if args.cpu_utilization is None and not args.cpu_utilization_csv:
+            parser.error('the estimation of the resource demands requires --cpu-utilization or --cpu-utilization-csv')
+        if args.cpu_utilization_csv:
+            entries = [entry.split('=', 1) for entry in args.cpu_utilization_csv]
+            invalid = [entry for entry, parts in zip(args.cpu_utilization_csv, entries) if len(parts) != 2 or not all(parts)]
+            if invalid:
+                parser.error('argument --cpu-utilization-csv: expected host=csv_file, got {}'.format(', '.join(invalid)))
+            cpu_utilization_files = dict(entries)
+
     model = None
     arch = None
     model_file = ''
@@ -64,19 +132,64 @@ def cli():
     # Transformation
     if args.model:
         model_file = args.model[0]
-        model = pickle.load(open(model_file, 'rb'))
+        if is_snapshot(model_file):
+            model = IModel.load(model_file)
+        else:
+            # models exported by older versions
+            model = pickle.load(open(model_file, 'rb'))
     elif args.misim:
         model_file = args.misim[0]
         model = MiSimModel(model_file)
     elif args.jaeger:
         model_file = args.jaeger[0]
-        model = JaegerTrace(model_file, args.multiple)
+        model = JaegerTrace(model_file, args.multiple, streaming=args.streaming, workers=args.workers)
     elif args.zipkin:
         model_file = args.zipkin[0]
-        model = ZipkinTrace(model_file, args.multiple)
+        model = ZipkinTrace(model_file, args.multiple, streaming=args.streaming, workers=args.workers)
+    elif args.zipkin_api:
+        network_manager = ZipkinNetworkManager(args.zipkin_api[0], limit=args.zipkin_limit,
+                                               lookback=int(args.zipkin_lookback * 60 * 60 * 1000),
+                                               window=int(args.zipkin_window * 60 * 1000))
+        try:
+            if args.zipkin_download:
+                model_file = args.zipkin_download[0]
+                print('Downloaded {} traces'.format(network_manager.write_traces(model_file)))
+                model = ZipkinTrace(model_file, streaming=True, workers=args.workers)
+            else:
+                model_file = 'zipkin_api.json'
+                model = ZipkinTrace(network_manager.iter_traces(), streaming=True, workers=args.workers)
+        finally:
+            network_manager.close()
     elif args.openxtrace:
         model_file = args.openxtrace[0]
-        model = OpenXTrace(model_file, args.multiple)
+        model = OpenXTrace(model_file, args.multiple, workers=args.workers)
+
+    # Resource demands
+    if model and args.capacity is not None:
+        for service in model.services.values():
+            service.set_capacity(args.capacity)
+
+    if model and (args.librede or args.librede_command or args.native_demands):
+        settings = LibredeSettings(path_to_librede_installation=args.librede[0] if args.librede else None,
+                                   librede_command=shlex.split(args.librede_command[0]) if args.librede_command else None,
+                                   cpu_utilization=args.cpu_utilization,
+                                   cpu_utilization_files=cpu_utilization_files,
+                                   approaches_to_use=args.librede_approaches,
+                                   path_to_librede_files=args.librede_files,
+                                   workers=args.librede_workers,
+                                   batched=args.librede_batched,
+                                   use_cache=args.librede_cache)
+        try:
+            if args.native_demands:
+                if settings.approaches_to_use is None:
+                    settings.approaches_to_use = NativeDemandEstimator.APPROACHES
+                NativeDemandEstimator(model, settings).print_summary()
+            else:
+                if settings.approaches_to_use is None:
+                    settings.approaches_to_use = LibredeCaller.APPROACHES
+                LibredeCaller(model, settings).print_summary()
+        except LibredeSettingsError as e:
+            parser.error(str(e))
 
     if model:
         model_name = model_file[model_file.rfind('/') + 1:]
@@ -108,7 +221,7 @@ def cli():
     # Export
     if args.export_model:
         if model_file:
-            pickle.dump(model, open(model_name + '_model_export.dat', 'wb+'))
+            model.save(model_name + '_model_export.dat')
 
     if args.export_architecture:
 
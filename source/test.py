@@ -2,8 +2,19 @@ import unittest
 
 from extractor.test import TestGraph
 from extractor.arch_models.test.TestGeneralModel import TestExporter
+from extractor.arch_models.test.TestHazardAnalysis import TestHazardAnalysis
+from extractor.arch_models.test.TestIngest import TestIngest
+from extractor.arch_models.test.TestLoadBalancer import TestLoadBalancer
+from extractor.arch_models.test.TestParallel import TestParallel
 from extractor.arch_models.test.TestRetry import TestRetry
+from extractor.arch_models.test.TestSnapshot import TestSnapshot
+from extractor.arch_models.test.TestSpanStore import TestSpanStore
+from extractor.arch_models.test.TestStreaming import TestStreaming
 from extractor.arch_models.test.TestZipkinOpenXtrace import TestZipkinOpenXTrace
+from extractor.r_d_e.test.TestLibredePipeline import TestLibredePipeline
+from extractor.r_d_e.test.TestNativeDemandEstimator import TestNativeDemandEstimator
+from extractor.controllers.test.TestJaegerNetworkManager import TestJaegerNetworkManager
+from extractor.controllers.test.TestZipkinNetworkManager import TestZipkinNetworkManager
 
 if __name__ == '__main__':
     unittest.main()
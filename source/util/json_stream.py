@@ -0,0 +1,123 @@
+import codecs
+import json
+import re
+from typing import IO, Any, Iterator
+
+WHITESPACE = re.compile(r'\s*')
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+
+class JsonStreamError(BaseException):
+    def __init__(self, message: str):
+        super().__init__('Malformed JSON stream: {}'.format(message))
+
+
+class _Buffer:
+    """
+    Sliding window over a text handle. Only the part of the document that has not been consumed yet is kept in memory.
+    """
+
+    def __init__(self, handle: IO, chunk_size: int):
+        self._handle = handle
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        # Characters of binary handles can be split between two chunks, so the bytes are decoded incrementally.
+        self._text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self.text = ''
+        self.position = 0
+        self.eof = False
+
+    def fill(self, size: int = None) -> bool:
+        if self.eof:
+            return False
+        chunk = self._handle.read(size or self._chunk_size)
+        if isinstance(chunk, bytes):
+            data = chunk
+            chunk = self._text_decoder.decode(data, not data)
+            # A chunk that only contains the beginning of a character is completed by the next one.
+            while data and not chunk:
+                data = self._handle.read(size or self._chunk_size)
+                chunk = self._text_decoder.decode(data, not data)
+        if not chunk:
+            self.eof = True
+            return False
+        # Drop everything that was already consumed before appending new data.
+        self.text = self.text[self.position:] + chunk
+        self.position = 0
+        return True
+
+    def skip_whitespace(self):
+        while True:
+            self.position = WHITESPACE.match(self.text, self.position).end()
+            if self.position < len(self.text) or not self.fill():
+                return
+
+    def peek(self) -> str:
+        self.skip_whitespace()
+        if self.position >= len(self.text):
+            raise JsonStreamError('unexpected end of document')
+        return self.text[self.position]
+
+    def expect(self, character: str):
+        if self.peek() != character:
+            raise JsonStreamError('expected "{}" at "{}"'.format(character, self.text[self.position:self.position + 20]))
+        self.position += 1
+
+    def decode(self) -> Any:
+        """
+        Decodes the next JSON value. If the value is not complete yet, more data is read and the decoding is retried with
+        a growing read size, so large values are decoded in amortized linear time.
+        """
+        self.skip_whitespace()
+        size = self._chunk_size
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.text, self.position)
+                # A number at the end of the buffer might continue in the next chunk.
+                if end < len(self.text) or self.eof:
+                    self.position = end
+                    return value
+            except json.JSONDecodeError as e:
+                if self.eof:
+                    raise JsonStreamError(str(e))
+            self.fill(size)
+            size *= 2
+
+
+def iter_json_array(handle: IO, key: str = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Any]:
+    """
+    Lazily yields the elements of a JSON array without loading the whole document.
+    @param handle:      Text or binary handle of the JSON document.
+    @param key:         If set, the document must be an object and the array stored under this (top-level) key is
+                        iterated. All other members of the object are skipped. Otherwise, the document itself must be an
+                        array.
+    @param chunk_size:  Amount of characters read at once.
+    @return:            An iterator over the decoded elements of the array.
+    """
+    buffer = _Buffer(handle, chunk_size)
+
+    if key is not None:
+        buffer.expect('{')
+        while True:
+            if buffer.peek() == '}':
+                return
+            member = buffer.decode()
+            buffer.expect(':')
+            if member == key:
+                break
+            # Skip the values of all other members.
+            buffer.decode()
+            if buffer.peek() == ',':
+                buffer.position += 1
+
+    buffer.expect('[')
+    if buffer.peek() == ']':
+        return
+    while True:
+        yield buffer.decode()
+        if buffer.peek() == ',':
+            buffer.position += 1
+        else:
+            buffer.expect(']')
+            return